@@ -0,0 +1,233 @@
+"""
+Offline backtest / benchmark for analysepipelinen (fetch -> join -> classify -> render).
+
+Replays recorded Binance JSON fixtures, or synthetic data at any scale, through the
+same functions the API uses, without touching the network:
+
+    python bench.py --symbols 50 --candles 500 --intervals 15m,1h --iterations 3
+    python bench.py --fixtures fixtures/ --intervals 1h
+    python bench.py --record fixtures/ --real-symbols BTCUSDT,ETHUSDT --intervals 15m,1h,1d
+
+Reports rows/s, p50/p99 per stage (per symbol/interval job) and how often each
+get_signal head fires, which makes it the regression benchmark when the rules are tuned.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+import main
+from observability import Profile, current_profile
+
+ENDPOINTS = ("topLongShortPositionRatio", "globalLongShortAccountRatio")
+STAGES = ("fetch", "join", "classify", "render")
+
+
+# --- DATA SOURCES ---
+def synthetic_dataset(symbols, candles, intervals, seed=0):
+    """
+    Random-walk klines plus long/short ratios per (symbol, interval), shaped like
+    Binance responses. Volatility and ratios are spread wide enough to hit every rule.
+    """
+    rng = random.Random(seed)
+    now = int(time.time() * 1000)
+    data = {}
+    for s in range(symbols):
+        sym = f"SYN{s:04d}USDT"
+        for interval in intervals:
+            step = main.INTERVAL_MS[interval]
+            start = now - now % step - (candles - 1) * step
+            vol = rng.choice([0.2, 1.0, 4.0, 12.0])
+            price = 10 ** rng.uniform(-3, 4)
+            klines = []; whale = []; retail = []
+            w = rng.uniform(0.6, 1.6); r = rng.uniform(0.6, 3.2)
+            for i in range(candles):
+                ts = start + i * step
+                close = max(price * (1 + rng.gauss(0, vol) / 100), 1e-9)
+                quote = 10 ** rng.uniform(4, 8.5)
+                buy = quote * min(max(rng.gauss(0.5, 0.12), 0.0), 1.0)
+                klines.append([ts, f"{price}", f"{max(price, close)}", f"{min(price, close)}", f"{close}", "0",
+                               ts + step - 1, f"{quote}", 100, "0", f"{buy}", "0"])
+                price = close
+                w = min(max(w + rng.gauss(0, 0.05), 0.3), 3.0)
+                r = min(max(r + rng.gauss(0, 0.08), 0.3), 4.5)
+                whale.append({"symbol": sym, "longShortRatio": f"{w:.4f}", "timestamp": ts})
+                retail.append({"symbol": sym, "longShortRatio": f"{r:.4f}", "timestamp": ts})
+            data[(sym, interval, "klines")] = klines
+            data[(sym, interval, ENDPOINTS[0])] = whale
+            data[(sym, interval, ENDPOINTS[1])] = retail
+    return data
+
+
+def fixture_name(sym, interval, kind):
+    return f"{sym}_{interval}_{kind}.json"
+
+
+def load_fixtures(path):
+    """
+    Reads <SYMBOL>_<interval>_<kind>.json files (raw Binance responses).
+    """
+    data = {}
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".json"): continue
+        sym, interval, kind = name[:-5].split("_", 2)
+        with open(os.path.join(path, name)) as f:
+            data[(sym, interval, kind)] = json.load(f)
+    return data
+
+
+def offline_fetch(data):
+    """
+    Stand-in for main._fetch_url that answers from the dataset, honouring limit/startTime.
+    """
+    async def fetch(session, url):
+        parts = urlsplit(url)
+        q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if parts.path.endswith("/klines"):
+            items = data.get((q["symbol"], q["interval"], "klines"))
+            ts_of = main.kline_ts
+        else:
+            items = data.get((q["symbol"], q["period"], parts.path.rsplit("/", 1)[-1]))
+            ts_of = main.sentiment_ts
+        if items is None:
+            return None, 0
+        if "startTime" in q:
+            start = int(q["startTime"])
+            items = [i for i in items if ts_of(i) >= start]
+        return items[-int(q.get("limit", 500)):], 0
+    return fetch
+
+
+async def record_fixtures(path, symbols, intervals, limits):
+    """
+    Saves live Binance responses as fixtures (through main.fetch_url).
+    """
+    os.makedirs(path, exist_ok=True)
+    session = main.get_session()
+    try:
+        for sym in symbols:
+            for interval in intervals:
+                limit = limits.get(interval, 500)
+                urls = {"klines": f"{main.DOMAIN_SPOT}/api/v3/klines?symbol={sym}&interval={interval}&limit={limit}"}
+                for ep in ENDPOINTS:
+                    urls[ep] = f"{main.DOMAIN_FUTURES}/futures/data/{ep}?symbol={sym}&period={interval}&limit={min(limit, 499)}"
+                for kind, url in urls.items():
+                    items = await main.fetch_url(session, url)
+                    if items is None:
+                        print(f"  no data for {sym} {interval} {kind}")
+                        continue
+                    with open(os.path.join(path, fixture_name(sym, interval, kind)), "w") as f:
+                        json.dump(items, f)
+                print(f"{sym} {interval}: recorded")
+    finally:
+        await session.close()
+
+
+# --- PIPELINE ---
+async def run_job(session, sym, interval, limit, heads):
+    """
+    One symbol/interval through the API's own functions; returns (rows, {stage: seconds}).
+    analyze_klines reports its classify time to the request profile, the rest of it is join.
+    """
+    prof = Profile()
+    current_profile.set(prof)  # local to this job's task
+    t0 = time.perf_counter()
+    klines, whale, retail = await main.fetch_kline_inputs(session, sym, interval, limit)
+    t1 = time.perf_counter()
+    rows = main.analyze_klines(sym, interval, klines, whale, retail)
+    t2 = time.perf_counter()
+    main.render_table_rows(rows)
+    t3 = time.perf_counter()
+    classify = prof.stages.get("classify", [0.0])[0]
+    heads.update(r.head for r in rows)
+    return len(rows), {"fetch": t1 - t0, "join": t2 - t1 - classify, "classify": classify, "render": t3 - t2}
+
+
+def percentile(values, p):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def benchmark(data, intervals, limit, iterations, warm, concurrency):
+    main._fetch_url = offline_fetch(data)
+    # Synthetic sentiment trips the frozen-data warnings; keep them out of the report
+    logging.getLogger("cvd").setLevel(logging.ERROR)
+    symbols = sorted({sym for sym, _, kind in data if kind == "klines"})
+    jobs = [(sym, interval) for sym in symbols for interval in intervals if (sym, interval, "klines") in data]
+    session = main.get_session()
+    sem = asyncio.Semaphore(concurrency)
+    timings = {stage: [] for stage in STAGES}
+    heads = Counter()
+    total_rows = 0
+    wall = 0.0
+
+    async def one(sym, interval):
+        async with sem:
+            return await run_job(session, sym, interval, limit, heads)
+
+    try:
+        for _ in range(iterations):
+            if not warm:
+                main.url_cache.clear(); main.candle_store.clear()
+            t0 = time.perf_counter()
+            results = await asyncio.gather(*[one(sym, interval) for sym, interval in jobs])
+            wall += time.perf_counter() - t0
+            for n, stage_times in results:
+                total_rows += n
+                for stage, seconds in stage_times.items():
+                    timings[stage].append(seconds)
+    finally:
+        await session.close()
+    return {
+        "jobs": len(jobs) * iterations,
+        "rows": total_rows,
+        "wall_s": wall,
+        "rows_per_s": total_rows / wall if wall else 0.0,
+        "stages": {stage: {"p50_ms": percentile(v, 50) * 1000, "p99_ms": percentile(v, 99) * 1000,
+                           "total_s": sum(v)} for stage, v in timings.items()},
+        "signals": dict(heads.most_common()),
+    }
+
+
+def print_report(report):
+    print(f"{report['jobs']} jobs, {report['rows']} rows in {report['wall_s']:.2f}s -> {report['rows_per_s']:,.0f} rows/s")
+    print(f"\n{'stage':<10}{'p50 ms':>10}{'p99 ms':>10}{'total s':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<10}{s['p50_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['total_s']:>10.3f}")
+    print(f"\n{'rows':>8} {'share':>7}  head")
+    for head, n in report["signals"].items():
+        print(f"{n:>8} {n / report['rows'] * 100:>6.2f}%  {head}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark / backtest of the signal pipeline")
+    parser.add_argument("--fixtures", metavar="DIR", help="replay recorded Binance JSON instead of synthetic data")
+    parser.add_argument("--record", metavar="DIR", help="record live Binance responses as fixtures and exit")
+    parser.add_argument("--real-symbols", default="BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT,DOGEUSDT")
+    parser.add_argument("--symbols", type=int, default=20, help="synthetic symbols")
+    parser.add_argument("--candles", type=int, default=500, help="synthetic candles per symbol/interval")
+    parser.add_argument("--intervals", default="15m,1h")
+    parser.add_argument("--limit", type=int, default=None, help="rows per job (default: --candles)")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="keep cache/candle store between iterations")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    intervals = args.intervals.split(",")
+
+    if args.record:
+        asyncio.run(record_fixtures(args.record, args.real_symbols.split(","), intervals, main.INTERVAL_LIMITS))
+        sys.exit(0)
+
+    data = load_fixtures(args.fixtures) if args.fixtures else synthetic_dataset(args.symbols, args.candles, intervals, args.seed)
+    report = asyncio.run(benchmark(data, intervals, args.limit or args.candles, args.iterations, args.warm, args.concurrency))
+    if args.json: print(json.dumps(report, indent=2, ensure_ascii=False))
+    else: print_report(report)
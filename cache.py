@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    In-process async cache: a TTL per entry, single-flight coalescing of concurrent misses
+    and LRU eviction bounded by a memory budget (bytes).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.inflight = {}            # key -> Task
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_fetch(self, key, fetch, ttl):
+        """
+        fetch() is a coroutine function returning (value, size_in_bytes).
+        None values are never cached, so failed upstream calls are retried next time.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self._drop(key)
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._run(key, fetch, ttl))
+        self.inflight[key] = task
+        # shield: a cancelled caller must not cancel the fetch other callers are awaiting
+        return await asyncio.shield(task)
+
+    def peek(self, key):
+        """
+        The cached value if it is still fresh, else None; never fetches.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    async def _run(self, key, fetch, ttl):
+        try:
+            value, size = await fetch()
+            if value is not None and ttl > 0:
+                self._store(key, value, size, ttl)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
+    def _store(self, key, value, size, ttl):
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (time.monotonic() + ttl, size, value)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            old_key = next(iter(self.entries))
+            self._drop(old_key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "inflight": len(self.inflight),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,202 @@
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+# Candle length per interval (1M is approximated with 31 days; only used for gap checks)
+INTERVAL_MS = {
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+    "1w": 604_800_000,
+    "1M": 2_678_400_000,
+}
+
+
+class Series:
+    __slots__ = ("points", "depth")
+
+    def __init__(self, depth):
+        self.points = {}  # ts -> raw upstream item, ascending ts
+        self.depth = depth
+
+
+class CandleStore:
+    """
+    Lokal lagring av klines/sentiment per (symbol, interval, endpoint).
+    Etter første fulle henting hentes bare punkter fra siste lagrede timestamp
+    (startTime), slik at kun det åpne lyset og nye lys går over nettet.
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.analyzed = {}  # (symbol, interval) -> {ts: SignalRow}
+
+    def start_time(self, key, limit, interval):
+        """
+        Returns the startTime for an incremental fetch, or None when a full
+        window must be fetched (unknown series, deeper window, or a gap).
+        The gap is checked against the stored depth, not the caller's limit:
+        a shallow caller (the screener) must not leave a hole in a deeper window.
+        """
+        s = self.series.get(key)
+        if s is None or not s.points or limit > s.depth:
+            return None
+        last_ts = next(reversed(s.points))
+        step = INTERVAL_MS.get(interval)
+        if step is None:
+            return None
+        if time.time() * 1000 - last_ts > (s.depth - 1) * step:
+            return None
+        return last_ts
+
+    def window(self, key, limit):
+        """
+        The limit to request: at least the stored depth, so both a full refetch and
+        an incremental one (startTime + limit) cover every point the store keeps.
+        """
+        s = self.series.get(key)
+        return limit if s is None else max(limit, s.depth)
+
+    def merge(self, key, items, ts_of, limit):
+        """
+        Merges freshly fetched items (full window or incremental tail) and
+        returns the newest `limit` items. The last stored point is always the
+        one refetched next time, so a still-open candle gets overwritten.
+        """
+        s = self.series.get(key)
+        if items:
+            if s is None:
+                s = self.series[key] = Series(limit)
+            s.depth = max(s.depth, limit)
+            points = s.points
+            new = {}
+            for item in items:
+                ts = ts_of(item)
+                if ts in points:
+                    points[ts] = item
+                else:
+                    new[ts] = item
+            if new:
+                if points and min(new) < next(reversed(points)):
+                    # Backfill from a deeper full fetch: rebuild in ts order
+                    points.update(new)
+                    s.points = points = dict(sorted(points.items()))
+                else:
+                    points.update(new)
+            excess = len(points) - s.depth
+            if excess > 0:
+                for ts in list(points)[:excess]:
+                    del points[ts]
+        if s is None:
+            return []
+        return list(s.points.values())[-limit:]
+
+    def clear(self):
+        self.series.clear()
+        self.analyzed.clear()
+
+
+class SentimentSeries:
+    """
+    Sentiment history as sorted parallel arrays (timestamps, ratios).
+    nearest() is a bisect lookup, O(log n) per kline row.
+    status is the feed health verdict (feed_health) at the time the series was built.
+    """
+    __slots__ = ("ts", "values", "status")
+
+    def __init__(self, ts=(), values=(), status="ok"):
+        self.ts = list(ts)
+        self.values = list(values)
+        self.status = status
+
+    @classmethod
+    def from_items(cls, items, ts_key='timestamp', value_key='longShortRatio'):
+        pairs = [(int(item[ts_key]), float(item[value_key])) for item in items]
+        if any(pairs[i][0] > pairs[i + 1][0] for i in range(len(pairs) - 1)):
+            pairs.sort()
+        return cls([p[0] for p in pairs], [p[1] for p in pairs])
+
+    def __len__(self):
+        return len(self.ts)
+
+    def nearest(self, ts, default=0.0, max_age=None):
+        """
+        Value at the timestamp closest to ts (the earlier one on ties).
+        With max_age (ms), points further away than that count as missing.
+        """
+        keys = self.ts
+        if not keys: return default
+        i = bisect_left(keys, ts)
+        if i < len(keys) and keys[i] == ts: return self.values[i]
+        if i == 0: j = 0
+        elif i == len(keys): j = i - 1
+        else: j = i - 1 if ts - keys[i - 1] <= keys[i] - ts else i
+        if max_age is not None and abs(keys[j] - ts) > max_age: return default
+        return self.values[j]
+
+
+def format_label(ts, interval):
+    dt_obj = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+    if interval in ('5m', '15m'): return dt_obj.strftime("%d/%m %H:%M")
+    elif interval in ('1h', '4h'): return dt_obj.strftime("%d/%m %H:00")
+    elif interval == '1d': return dt_obj.strftime("%Y-%m-%d")
+    elif interval == '1w': return f"Uke {dt_obj.strftime('%W')}"
+    elif interval == '1M': return dt_obj.strftime("%B")
+    return str(ts)
+
+
+# --- WEEKLY / MONTHLY AGGREGATION FROM DAILY CANDLES ---
+def bucket_start(ts, interval):
+    """
+    Open time of the 1w (Monday 00:00 UTC) or 1M (1st 00:00 UTC) candle containing ts,
+    matching Binance's own candle boundaries.
+    """
+    dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == '1w': dt -= timedelta(days=dt.weekday())
+    elif interval == '1M': dt = dt.replace(day=1)
+    return int(dt.timestamp() * 1000)
+
+def close_time(ts, interval):
+    """
+    End (ms, exclusive) of the candle opened at ts; 1M uses the real month length.
+    """
+    if interval == '1M':
+        dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+        return int(datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    return ts + INTERVAL_MS[interval]
+
+def daily_lookback(months, weeks, now=None):
+    """
+    Number of daily candles needed to build `months` full monthly and `weeks` full weekly candles
+    (the current, still-open ones included).
+    """
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month, year = today.month - (months - 1), today.year
+    while month < 1: month += 12; year -= 1
+    first_month = today.replace(year=year, month=month, day=1)
+    first_week = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    return (today - min(first_month, first_week)).days + 1
+
+def aggregate_klines(daily, interval):
+    """
+    Builds 1w/1M klines (in the same column format as Binance) from daily klines.
+    A leading bucket that does not start on its first day is dropped as incomplete.
+    """
+    buckets = {}
+    for k in daily:
+        ts = int(k[0])
+        start = bucket_start(ts, interval)
+        b = buckets.get(start)
+        if b is None:
+            if not buckets and ts != start:
+                continue
+            buckets[start] = [start, float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]),
+                              int(k[6]), float(k[7]), int(k[8]), float(k[9]), float(k[10]), "0"]
+        else:
+            b[2] = max(b[2], float(k[2])); b[3] = min(b[3], float(k[3])); b[4] = float(k[4])
+            b[5] += float(k[5]); b[6] = int(k[6]); b[7] += float(k[7]); b[8] += int(k[8])
+            b[9] += float(k[9]); b[10] += float(k[10])
+    return list(buckets.values())
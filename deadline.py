@@ -0,0 +1,94 @@
+"""
+Tidsbudsjett per request: deadline budgets og hedged upstream-kall.
+
+A request that runs with a Budget in `current_budget` stops waiting for upstream calls
+once the budget is spent: main.fetch_url then answers from the last good (stored) data,
+records the call in Budget.late, and leaves the fetch running in the background.
+hedged() sends a second copy of a slow request once it is slower than the endpoint's
+recent p95, and takes whichever answers first.
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+
+current_budget = contextvars.ContextVar("cvd_budget", default=None)
+
+
+class Budget:
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.late = set()  # (symbol, interval, endpoint) answered from stored data
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def late_for(self, symbol):
+        return sorted((interval, endpoint) for sym, interval, endpoint in self.late if sym == symbol)
+
+
+@contextmanager
+def budget_scope(seconds):
+    """
+    Runs the block with a fresh Budget (none when seconds <= 0); child tasks inherit it.
+    """
+    if seconds <= 0:
+        yield None
+        return
+    budget = Budget(seconds)
+    token = current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        current_budget.reset(token)
+
+
+class LatencyWindow:
+    """
+    Response times of the last `size` successful requests to one endpoint.
+    """
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def quantile(self, q):
+        if len(self.samples) < self.min_samples: return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def hedged(request, delay, can_hedge, ok=lambda result: True):
+    """
+    Awaits request(); if it has not finished after `delay` seconds (None = never hedge) and
+    can_hedge() allows it, starts a second request() and returns the first result that is
+    ok(), cancelling the other. Returns (result, winner) with winner None, "primary" or "hedge".
+    When neither succeeds, the last one to finish decides (its exception is raised).
+    """
+    first = asyncio.ensure_future(request())
+    if delay is None: return await first, None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+    if done or not can_hedge(): return await first, None
+    second = asyncio.ensure_future(request())
+    names = {first: "primary", second: "hedge"}
+    pending = {first, second}
+    last = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if task.exception() is None and ok(task.result()): return task.result(), names[task]
+        return last.result(), names[last]
+    finally:
+        for task in pending: task.cancel()
@@ -0,0 +1,264 @@
+"""
+Lokal stand-in for Binance REST (spot klines + futures long/short-ratio), for lasttesting
+and offline development without touching the real API.
+
+    python fake_binance.py [--port 9100] [--latency 80 --jitter 30] [--throttle-rate 0.01]
+                           [--slow topLongShortPositionRatio=4000 --slow-rate 0.1]
+                           [--frozen BTCUSDT] [--frozen-rate 0.05] [--fixtures fixtures/]
+
+    CVD_DOMAIN_SPOT=http://127.0.0.1:9100 CVD_DOMAIN_FUTURES=http://127.0.0.1:9100 python main.py
+
+Serves /api/v3/klines (including calendar-month 1M candles), /futures/data/*LongShort*, /fapi/v1/exchangeInfo and
+/api/v3/ticker/price. Data comes from fixtures (bench.py --record layout:
+<SYMBOL>_<interval>_<kind>.json) or from a deterministic generator: the same
+(symbol, candle) always gets the same values, and a candle's close is the next one's
+open, so incremental (startTime) fetches line up like against Binance.
+Weight headers and 429s follow Binance's rules closely enough to exercise the governor.
+/_stats reports the calls served (used by loadtest.py for upstream amplification).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000, "12h": 43_200_000,
+    "1d": 86_400_000, "1w": 604_800_000,
+}
+WATCHLIST = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT"]
+
+
+def seed(*parts):
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+
+# --- GENERATOR ---
+def price_at(symbol, t):
+    """
+    Smooth, symbol-specific price path: a few slow sine waves plus hourly noise.
+    Small-cap-like symbols (most synthetic ones) get much larger swings.
+    """
+    s = seed(symbol)
+    base = 10 ** (((s % 1000) / 1000) * 6 - 2)
+    vol = 0.05 if symbol in WATCHLIST else 0.05 + (s >> 10) % 100 / 250
+    hours = t / 3_600_000
+    wave = sum(math.sin(hours / p + (s >> k) % 7) / k for k, p in ((1, 97.0), (2, 23.0), (3, 5.3)))
+    noise = random.Random(seed(symbol, int(hours))).gauss(0, 0.2)
+    return base * math.exp(vol * (wave + noise))
+
+
+def kline(symbol, ts, step, now):
+    open_p = price_at(symbol, ts)
+    close_t = min(ts + step, now)
+    close_p = price_at(symbol, close_t)
+    rng = random.Random(seed(symbol, ts, step))
+    span = max(0.0, (close_t - ts) / step)
+    quote = 10 ** rng.uniform(5, 8.5) * span
+    change = (close_p - open_p) / open_p
+    buy = quote * min(max(0.5 + math.tanh(change * 20) * 0.3 + rng.gauss(0, 0.08), 0.0), 1.0)
+    high = max(open_p, close_p) * (1 + rng.random() * 0.01)
+    low = min(open_p, close_p) * (1 - rng.random() * 0.01)
+    return [ts, f"{open_p:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close_p:.8f}", f"{quote / close_p:.4f}",
+            ts + step - 1, f"{quote:.4f}", rng.randint(100, 10_000), f"{buy / close_p:.4f}", f"{buy:.4f}", "0"]
+
+
+def ratio(symbol, endpoint, ts):
+    s = seed(symbol, endpoint)
+    base = 0.7 + (s % 1000) / 1000 * (1.0 if endpoint.startswith("top") else 2.2)
+    days = ts / 86_400_000
+    value = base * math.exp(0.25 * math.sin(days / 3 + s % 11) + random.Random(seed(symbol, endpoint, ts)).gauss(0, 0.04))
+    return round(value, 4)
+
+
+def window(step, now, limit, start=None, end=None):
+    """
+    Candle open times Binance would return for these parameters (ascending).
+    """
+    last = now - now % step
+    if end is not None: last = min(last, end - end % step)
+    if start is not None:
+        first = start + (-start) % step
+        return list(range(first, min(last, first + (limit - 1) * step) + 1, step))
+    return list(range(last - (limit - 1) * step, last + 1, step))
+
+
+def month_start(ts, shift=0):
+    """
+    Open time of the 1M candle (1st 00:00 UTC) containing ts, `shift` months later.
+    """
+    dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+    m = dt.year * 12 + dt.month - 1 + shift
+    return int(datetime(m // 12, m % 12 + 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def month_window(now, limit, start=None, end=None):
+    """
+    window() for 1M, whose candles follow calendar months instead of a fixed step.
+    """
+    last = month_start(now)
+    if end is not None: last = min(last, month_start(end))
+    if start is None: return [month_start(last, -n) for n in range(limit - 1, -1, -1)]
+    ts = start if month_start(start) == start else month_start(start, 1)
+    out = []
+    while ts <= last and len(out) < limit:
+        out.append(ts); ts = month_start(ts, 1)
+    return out
+
+
+# --- FIXTURES ---
+def load_fixtures(path):
+    data = {}
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".json"): continue
+        sym, interval, kind = name[:-5].split("_", 2)
+        with open(os.path.join(path, name)) as f:
+            data[(sym, interval, kind)] = json.load(f)
+    return data
+
+
+def from_fixture(items, ts_of, limit, start=None, end=None):
+    if start is not None: items = [i for i in items if ts_of(i) >= start]
+    if end is not None: items = [i for i in items if ts_of(i) <= end]
+    return items[:limit] if start is not None else items[-limit:]
+
+
+# --- SERVER ---
+class FakeBinance:
+
+    def __init__(self, args):
+        self.args = args
+        self.fixtures = load_fixtures(args.fixtures) if args.fixtures else {}
+        self.frozen = set(filter(None, args.frozen.split(",")))
+        self.universe = WATCHLIST + [f"SYN{i:04d}USDT" for i in range(args.universe)]
+        self.slow = {name: float(ms) for name, ms in (item.split("=", 1) for item in args.slow)}
+        self.calls = {}
+        self.throttled = 0
+        self.weight = {"spot": [0, 0], "futures": [0, 0]}  # domain -> [minute, used weight]
+
+    def is_frozen(self, symbol):
+        return symbol in self.frozen or (seed(symbol, "frozen") % 10_000) / 10_000 < self.args.frozen_rate
+
+    def use_weight(self, domain, weight):
+        minute = int(time.time() // 60)
+        w = self.weight[domain]
+        if w[0] != minute: w[0] = minute; w[1] = 0
+        w[1] += weight
+        return w[1]
+
+    async def handle(self, request, domain, weight, body):
+        name = request.path.rsplit("/", 1)[-1]
+        self.calls[name] = self.calls.get(name, 0) + 1
+        delay = max(0.0, random.gauss(self.args.latency, self.args.jitter)) / 1000
+        if name in self.slow and random.random() < self.args.slow_rate: delay += self.slow[name] / 1000
+        if delay: await asyncio.sleep(delay)
+        used = self.use_weight(domain, weight)
+        headers = {"X-MBX-USED-WEIGHT-1m" if domain == "spot" else "X-MBX-USED-WEIGHT-1M": str(used)}
+        limit = self.args.spot_weight_limit if domain == "spot" else self.args.futures_weight_limit
+        if used > limit or random.random() < self.args.throttle_rate:
+            self.throttled += 1
+            headers["Retry-After"] = str(self.args.retry_after)
+            return web.json_response({"code": -1003, "msg": "Too many requests."}, status=429, headers=headers)
+        try:
+            data = body()
+        except (KeyError, ValueError) as e:
+            return web.json_response({"code": -1102, "msg": f"Bad parameter: {e}"}, status=400, headers=headers)
+        return web.json_response(data, headers=headers)
+
+    def params(self, q, default_limit, max_limit):
+        limit = min(int(q.get("limit", default_limit)), max_limit)
+        start = int(q["startTime"]) if "startTime" in q else None
+        end = int(q["endTime"]) if "endTime" in q else None
+        return limit, start, end
+
+    async def klines(self, request):
+        def body():
+            q = request.query
+            symbol, interval = q["symbol"], q["interval"]
+            limit, start, end = self.params(q, 500, 1000)
+            fixture = self.fixtures.get((symbol, interval, "klines"))
+            if fixture is not None: return from_fixture(fixture, lambda k: int(k[0]), limit, start, end)
+            now = int(time.time() * 1000)
+            if interval == "1M":
+                return [kline(symbol, ts, month_start(ts, 1) - ts, now) for ts in month_window(now, limit, start, end)]
+            step = INTERVAL_MS[interval]
+            return [kline(symbol, ts, step, now) for ts in window(step, now, limit, start, end)]
+        return await self.handle(request, "spot", 2, body)
+
+    async def long_short(self, request):
+        endpoint = request.match_info["endpoint"]
+        if "LongShort" not in endpoint: raise web.HTTPNotFound()
+
+        def body():
+            q = request.query
+            symbol, period = q["symbol"], q["period"]
+            limit, start, end = self.params(q, 30, 500)
+            fixture = self.fixtures.get((symbol, period, endpoint))
+            if fixture is not None: return from_fixture(fixture, lambda i: int(i["timestamp"]), limit, start, end)
+            step = INTERVAL_MS[period]
+            # Only closed periods are published
+            now = int(time.time() * 1000) - step
+            frozen = self.is_frozen(symbol)
+            return [{"symbol": symbol, "longShortRatio": f"{1.2345 if frozen else ratio(symbol, endpoint, ts):.4f}", "timestamp": ts}
+                    for ts in window(step, now, limit, start, end)]
+        return await self.handle(request, "futures", 1, body)
+
+    async def exchange_info(self, request):
+        def body():
+            return {"symbols": [{"symbol": s, "contractType": "PERPETUAL", "quoteAsset": "USDT", "status": "TRADING"}
+                                for s in self.universe]}
+        return await self.handle(request, "futures", 1, body)
+
+    async def ticker_price(self, request):
+        def body():
+            now = int(time.time() * 1000)
+            return [{"symbol": s, "price": f"{price_at(s, now):.8f}"} for s in self.universe]
+        return await self.handle(request, "spot", 4, body)
+
+    async def stats(self, request):
+        return web.json_response({"calls": sum(self.calls.values()), "by_endpoint": self.calls, "throttled": self.throttled,
+                                  "weight_1m": {d: w[1] for d, w in self.weight.items()}})
+
+    async def reset(self, request):
+        self.calls = {}; self.throttled = 0
+        return web.json_response({"ok": True})
+
+
+def make_app(args):
+    fake = FakeBinance(args)
+    app = web.Application()
+    app.router.add_get("/api/v3/klines", fake.klines)
+    app.router.add_get("/api/v3/ticker/price", fake.ticker_price)
+    app.router.add_get("/futures/data/{endpoint}", fake.long_short)
+    app.router.add_get("/fapi/v1/exchangeInfo", fake.exchange_info)
+    app.router.add_get("/_stats", fake.stats)
+    app.router.add_post("/_reset", fake.reset)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Binance REST upstream for load tests")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--fixtures", metavar="DIR", help="serve recorded responses where available")
+    parser.add_argument("--latency", type=float, default=0, help="mean response delay (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="stdev of the delay (ms)")
+    parser.add_argument("--slow", action="append", default=[], metavar="ENDPOINT=MS",
+                        help="extra delay for one endpoint (repeatable), e.g. topLongShortPositionRatio=4000")
+    parser.add_argument("--slow-rate", type=float, default=1.0, help="fraction of --slow endpoint requests that get the delay")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--spot-weight-limit", type=int, default=6000)
+    parser.add_argument("--futures-weight-limit", type=int, default=2400)
+    parser.add_argument("--frozen", default="", help="symbols whose long/short ratios never change")
+    parser.add_argument("--frozen-rate", type=float, default=0, help="fraction of symbols with frozen ratios")
+    parser.add_argument("--universe", type=int, default=200, help="synthetic perps listed in exchangeInfo")
+    args = parser.parse_args()
+    print(f"Fake Binance on http://127.0.0.1:{args.port}")
+    web.run_app(make_app(args), port=args.port, print=None)
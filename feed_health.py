@@ -0,0 +1,124 @@
+"""
+Inkrementell helsesjekk for sentiment-feeds (long/short-ratio per symbol, periode og endpoint).
+
+Each feed keeps rolling statistics over its last `window` points, updated only with
+points newer than the last one seen: Welford mean/variance (with removal), a value ->
+count table for the distinct count, and when the value last changed. A status is then
+an O(1) lookup instead of a rescan of the whole series on every fetch.
+"""
+import math
+from collections import deque
+
+OK = "ok"
+LOW_VARIANCE = "low_variance"
+FROZEN = "frozen"
+STALE = "stale"
+EMPTY = "empty"
+# Feeds in these states should not be read as real sentiment
+DEGRADED = (FROZEN, STALE, EMPTY)
+
+
+class FeedStats:
+    __slots__ = ("window", "n", "mean", "m2", "counts", "last_ts", "last_value", "last_change_ts", "run")
+
+    def __init__(self, size):
+        self.window = deque(maxlen=size)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.counts = {}
+        self.last_ts = None
+        self.last_value = None
+        self.last_change_ts = None
+        self.run = 0  # points in a row with the current value
+
+    def add(self, ts, value):
+        if len(self.window) == self.window.maxlen:
+            self._remove(self.window[0])
+        self.window.append(value)
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.counts[value] = self.counts.get(value, 0) + 1
+        if value != self.last_value:
+            self.last_change_ts = ts
+            self.run = 1
+        else:
+            self.run += 1
+        self.last_ts = ts
+        self.last_value = value
+
+    def _remove(self, value):
+        # Inverse Welford step for the point leaving the window
+        if self.n <= 1:
+            self.n = 0; self.mean = 0.0; self.m2 = 0.0
+        else:
+            old_mean = self.mean
+            self.n -= 1
+            self.mean = (old_mean * (self.n + 1) - value) / self.n
+            self.m2 = max(0.0, self.m2 - (value - self.mean) * (value - old_mean))
+        left = self.counts[value] - 1
+        if left: self.counts[value] = left
+        else: del self.counts[value]
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def distinct(self):
+        return len(self.counts)
+
+
+class FeedTracker:
+    """
+    frozen:       the last `frozen_run` points are identical, or the whole window is (>= 3 points)
+    low_variance: fewer than 3 distinct values or stdev below min_std in the window
+    stale:        newest point older than `stale_periods` periods
+    empty:        no points seen yet
+    """
+
+    def __init__(self, window=48, frozen_run=12, min_std=0.001, stale_periods=3):
+        self.size = window
+        self.frozen_run = frozen_run
+        self.min_std = min_std
+        self.stale_periods = stale_periods
+        self.feeds = {}
+        self.states = {}  # key -> last reported status, so only transitions get logged
+
+    def update(self, key, items, ts_of, value_of):
+        """
+        Feeds the items newer than the last seen point; returns how many were added.
+        The key is registered even without items, so a feed that never returned
+        data still shows up (as empty) in the health reports.
+        """
+        s = self.feeds.get(key)
+        if s is None: s = self.feeds[key] = FeedStats(self.size)
+        if not items: return 0
+        if s.last_ts is not None and ts_of(items[-1]) <= s.last_ts: return 0
+        added = 0
+        for item in items:
+            ts = ts_of(item)
+            if s.last_ts is not None and ts <= s.last_ts: continue
+            s.add(ts, value_of(item))
+            added += 1
+        return added
+
+    def status(self, key, period_ms, now_ms):
+        s = self.feeds.get(key)
+        if s is None or s.n == 0: return EMPTY
+        if now_ms - s.last_ts > self.stale_periods * period_ms: return STALE
+        if s.run >= self.frozen_run or (s.n >= 3 and s.distinct == 1): return FROZEN
+        if s.n >= 3 and (s.distinct < 3 or s.std < self.min_std): return LOW_VARIANCE
+        return OK
+
+    def info(self, key, period_ms, now_ms):
+        s = self.feeds.get(key)
+        status = self.status(key, period_ms, now_ms)
+        if s is None or s.n == 0: return {"status": status, "points": 0}
+        return {
+            "status": status, "points": s.n, "mean": round(s.mean, 4), "std": round(s.std, 5),
+            "distinct": s.distinct, "last_ts": s.last_ts, "last_change_ts": s.last_change_ts,
+            "unchanged_points": s.run, "age_s": round((now_ms - s.last_ts) / 1000),
+        }
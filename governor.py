@@ -0,0 +1,116 @@
+import asyncio
+import random
+import time
+
+
+class RequestShed(Exception):
+    """
+    Raised when a request is dropped instead of queued (limit too close, queue full or IP ban).
+    """
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """
+    Exponential backoff with jitter: base * 2^attempt, capped, scaled by 0.5-1.5.
+    """
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+class RateGovernor:
+    """
+    Token bucket per Binance-domene (spot / futures), styrt av X-MBX-USED-WEIGHT-1m.
+
+    The bucket refills at limit/60 per second and is clamped to what Binance reports
+    as still available, so weight used by other processes on the same IP counts too.
+    Requests wait for tokens up to max_wait seconds, otherwise they are shed.
+    429/418 responses block the domain for Retry-After (plus jitter).
+    """
+
+    def __init__(self, name, weight_limit_1m, headroom=0.9, max_wait=10.0, max_queue=200):
+        self.name = name
+        self.capacity = weight_limit_1m * headroom
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.blocked_until = 0.0
+        self.used_weight = None
+        self.queued = 0
+        self.queued_total = 0
+        self.shed_total = 0
+        self.throttled_total = 0
+        self.banned_total = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return now
+
+    async def acquire(self, weight=1):
+        """
+        Reserves the weight up front (the bucket may go negative) and sleeps off the
+        debt, so concurrent waiters are released weight/rate apart instead of together.
+        """
+        now = self._refill()
+        self.tokens -= weight
+        wait = max(0.0, self.blocked_until - now, -self.tokens / self.rate)
+        if wait > 0:
+            if wait > self.max_wait or self.queued >= self.max_queue:
+                self.tokens += weight
+                self.shed_total += 1
+                raise RequestShed(f"{self.name}: would wait {wait:.1f}s ({self.queued} queued)")
+            self.queued += 1
+            self.queued_total += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.tokens += weight  # the request is not sent; give the reservation back
+                raise
+            finally:
+                self.queued -= 1
+
+    def try_acquire(self, weight=1, reserve=0.5):
+        """
+        Takes the weight only if it is there right now and at least `reserve` of the
+        capacity stays free; never waits. For optional extra requests (hedges).
+        """
+        now = self._refill()
+        if now < self.blocked_until or self.tokens - weight < self.capacity * reserve:
+            return False
+        self.tokens -= weight
+        return True
+
+    def observe(self, status, headers):
+        used = headers.get("X-MBX-USED-WEIGHT-1m") or headers.get("X-MBX-USED-WEIGHT-1M")
+        if used is not None:
+            try:
+                self.used_weight = int(used)
+                self._refill()
+                self.tokens = min(self.tokens, self.capacity - self.used_weight)
+            except ValueError:
+                pass
+        if status in (429, 418):
+            if status == 429: self.throttled_total += 1
+            else: self.banned_total += 1
+            try:
+                retry_after = float(headers.get("Retry-After", "60"))
+            except ValueError:
+                retry_after = 60.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after * random.uniform(1.0, 1.2))
+            self.tokens = min(self.tokens, 0.0)
+
+    def stats(self):
+        now = self._refill()
+        return {
+            "tokens": round(self.tokens, 1),
+            "capacity": self.capacity,
+            "used_weight_1m": self.used_weight,
+            "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+            "queued": self.queued,
+            "queued_total": self.queued_total,
+            "shed_total": self.shed_total,
+            "throttled_429": self.throttled_total,
+            "banned_418": self.banned_total,
+        }
@@ -0,0 +1,318 @@
+"""
+Persistent historikk for backtesting: append-only filer med faste records per
+symbol/interval/serie, lest via memory-mapping (numpy.memmap).
+
+Layout:  <root>/<SYMBOL>/<interval>/<kind>.bin
+    klines                       ts, open, high, low, close, volume, quote_vol, taker_buy_quote
+    topLongShortPositionRatio    ts, value
+    globalLongShortAccountRatio  ts, value
+
+Appends only ever add records newer than the last stored one, so files stay sorted;
+compact() rewrites a file sorted and de-duplicated (last write wins) and drops a
+torn trailing record after a crash.
+
+    python history_store.py info
+    python history_store.py compact
+    python history_store.py backfill --symbols BTCUSDT,ETHUSDT --intervals 1h,1d --days 30
+    python history_store.py replay --symbol BTCUSDT --interval 1h --max-age 1
+"""
+import argparse
+import asyncio
+import os
+from collections import Counter
+
+import aiohttp
+import numpy as np
+
+from candles import INTERVAL_MS
+from signal_engine import SignalRow, classify_rows
+
+KLINE_DTYPE = np.dtype([
+    ("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("volume", "<f8"), ("quote_vol", "<f8"), ("taker_buy_quote", "<f8"),
+])
+RATIO_DTYPE = np.dtype([("ts", "<i8"), ("value", "<f8")])
+
+KLINES = "klines"
+WHALE = "topLongShortPositionRatio"
+RETAIL = "globalLongShortAccountRatio"
+KINDS = (KLINES, WHALE, RETAIL)
+
+
+def dtype_for(kind):
+    return KLINE_DTYPE if kind == KLINES else RATIO_DTYPE
+
+
+def kline_records(klines):
+    """
+    Binance kline rows -> KLINE_DTYPE records.
+    """
+    rec = np.empty(len(klines), dtype=KLINE_DTYPE)
+    for i, k in enumerate(klines):
+        rec[i] = (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), float(k[7]), float(k[10]))
+    return rec
+
+
+def ratio_records(items):
+    """
+    Binance long/short items -> RATIO_DTYPE records.
+    """
+    rec = np.empty(len(items), dtype=RATIO_DTYPE)
+    for i, item in enumerate(items):
+        rec[i] = (int(item['timestamp']), float(item['longShortRatio']))
+    return rec
+
+
+def nearest_join(ts, ref_ts, ref_values, default=np.nan, max_age=None):
+    """
+    Vectorised nearest-timestamp lookup (earlier point on ties), same rule as
+    candles.SentimentSeries.nearest. Missing points are NaN, never a 0.0 ratio.
+    """
+    ts = np.asarray(ts)
+    out = np.full(ts.shape, default, dtype=np.float64)
+    if len(ref_ts) == 0:
+        return out
+    i = np.searchsorted(ref_ts, ts)
+    left = np.clip(i - 1, 0, len(ref_ts) - 1)
+    right = np.clip(i, 0, len(ref_ts) - 1)
+    use_left = (i == len(ref_ts)) | ((i > 0) & (ts - ref_ts[left] <= ref_ts[right] - ts))
+    j = np.where(use_left, left, right)
+    out[:] = ref_values[j]
+    if max_age is not None:
+        out[np.abs(ref_ts[j] - ts) > max_age] = default
+    return out
+
+
+class HistoryStore:
+
+    def __init__(self, root):
+        self.root = root
+        self.last = {}  # path -> newest stored ts
+
+    def path(self, symbol, interval, kind):
+        return os.path.join(self.root, symbol, interval, f"{kind}.bin")
+
+    def series(self):
+        """
+        (symbol, interval, kind) for every stored file.
+        """
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for symbol in sorted(os.listdir(self.root)):
+            sym_dir = os.path.join(self.root, symbol)
+            if not os.path.isdir(sym_dir):
+                continue
+            for interval in sorted(os.listdir(sym_dir)):
+                for name in sorted(os.listdir(os.path.join(sym_dir, interval))):
+                    if name.endswith(".bin") and name[:-4] in KINDS:
+                        found.append((symbol, interval, name[:-4]))
+        return found
+
+    # --- write ---
+    def last_ts(self, symbol, interval, kind):
+        path = self.path(symbol, interval, kind)
+        if path not in self.last:
+            data = self._map(path, dtype_for(kind))
+            self.last[path] = int(data["ts"].max()) if len(data) else None
+        return self.last[path]
+
+    def append(self, symbol, interval, kind, records, only_newer=True):
+        """
+        Appends records newer than the newest stored one; returns how many were written.
+        With only_newer=False (backfill) older records are appended too and sorted in by compact().
+        """
+        last = self.last_ts(symbol, interval, kind)
+        if last is not None and only_newer:
+            records = records[records["ts"] > last]
+        if not len(records):
+            return 0
+        records = np.sort(records, order="ts")
+        path = self.path(symbol, interval, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(records.tobytes())
+        self.last[path] = max(int(records["ts"][-1]), last if last is not None else int(records["ts"][-1]))
+        return len(records)
+
+    def append_klines(self, symbol, interval, klines, closed_before=None, only_newer=True):
+        """
+        Stores closed klines only (close time < closed_before ms); the open candle still changes.
+        """
+        if closed_before is not None:
+            klines = [k for k in klines if int(k[6]) < closed_before]
+        return self.append(symbol, interval, KLINES, kline_records(klines), only_newer) if klines else 0
+
+    def append_ratios(self, symbol, interval, kind, items, only_newer=True):
+        return self.append(symbol, interval, kind, ratio_records(items), only_newer) if items else 0
+
+    # --- read ---
+    def _map(self, path, dtype):
+        if not os.path.exists(path):
+            return np.empty(0, dtype=dtype)
+        n = os.path.getsize(path) // dtype.itemsize
+        if n == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+    def read(self, symbol, interval, kind, start=None, end=None):
+        """
+        Records with start <= ts < end, sorted by ts. Zero-copy memmap slice when the
+        file is already sorted and unique (the normal case), otherwise a de-duplicated copy.
+        """
+        data = self._map(self.path(symbol, interval, kind), dtype_for(kind))
+        ts = data["ts"]
+        if len(ts) > 1 and not np.all(ts[1:] > ts[:-1]):
+            data = dedupe(data)
+            ts = data["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+        return data[lo:hi]
+
+    def compact(self, symbol, interval, kind):
+        """
+        Rewrites one file sorted and de-duplicated; returns (records before, after).
+        """
+        path = self.path(symbol, interval, kind)
+        dtype = dtype_for(kind)
+        if not os.path.exists(path):
+            return 0, 0
+        size = os.path.getsize(path)
+        raw = np.fromfile(path, dtype=dtype, count=size // dtype.itemsize)
+        clean = dedupe(raw)
+        if len(clean) == len(raw) and np.array_equal(clean["ts"], raw["ts"]) and size % dtype.itemsize == 0:
+            return len(raw), len(clean)
+        tmp = path + ".tmp"
+        clean.tofile(tmp)
+        os.replace(tmp, path)
+        self.last[path] = int(clean["ts"][-1]) if len(clean) else None
+        return len(raw), len(clean)
+
+    def compact_all(self):
+        return {f"{s}/{i}/{k}": self.compact(s, i, k) for s, i, k in self.series()}
+
+    def analysis_columns(self, symbol, interval, start=None, end=None, max_age=None):
+        """
+        Column arrays: ts, price_ch, cvd, w_ls, r_ls (sentiment joined on the nearest
+        stored point, NaN where there is none within max_age ms).
+        """
+        k = self.read(symbol, interval, KLINES, start, end)
+        whale = self.read(symbol, interval, WHALE)
+        retail = self.read(symbol, interval, RETAIL)
+        ts = np.asarray(k["ts"])
+        open_p = np.asarray(k["open"])
+        buy = np.asarray(k["taker_buy_quote"])
+        return {
+            "ts": ts,
+            "price_ch": np.divide(np.asarray(k["close"]) - open_p, open_p, out=np.zeros(len(ts)), where=open_p != 0) * 100,
+            "cvd": buy - (np.asarray(k["quote_vol"]) - buy),
+            "w_ls": nearest_join(ts, np.asarray(whale["ts"]), np.asarray(whale["value"]), max_age=max_age),
+            "r_ls": nearest_join(ts, np.asarray(retail["ts"]), np.asarray(retail["value"]), max_age=max_age),
+        }
+
+    def iter_rows(self, symbol, interval, start=None, end=None, max_age=None):
+        """
+        (ts, price_ch, cvd, w_ls, r_ls) per candle, with None for missing sentiment.
+        """
+        cols = self.analysis_columns(symbol, interval, start, end, max_age)
+        missing = lambda values: [None if v != v else v for v in values.tolist()]
+        return zip(cols["ts"].tolist(), cols["price_ch"].tolist(), cols["cvd"].tolist(),
+                   missing(cols["w_ls"]), missing(cols["r_ls"]))
+
+    def signal_rows(self, symbol, interval, start=None, end=None, max_age=None):
+        """
+        Classified SignalRows, like main.analyze_klines: a missing ratio counts as an
+        ignored (empty) feed and is classified as NEUTRAL_LS.
+        """
+        rows = [SignalRow(ts, interval, p, c, w, r,
+                          ignore=tuple(name for name, v in (("whale", w), ("retail", r)) if v is None))
+                for ts, p, c, w, r in self.iter_rows(symbol, interval, start, end, max_age)]
+        classify_rows(rows)
+        return rows
+
+
+def dedupe(records):
+    """
+    Sorted by ts, keeping the last written record per ts.
+    """
+    if not len(records):
+        return np.asarray(records)
+    rev = np.asarray(records)[::-1]
+    _, idx = np.unique(rev["ts"], return_index=True)
+    return rev[idx]
+
+
+# --- CLI ---
+async def backfill(store, symbols, intervals, days):
+    """
+    Henter historikk fra Binance (paging med startTime) via main.fetch_url, så cache
+    og rate-limit governor gjelder. Long/short data only goes back ~30 days upstream.
+    Uses its own session; main's shared one belongs to the app.
+    """
+    import time
+    import main
+
+    session = aiohttp.ClientSession()
+    now = int(time.time() * 1000)
+    try:
+        for symbol in symbols:
+            for interval in intervals:
+                step = main.INTERVAL_MS[interval]
+                start = now - days * 86_400_000
+                cursor = start
+                while cursor < now:
+                    url = f"{main.DOMAIN_SPOT}/api/v3/klines?symbol={symbol}&interval={interval}&startTime={cursor}&limit=1000"
+                    klines = await main.fetch_url(session, url)
+                    if not klines: break
+                    store.append_klines(symbol, interval, klines, closed_before=now, only_newer=False)
+                    cursor = int(klines[-1][0]) + step
+                    if len(klines) < 1000: break
+                for kind in (WHALE, RETAIL):
+                    cursor = max(start, now - 30 * 86_400_000)
+                    while cursor < now:
+                        url = f"{main.DOMAIN_FUTURES}/futures/data/{kind}?symbol={symbol}&period={interval}&startTime={cursor}&limit=500"
+                        items = await main.fetch_url(session, url)
+                        if not items: break
+                        store.append_ratios(symbol, interval, kind, items, only_newer=False)
+                        cursor = int(items[-1]['timestamp']) + step
+                        if len(items) < 500: break
+                for kind in KINDS: store.compact(symbol, interval, kind)
+                print(f"{symbol} {interval}: {len(store.read(symbol, interval, KLINES))} klines, "
+                      f"{len(store.read(symbol, interval, WHALE))} whale, {len(store.read(symbol, interval, RETAIL))} retail")
+    finally:
+        await session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="On-disk kline / long-short history")
+    parser.add_argument("--root", default=os.getenv("CVD_HISTORY_DIR", "history"))
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info")
+    sub.add_parser("compact")
+    p_back = sub.add_parser("backfill")
+    p_back.add_argument("--symbols", default="BTCUSDT")
+    p_back.add_argument("--intervals", default="1h,1d")
+    p_back.add_argument("--days", type=int, default=30)
+    p_replay = sub.add_parser("replay")
+    p_replay.add_argument("--symbol", default="BTCUSDT")
+    p_replay.add_argument("--interval", default="1h")
+    p_replay.add_argument("--max-age", type=float, default=1.0,
+                          help="candles between a kline and its nearest long/short point before it counts as missing")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.root)
+    if args.cmd == "info":
+        for symbol, interval, kind in store.series():
+            data = store.read(symbol, interval, kind)
+            span = f"{int(data['ts'][0])} .. {int(data['ts'][-1])}" if len(data) else "-"
+            print(f"{symbol:<12} {interval:<4} {kind:<28} {len(data):>8} records  {span}")
+    elif args.cmd == "compact":
+        for name, (before, after) in store.compact_all().items():
+            print(f"{name}: {before} -> {after}")
+    elif args.cmd == "backfill":
+        asyncio.run(backfill(store, args.symbols.split(","), args.intervals.split(","), args.days))
+    elif args.cmd == "replay":
+        max_age = args.max_age * INTERVAL_MS[args.interval]
+        heads = Counter(row.head for row in store.signal_rows(args.symbol, args.interval, max_age=max_age))
+        for head, n in heads.most_common():
+            print(f"{n:>7}  {head}")
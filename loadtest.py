@@ -0,0 +1,123 @@
+"""
+Lastgenerator for API-et: N samtidige klienter mot en kjørende server.
+
+    python fake_binance.py --latency 80 --jitter 30 &
+    CVD_DOMAIN_SPOT=http://127.0.0.1:9100 CVD_DOMAIN_FUTURES=http://127.0.0.1:9100 python main.py &
+    python loadtest.py --clients 20 --duration 30 --paths /,/html/BTC,/api/v1/ETH --upstream http://127.0.0.1:9100
+
+Reports throughput, latency percentiles (and time to first byte, which matters for the
+streamed HTML) per path, plus upstream-call amplification: calls served by the fake
+upstream per page view, read from its /_stats before and after the run.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+
+
+def percentile(values, p):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def upstream_calls(session, url):
+    if not url: return None
+    try:
+        async with session.get(url.rstrip("/") + "/_stats") as response:
+            return (await response.json())["calls"]
+    except aiohttp.ClientError:
+        return None
+
+
+async def run(base, paths, clients, duration, requests, warmup, upstream, timeout):
+    results = {path: {"latency": [], "ttfb": [], "bytes": 0, "errors": 0, "status": {}} for path in paths}
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        for i in range(warmup):
+            async with session.get(base + paths[i % len(paths)]) as response:
+                await response.read()
+        before = await upstream_calls(session, upstream)
+        deadline = time.monotonic() + duration if duration else None
+        counter = iter(range(requests)) if requests else None
+
+        async def client(n):
+            i = n
+            while True:
+                if deadline is not None and time.monotonic() >= deadline: return
+                if counter is not None and next(counter, None) is None: return
+                path = paths[i % len(paths)]
+                i += 1
+                r = results[path]
+                t0 = time.perf_counter()
+                try:
+                    async with session.get(base + path) as response:
+                        first = True; size = 0
+                        async for chunk in response.content.iter_any():
+                            if first: r["ttfb"].append(time.perf_counter() - t0); first = False
+                            size += len(chunk)
+                        r["status"][response.status] = r["status"].get(response.status, 0) + 1
+                        if response.status != 200: r["errors"] += 1
+                        r["bytes"] += size
+                except (asyncio.TimeoutError, aiohttp.ClientError):
+                    r["errors"] += 1
+                    r["status"]["error"] = r["status"].get("error", 0) + 1
+                    continue
+                r["latency"].append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[client(n) for n in range(clients)])
+        wall = time.perf_counter() - t0
+        after = await upstream_calls(session, upstream)
+
+    def summary(lat, ttfb, count, errors, size):
+        return {
+            "requests": count, "errors": errors, "rps": round(count / wall, 1) if wall else 0.0,
+            "p50_ms": round(percentile(lat, 50) * 1000, 1), "p90_ms": round(percentile(lat, 90) * 1000, 1),
+            "p99_ms": round(percentile(lat, 99) * 1000, 1), "max_ms": round(max(lat, default=0) * 1000, 1),
+            "ttfb_p50_ms": round(percentile(ttfb, 50) * 1000, 1), "kb": round(size / 1024),
+        }
+
+    report = {"wall_s": round(wall, 2), "clients": clients, "paths": {}}
+    all_lat = []; all_ttfb = []; total = 0; errors = 0; size = 0
+    for path, r in results.items():
+        n = sum(v for v in r["status"].values())
+        report["paths"][path] = {**summary(r["latency"], r["ttfb"], n, r["errors"], r["bytes"]), "status": r["status"]}
+        all_lat += r["latency"]; all_ttfb += r["ttfb"]; total += n; errors += r["errors"]; size += r["bytes"]
+    report["total"] = summary(all_lat, all_ttfb, total, errors, size)
+    if before is not None and after is not None:
+        report["upstream_calls"] = after - before
+        report["upstream_per_view"] = round((after - before) / total, 3) if total else None
+    return report
+
+
+def print_report(report):
+    print(f"{report['clients']} clients, {report['wall_s']}s")
+    width = max(28, *(len(path) + 2 for path in report["paths"]))
+    print(f"\n{'path':<{width}}{'req':>7}{'err':>6}{'rps':>8}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}{'ttfb50':>8}")
+    for path, s in list(report["paths"].items()) + [("TOTAL", report["total"])]:
+        print(f"{path:<{width}}{s['requests']:>7}{s['errors']:>6}{s['rps']:>8.1f}{s['p50_ms']:>8.1f}{s['p90_ms']:>8.1f}"
+              f"{s['p99_ms']:>8.1f}{s['max_ms']:>8.1f}{s['ttfb_p50_ms']:>8.1f}")
+    if "upstream_calls" in report:
+        print(f"\nupstream calls: {report['upstream_calls']} ({report['upstream_per_view']} per page view)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the CVD API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--paths", default="/,/html/BTC,/api/v1/ETH", help="comma-separated, requested round-robin")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10, help="seconds (ignored with --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=0, help="sequential requests before measuring")
+    parser.add_argument("--upstream", help="fake_binance.py base URL, for upstream-call amplification")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    paths = [p if p.startswith("/") else "/" + p for p in args.paths.split(",") if p]
+    report = asyncio.run(run(args.url.rstrip("/"), paths, args.clients, 0 if args.requests else args.duration,
+                             args.requests, args.warmup, args.upstream, args.timeout))
+    if args.json: print(json.dumps(report, indent=2))
+    else: print_report(report)
@@ -1,9 +1,38 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 import aiohttp
 import asyncio
-from datetime import datetime, timezone
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+from urllib.parse import urlsplit, parse_qs
+
+from cache import TTLCache
+from deadline import Budget, LatencyWindow, budget_scope, current_budget, hedged
+from governor import RateGovernor, RequestShed, backoff_delay
+from candles import INTERVAL_MS, CandleStore, SentimentSeries, aggregate_klines, daily_lookback, format_label
+from feed_health import DEGRADED, EMPTY, OK, FeedTracker
+from history_store import HistoryStore
+from observability import ProfileMiddleware, Registry, current_profile, profile_add, setup_logging, timed
+from scheduler import RefreshScheduler
+from shared_cache import SharedCache, open_backend
+from signal_diff import EventFilter, SignalDiff, WebhookDispatcher
+from signal_engine import NEUTRAL_LS, Signal, SignalRow, classify_rows, conditions_met, ignore_note
+from streams import WS_BASE, Broadcaster, LiveCandles, StreamClient, stream_names
+
+# Optional: faster JSON serialization and brotli compression for the /api/v1 endpoints
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = FastAPI(title="CVD API v8.3 - Small-Cap Optimized", version="8.3")
 
@@ -13,28 +42,321 @@ app.add_middleware(
     allow_methods=["GET"],
     allow_headers=["*"],
 )
+# ?profile=1 on any route: stage timings in a Server-Timing header (and in the JSON body for /api/v1)
+app.add_middleware(ProfileMiddleware)
+
+# --- LOGGING & METRICS ---
+# CVD_LOG_LEVEL=DEBUG also logs the healthy sentiment checks; CVD_LOG_FORMAT=json for log shippers
+setup_logging(os.getenv("CVD_LOG_LEVEL", "INFO"), os.getenv("CVD_LOG_FORMAT", "text"))
+upstream_log = logging.getLogger("cvd.upstream")
+sentiment_log = logging.getLogger("cvd.sentiment")
+log = logging.getLogger("cvd.app")
+
+metrics = Registry()
+UPSTREAM_SECONDS = metrics.histogram("cvd_upstream_request_seconds", "Binance request latency per endpoint", ("endpoint",))
+UPSTREAM_RESPONSES = metrics.counter("cvd_upstream_responses_total", "Binance responses per endpoint and status (error/shed without a response)", ("endpoint", "status"))
+STAGE_SECONDS = metrics.histogram("cvd_stage_seconds", "Time per pipeline stage (classify is one batch per analyze_klines call)", ("stage",))
+ROWS_ANALYZED = metrics.counter("cvd_rows_analyzed_total", "Rows classified (new or changed candles)", ("interval",))
+ROWS_REUSED = metrics.counter("cvd_rows_reused_total", "Rows reused unchanged from the analysis memo", ("interval",))
+FROZEN_DATA = metrics.counter("cvd_frozen_data_total", "Sentiment feeds entering a frozen, low-variance, stale or empty state", ("endpoint", "kind"))
+CACHE_REQUESTS = metrics.counter("cvd_cache_requests_total", "Upstream response cache lookups by result", ("result",))
+CACHE_EVICTIONS = metrics.counter("cvd_cache_evictions_total", "Upstream response cache LRU evictions")
+CACHE_BYTES = metrics.gauge("cvd_cache_bytes", "Upstream response cache size")
+UPSTREAM_HEDGES = metrics.counter("cvd_upstream_hedges_total", "Hedged Binance requests by which copy answered first", ("endpoint", "winner"))
+DEADLINE_MISSES = metrics.counter("cvd_deadline_misses_total", "Upstream calls answered from stored data because the request budget ran out", ("endpoint",))
+SHARED_CACHE_ERRORS = metrics.counter("cvd_shared_cache_errors_total", "Shared cache backend errors answered by a direct fetch", ("op",))
+SIGNAL_CHANGES = metrics.counter("cvd_signal_changes_total", "Closed candles whose signal head changed from the previous closed candle", ("interval",))
+
+# Point both at fake_binance.py (e.g. http://127.0.0.1:9100) for load tests
+DOMAIN_SPOT = os.getenv("CVD_DOMAIN_SPOT", "https://api.binance.com").rstrip("/")
+DOMAIN_FUTURES = os.getenv("CVD_DOMAIN_FUTURES", "https://fapi.binance.com").rstrip("/")
+
+# --- SHARED UPSTREAM CONNECTION POOL ---
+# One ClientSession for the whole app lifetime, so the TCP+TLS handshakes to
+# api.binance.com / fapi.binance.com are paid once and then reused (keep-alive).
+UPSTREAM_LIMIT = int(os.getenv("CVD_UPSTREAM_LIMIT", "100"))
+UPSTREAM_LIMIT_PER_HOST = int(os.getenv("CVD_UPSTREAM_LIMIT_PER_HOST", "30"))
+UPSTREAM_KEEPALIVE = float(os.getenv("CVD_UPSTREAM_KEEPALIVE", "60"))
+UPSTREAM_DNS_TTL = int(os.getenv("CVD_UPSTREAM_DNS_TTL", "300"))
+
+http_session = None
+
+def get_session():
+    """
+    Returnerer den delte ClientSession (opprettes ved første bruk)
+    """
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=UPSTREAM_LIMIT,
+            limit_per_host=UPSTREAM_LIMIT_PER_HOST,
+            keepalive_timeout=UPSTREAM_KEEPALIVE,
+            ttl_dns_cache=UPSTREAM_DNS_TTL,
+            use_dns_cache=True,
+        )
+        http_session = aiohttp.ClientSession(connector=connector)
+    return http_session
+
+@app.on_event("startup")
+async def open_http_session():
+    get_session()
+
+@app.on_event("shutdown")
+async def close_http_session():
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+# --- UPSTREAM RESPONSE CACHE ---
+# TTL per interval: a 15m candle moves within seconds, a 1M candle barely within minutes
+CACHE_MAX_BYTES = int(os.getenv("CVD_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = {"5m": 5, "15m": 10, "1h": 30, "4h": 60, "1d": 120, "1w": 300, "1M": 600}
+CACHE_TTL_DEFAULT = 10
+# Listings change rarely (screener universe)
+CACHE_TTL_PATHS = {"/fapi/v1/exchangeInfo": 3600, "/api/v3/ticker/price": 3600}
 
-DOMAIN_SPOT = "https://api.binance.com"
-DOMAIN_FUTURES = "https://fapi.binance.com"
+url_cache = TTLCache(CACHE_MAX_BYTES)
+
+def cache_ttl(url):
+    parts = urlsplit(url)
+    if parts.path in CACHE_TTL_PATHS: return CACHE_TTL_PATHS[parts.path]
+    query = parse_qs(parts.query)
+    interval = (query.get("interval") or query.get("period") or [None])[0]
+    return CACHE_TTL.get(interval, CACHE_TTL_DEFAULT)
+
+# --- UPSTREAM RATE-LIMIT GOVERNOR ---
+# Binance weight limits per IP and minute (spot 6000, USD-M futures 2400)
+governors = {
+    "spot": RateGovernor("spot", int(os.getenv("CVD_SPOT_WEIGHT_LIMIT", "6000")),
+                              max_wait=float(os.getenv("CVD_GOVERNOR_MAX_WAIT", "10"))),
+    "futures": RateGovernor("futures", int(os.getenv("CVD_FUTURES_WEIGHT_LIMIT", "2400")),
+                                 max_wait=float(os.getenv("CVD_GOVERNOR_MAX_WAIT", "10"))),
+}
+UPSTREAM_TIMEOUT = float(os.getenv("CVD_UPSTREAM_TIMEOUT", "10"))
+UPSTREAM_RETRIES = int(os.getenv("CVD_UPSTREAM_RETRIES", "2"))
+
+def governor_for(url):
+    # By path, so it also holds when both domains point at the same stand-in server
+    return governors["spot"] if urlsplit(url).path.startswith("/api/") else governors["futures"]
+
+def request_weight(url):
+    # /api/v3/klines costs 2, all-symbol ticker/price 4, the futures endpoints 1
+    if "/api/v3/klines" in url: return 2
+    if "/api/v3/ticker/price" in url: return 4
+    return 1
+
+def upstream_endpoint(url):
+    # Metric label: last path segment (klines, topLongShortPositionRatio, exchangeInfo, ...)
+    return urlsplit(url).path.rsplit("/", 1)[-1]
+
+# --- HEDGED REQUESTS ---
+# A request still running after its endpoint's recent p95 gets a second copy; the first answer wins.
+# Hedges only go out while the governor has at least half its weight budget left.
+HEDGE_ENABLED = os.getenv("CVD_HEDGE", "1") == "1"
+HEDGE_QUANTILE = float(os.getenv("CVD_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = 0.05
+upstream_latency = {}  # endpoint -> LatencyWindow of successful requests
+
+def hedge_delay(endpoint):
+    window = upstream_latency.get(endpoint)
+    if not HEDGE_ENABLED or window is None: return None
+    q = window.quantile(HEDGE_QUANTILE)
+    return None if q is None else max(q, HEDGE_MIN_DELAY)
+
+async def _get(session, url, governor, endpoint):
+    # One GET: (status, data, size)
+    t0 = time.perf_counter()
+    with timed(UPSTREAM_SECONDS, f"upstream:{endpoint}", endpoint=endpoint):
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=UPSTREAM_TIMEOUT)) as response:
+            governor.observe(response.status, response.headers)
+            UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=response.status)
+            if response.status != 200: return response.status, None, 0
+            data = await response.json()
+            size = len(await response.read())
+    upstream_latency.setdefault(endpoint, LatencyWindow()).add(time.perf_counter() - t0)
+    return 200, data, size
+
+async def _fetch_url(session, url):
+    governor = governor_for(url)
+    weight = request_weight(url)
+    endpoint = upstream_endpoint(url)
+    for attempt in range(UPSTREAM_RETRIES + 1):
+        try:
+            await governor.acquire(weight)
+        except RequestShed as e:
+            UPSTREAM_RESPONSES.inc(endpoint=endpoint, status="shed")
+            upstream_log.warning("request shed", extra={"url": url, "reason": str(e)})
+            return None, 0
+        try:
+            (status, data, size), winner = await hedged(
+                lambda: _get(session, url, governor, endpoint), hedge_delay(endpoint),
+                lambda: governor.try_acquire(weight), ok=lambda result: result[0] == 200)
+            if winner is not None: UPSTREAM_HEDGES.inc(endpoint=endpoint, winner=winner)
+            if status == 200: return data, size
+            if status == 418 or (400 <= status < 500 and status != 429):
+                # 418 = IP ban, other 4xx = bad request: retrying only makes it worse
+                upstream_log.warning("request failed", extra={"url": url, "status": status})
+                return None, 0
+            upstream_log.warning("request failed, retrying", extra={"url": url, "status": status, "attempt": attempt + 1})
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError) as e:
+            # ValueError: a malformed or truncated JSON body
+            UPSTREAM_RESPONSES.inc(endpoint=endpoint, status="error")
+            upstream_log.warning("request failed, retrying", extra={"url": url, "error": repr(e), "attempt": attempt + 1})
+        if attempt < UPSTREAM_RETRIES:
+            # 429 waits are handled by the governor's Retry-After block on the next acquire
+            await asyncio.sleep(backoff_delay(attempt))
+    return None, 0
 
 async def fetch_url(session, url):
+    """
+    Upstream JSON for url, or None. Inside a request budget (deadline.budget_scope) the
+    wait is cut off when the budget runs out: the caller then gets None and works from its
+    stored data, the call is recorded as late, and the fetch finishes in the background
+    (its response lands in url_cache for the next view).
+    """
+    # Concurrent callers for the same URL share one in-flight request
+    fetch = lambda: _fetch_url(session, url)
+    if shared is not None:
+        # ...and across worker processes: one of them fetches, the others read its response
+        fetch = lambda: shared_fetch(session, url)
+    budget = current_budget.get()
+    if budget is None: return await url_cache.get_or_fetch(url, fetch, cache_ttl(url))
+    cached = url_cache.peek(url)
+    if cached is not None: return cached
+    call = asyncio.ensure_future(url_cache.get_or_fetch(url, fetch, cache_ttl(url)))
+    done, _ = await asyncio.wait({call}, timeout=max(budget.remaining(), 0.0))
+    if done: return call.result()
+    endpoint = upstream_endpoint(url)
+    query = parse_qs(urlsplit(url).query)
+    budget.late.add((query.get("symbol", [""])[0], (query.get("interval") or query.get("period") or [""])[0], endpoint))
+    DEADLINE_MISSES.inc(endpoint=endpoint)
+    return None
+
+async def shared_fetch(session, url):
+    """
+    Shared-tier single-flight. A backend error (locked SQLite, Redis down) falls back to
+    a direct fetch: the shared tier may make requests cheaper but must never fail them.
+    """
+    result = []
+    async def fetch():
+        result.append(await _fetch_url(session, url))
+        return result[-1]
     try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
+        return await shared.get_or_fetch("url:" + url, fetch, cache_ttl(url), SHARED_LOCK_TTL)
     except Exception as e:
-        print(f"Error fetching {url}: {e}")
-    return None
+        if result: return result[-1]  # fetched fine, only storing it failed
+        shared_error("get_or_fetch", e)
+        return await _fetch_url(session, url)
+
+def shared_error(op, error):
+    SHARED_CACHE_ERRORS.inc(op=op)
+    # One warning per SHARED_ERROR_LOG_INTERVAL: a dead backend would otherwise log every request
+    global shared_error_logged
+    now = time.monotonic()
+    if now - shared_error_logged >= SHARED_ERROR_LOG_INTERVAL:
+        shared_error_logged = now
+        log.warning("shared cache unavailable, fetching directly", extra={"op": op, "error": repr(error)})
+
+# --- MULTI-WORKER SHARED CACHE TIER ---
+# CVD_WORKERS=N runs N worker processes sharing upstream responses and the scheduler
+# snapshots through CVD_SHARED_CACHE (redis://host:6379/0 or sqlite:///path/cache.db).
+# One process holds the leader lease and runs the scheduler; the others read its snapshots.
+WORKERS = int(os.getenv("CVD_WORKERS", "1"))
+SHARED_CACHE_URL = os.getenv("CVD_SHARED_CACHE") or (
+    f"sqlite:///{os.path.join(tempfile.gettempdir(), 'cvd-shared-cache.db')}" if WORKERS > 1 else None)
+LEADER_LEASE = float(os.getenv("CVD_LEADER_LEASE", "10"))
+SNAPSHOT_SYNC_INTERVAL = 2.0
+# Covers governor queueing plus every retry of one upstream fetch
+SHARED_LOCK_TTL = UPSTREAM_TIMEOUT * (UPSTREAM_RETRIES + 2)
+SHARED_ERROR_LOG_INTERVAL = 30.0
+shared_error_logged = float("-inf")
+
+shared = SharedCache(open_backend(SHARED_CACHE_URL)) if SHARED_CACHE_URL else None
+is_leader = shared is None
+
+# --- INCREMENTAL CANDLE / SENTIMENT STORE ---
+candle_store = CandleStore()
+
+# --- PERSISTENT HISTORY (backtesting) ---
+# Set CVD_HISTORY_DIR to keep closed klines and long/short points on disk between runs
+HISTORY_DIR = os.getenv("CVD_HISTORY_DIR")
+history = HistoryStore(HISTORY_DIR) if HISTORY_DIR else None
+
+# Appends go through one background writer, so file I/O never runs on the event loop
+# and two writes to the same file never overlap
+history_queue = asyncio.Queue()
+history_task = None
+
+def history_append(method, *args, **kwargs):
+    history_queue.put_nowait((method, args, kwargs))
+
+async def write_history():
+    method, args, kwargs = await history_queue.get()
+    try:
+        await asyncio.to_thread(method, *args, **kwargs)
+    except Exception as e:
+        log.warning("history write failed", extra={"error": repr(e)})
+
+async def history_writer():
+    while True: await write_history()
+
+@app.on_event("startup")
+async def compact_history():
+    global history_task
+    if history is not None:
+        await asyncio.to_thread(history.compact_all)
+        history_task = asyncio.ensure_future(history_writer())
+
+async def stop_history_writer():
+    if history_task is None: return
+    history_task.cancel()
+    try:
+        await history_task
+    except asyncio.CancelledError:
+        pass
+    while not history_queue.empty(): await write_history()
+
+# Stop hooks inserted further down run before this one, so producers have stopped before the flush
+app.router.on_shutdown.insert(0, stop_history_writer)
+
+def kline_ts(k):
+    return int(k[0])
+
+def sentiment_ts(item):
+    return int(item['timestamp'])
+
+def sentiment_value(item):
+    return float(item['longShortRatio'])
+
+# --- SENTIMENT FEED HEALTH ---
+# Rolling stats per (symbol, period, endpoint), updated only with new points
+feeds = FeedTracker(
+    window=int(os.getenv("CVD_FEED_WINDOW", "48")),
+    frozen_run=int(os.getenv("CVD_FEED_FROZEN_RUN", "12")),
+)
+# Frozen/stale/empty whale or retail feeds are ignored by get_signal instead of read as sentiment
+FEED_DEGRADE = os.getenv("CVD_FEED_DEGRADE", "1") == "1"
+# key -> (first item, last item, count, SentimentSeries); rebuilt only when the stored window changed
+sentiment_series = {}
 
 # --- WHALE & RETAIL ANALYSIS ENGINE (v8.3 SMALL-CAP OPTIMIZED) ---
-def get_signal(price_ch, cvd_val, whale_ls, retail_ls):
+def get_signal(price_ch, cvd_val, whale_ls, retail_ls, ignore=()):
     """
     v8.3 SMALL-CAP OPTIMIZATIONS:
     - Fix 1: Low conviction / range-bound detection (reduce "NØYTRAL" spam)
     - Fix 2: Relaxed thresholds for small-cap parabolic dumps
     - Fix 3: Whale disinterest signal (both neutral)
     - Fix 4: Symmetric whale logic (better handling of chronic short bias)
+
+    ignore: feeds ("whale"/"retail") with frozen/stale/missing data; they count as neutral (1.0),
+    as do None ratios (no data) - the same rule as SignalRow.signal_inputs.
     """
+    if ignore or whale_ls is None or retail_ls is None:
+        if whale_ls is None or "whale" in ignore: whale_ls = NEUTRAL_LS
+        if retail_ls is None or "retail" in ignore: retail_ls = NEUTRAL_LS
+        head, desc, col = get_signal(price_ch, cvd_val, whale_ls, retail_ls)
+        return head, desc + ignore_note(ignore) if ignore else desc, col
     
     # Default
     head = "⚖️ NØYTRAL"; desc = "Ingen klare avvik."; col = "#888"
@@ -351,7 +673,7 @@ def get_signal(price_ch, cvd_val, whale_ls, retail_ls):
 
 async def get_sentiment_history(session, symbol, period, limit, endpoint):
     """
-    Henter sentiment history med DEBUG-logging for å oppdage frosne data
+    Henter sentiment history; feed-helsen (frosne/stale data) oppdateres inkrementelt
     """
     # Mapping limits
     req_limit = limit
@@ -359,42 +681,60 @@ async def get_sentiment_history(session, symbol, period, limit, endpoint):
     if period == '1M': period = '1d'; req_limit = limit * 30
     if req_limit > 499: req_limit = 499
     
-    url = f"{DOMAIN_FUTURES}/futures/data/{endpoint}?symbol={symbol}&period={period}&limit={req_limit}"
-    data = await fetch_url(session, url)
+    key = (symbol, period, endpoint)
+    start = candle_store.start_time(key, req_limit, period)
+    url = f"{DOMAIN_FUTURES}/futures/data/{endpoint}?symbol={symbol}&period={period}&limit={candle_store.window(key, req_limit)}"
+    if start is not None: url += f"&startTime={start}"
+    fetched = await fetch_url(session, url)
+    data = candle_store.merge(key, fetched, sentiment_ts, req_limit)
+    if history is not None and fetched: history_append(history.append_ratios, symbol, period, endpoint, fetched)
     
-    res_map = {}
-    if data:
-        # DEBUG: Check for frozen/identical data
-        ratios = [float(item['longShortRatio']) for item in data]
-        unique_ratios = set(ratios)
-        
-        if len(unique_ratios) == 1:
-            print(f"⚠️ DEBUG WARNING: All {endpoint} ratios are IDENTICAL ({ratios[0]:.2f}) for {symbol} - Data may be frozen!")
-        elif len(unique_ratios) < 3:
-            print(f"⚠️ DEBUG WARNING: Only {len(unique_ratios)} unique {endpoint} ratios for {symbol} - Low variance detected!")
-        else:
-            print(f"✅ DEBUG OK: {endpoint} has {len(unique_ratios)} unique ratios for {symbol} (healthy variance)")
-        
-        for item in data:
-            val = float(item['longShortRatio'])
-            res_map[int(item['timestamp'])] = val
-    else:
-        print(f"❌ DEBUG ERROR: No data returned from {endpoint} for {symbol}")
+    feeds.update(key, fetched, sentiment_ts, sentiment_value)
+    status = feeds.status(key, INTERVAL_MS[period], int(time.time() * 1000))
+    prev = feeds.states.get(key)
+    if status != prev:
+        feeds.states[key] = status
+        fields = {"symbol": symbol, "endpoint": endpoint, "period": period, "status": status, "previous": prev}
+        if status != OK:
+            FROZEN_DATA.inc(endpoint=endpoint, kind=status)
+            sentiment_log.warning("sentiment feed degraded", extra=fields)
+        elif prev is not None:
+            sentiment_log.info("sentiment feed recovered", extra=fields)
     
-    return res_map
+    cached = sentiment_series.get(key)
+    if data and cached is not None and cached[0] is data[0] and cached[1] is data[-1] and cached[2] == len(data):
+        series = cached[3]
+    else:
+        series = SentimentSeries.from_items(data) if data else SentimentSeries()
+        if data: sentiment_series[key] = (data[0], data[-1], len(data), series)
+    series.status = status
+    return series
 
-def get_closest(ts, data_map):
-    if not data_map: return 0.0
-    if ts in data_map: return data_map[ts]
-    keys = list(data_map.keys())
-    if not keys: return 0.0
-    closest_ts = min(keys, key=lambda k: abs(k - ts))
-    return data_map[closest_ts]
+def get_closest(ts, series, max_age=None):
+    # Bisect lookup in the sorted sentiment arrays; None when there is no (fresh enough) data,
+    # so a failed fetch never shows up as a 0.0 ratio
+    return series.nearest(ts, None, max_age)
 
-async def get_kline_analysis(session, symbol, interval, limit):
+def feed_flags(statuses):
+    """
+    (stale, ignore) from (("whale", status), ("retail", status)).
+    stale: degraded feeds, flagged on the rows. ignore: feeds classified as NEUTRAL_LS -
+    missing data (empty) always, frozen/stale data when FEED_DEGRADE is on.
+    """
+    stale = tuple(name for name, status in statuses if status in DEGRADED)
+    ignore = stale if FEED_DEGRADE else tuple(name for name, status in statuses if status == EMPTY)
+    return stale, ignore
+
+async def fetch_kline_inputs(session, symbol, interval, limit):
     # 1. Spot Price & CVD
-    kline_url = f"{DOMAIN_SPOT}/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}"
-    klines = await fetch_url(session, kline_url)
+    # Only candles from the last stored (still open) one are fetched once the store is warm
+    key = (symbol, interval, "klines")
+    start = candle_store.start_time(key, limit, interval)
+    kline_url = f"{DOMAIN_SPOT}/api/v3/klines?symbol={symbol}&interval={interval}&limit={candle_store.window(key, limit)}"
+    if start is not None: kline_url += f"&startTime={start}"
+    fetched = await fetch_url(session, kline_url)
+    klines = candle_store.merge(key, fetched, kline_ts, limit)
+    if history is not None and fetched: history_append(history.append_klines, symbol, interval, fetched, closed_before=int(time.time() * 1000))
     
     # 2. Whale Sentiment (Top Trader Positions)
     whale_task = get_sentiment_history(session, symbol, interval, limit, "topLongShortPositionRatio")
@@ -402,12 +742,23 @@ async def get_kline_analysis(session, symbol, interval, limit):
     retail_task = get_sentiment_history(session, symbol, interval, limit, "globalLongShortAccountRatio")
     
     whale_map, retail_map = await asyncio.gather(whale_task, retail_task)
-    
-    rows = []
+    return klines, whale_map, retail_map
+
+def analyze_klines(symbol, interval, klines, whale_map, retail_map):
+    t_start = time.perf_counter(); t_classify = 0.0; reused = 0
+    rows = []; fresh = []
+    # Degraded sentiment feeds are flagged on every row (and classified as neutral if enabled)
+    stale, ignore = feed_flags((("whale", whale_map.status), ("retail", retail_map.status)))
+    # Analyzed rows are reused while their inputs are unchanged, so in practice
+    # only the newest (open) candle gets classified again
+    prev = candle_store.analyzed.get((symbol, interval), {})
+    analyzed = {}
+    # A ratio more than one candle away from the open belongs to another candle
+    # (e.g. old monthly rows beyond the sentiment endpoints' 30-day history)
+    max_age = INTERVAL_MS[interval]
     if klines:
         for k in klines:
             ts = int(k[0])
-            dt_obj = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
             
             open_p = float(k[1]); close_p = float(k[4])
             buy_vol = float(k[10]); sell_vol = float(k[7]) - buy_vol
@@ -416,60 +767,108 @@ async def get_kline_analysis(session, symbol, interval, limit):
             cvd = buy_vol - sell_vol
             
             # Sentiment Lookup
-            w_ls = get_closest(ts, whale_map)
-            r_ls = get_closest(ts, retail_map)
-            
-            # Labels
-            if interval == '15m': label = dt_obj.strftime("%d/%m %H:%M")
-            elif interval == '1h': label = dt_obj.strftime("%d/%m %H:00")
-            elif interval == '1d': label = dt_obj.strftime("%Y-%m-%d")
-            elif interval == '1w': label = f"Uke {dt_obj.strftime('%W')}"
-            elif interval == '1M': label = dt_obj.strftime("%B")
-            else: label = str(ts)
-            
-            head, desc, col = get_signal(price_ch, cvd, w_ls, r_ls)
+            w_ls = get_closest(ts, whale_map, max_age)
+            r_ls = get_closest(ts, retail_map, max_age)
             
-            rows.append({
-                "label": label, "price_ch": price_ch, "cvd": cvd,
-                "w_ls": w_ls, "r_ls": r_ls,
-                "head": head, "desc": desc, "col": col
-            })
+            row = prev.get(ts)
+            if row is not None and row.same_inputs(price_ch, cvd, w_ls, r_ls, stale):
+                reused += 1
+            else:
+                row = SignalRow(ts, interval, price_ch, cvd, w_ls, r_ls, stale=stale, ignore=ignore)
+                fresh.append(row)
+            analyzed[ts] = row
+            rows.append(row)
     
+    if fresh:
+        t0 = time.perf_counter()
+        classify_rows(fresh)
+        t_classify = time.perf_counter() - t0
+    if len(analyzed) >= len(prev): candle_store.analyzed[(symbol, interval)] = analyzed
+    else:
+        # Shallower window (screener): keep the deeper memo, but no deeper than it was,
+        # so the rows it rolls past do not pile up
+        depth = len(prev); prev.update(analyzed)
+        for ts in sorted(prev)[:len(prev) - depth]: del prev[ts]
+    emit_transitions(symbol, interval, rows)
+    ROWS_ANALYZED.inc(len(fresh), interval=interval)
+    ROWS_REUSED.inc(reused, interval=interval)
+    STAGE_SECONDS.observe(t_classify, stage="classify"); profile_add("classify", t_classify)
+    elapsed = time.perf_counter() - t_start
+    STAGE_SECONDS.observe(elapsed, stage="analyze_klines"); profile_add("analyze_klines", elapsed)
     return list(reversed(rows))
 
+async def get_kline_analysis(session, symbol, interval, limit):
+    with timed(STAGE_SECONDS, "get_kline_analysis", stage="get_kline_analysis"):
+        klines, whale_map, retail_map = await fetch_kline_inputs(session, symbol, interval, limit)
+        return analyze_klines(symbol, interval, klines, whale_map, retail_map)
+
+async def get_daily_derived_analysis(session, symbol, days, weeks, months):
+    """
+    1d-, 1w- og 1M-tabellene fra én daglig kline-henting + én daglig sentiment-henting per endpoint.
+    Weekly/monthly candles are aggregated locally, so they always agree with the daily rows.
+    """
+    lookback = max(days, daily_lookback(months, weeks))
+    klines, whale_map, retail_map = await fetch_kline_inputs(session, symbol, "1d", lookback)
+    monthly = analyze_klines(symbol, "1M", aggregate_klines(klines, "1M")[-months:], whale_map, retail_map)
+    weekly = analyze_klines(symbol, "1w", aggregate_klines(klines, "1w")[-weeks:], whale_map, retail_map)
+    daily = analyze_klines(symbol, "1d", klines[-days:], whale_map, retail_map)
+    return monthly, weekly, daily
+
+# Shown instead of a ratio when the long/short feed had no data for the candle
+MISSING_RATIO = "–"
+
 def render_table_rows(rows):
-    html = ""
+    t0 = time.perf_counter()
+    parts = []
     for r in rows:
-        p_col = "#00ff9d" if r['price_ch'] >= 0 else "#ff4d4d"
+        p_col = "#00ff9d" if r.price_ch >= 0 else "#ff4d4d"
         
-        if abs(r['cvd']) > 1_000_000: cvd_fmt = f"${r['cvd']/1_000_000:+.1f}M"
-        else: cvd_fmt = f"${r['cvd']/1_000:+.0f}k"
-        cvd_col = "#00ff9d" if r['cvd'] >= 0 else "#ff4d4d"
+        if abs(r.cvd) > 1_000_000: cvd_fmt = f"${r.cvd/1_000_000:+.1f}M"
+        else: cvd_fmt = f"${r.cvd/1_000:+.0f}k"
+        cvd_col = "#00ff9d" if r.cvd >= 0 else "#ff4d4d"
         
         # Whale Color: Green if Long Bias (>1.0), Red if Short Bias (<0.9), Gray neutral
-        w_col = "#00ff9d" if r['w_ls'] > 1.0 else ("#ff4d4d" if r['w_ls'] < 0.9 else "#aaa")
+        if r.w_ls is None: w_col = "#666"; w_txt = MISSING_RATIO
+        else: w_col = "#00ff9d" if r.w_ls > 1.0 else ("#ff4d4d" if r.w_ls < 0.9 else "#aaa"); w_txt = f"{r.w_ls:.2f}"
         
         # Retail Color: Red if overly Long (>2.0 - contrarian), Green if Fearful (<1.0), Gray neutral
-        r_col = "#ff4d4d" if r['r_ls'] > 2.0 else ("#00ff9d" if r['r_ls'] < 1.0 else "#aaa")
+        if r.r_ls is None: r_col = "#666"; r_txt = MISSING_RATIO
+        else: r_col = "#ff4d4d" if r.r_ls > 2.0 else ("#00ff9d" if r.r_ls < 1.0 else "#aaa"); r_txt = f"{r.r_ls:.2f}"
         
-        html += f"""
+        # Signal text is rendered here, not stored on the row
+        head, desc, col = r.text()
+        parts.append(f"""
         <tr style="border-bottom: 1px solid #222;">
-        <td style="padding: 8px; color: #aaa; font-size: 0.9em; white-space: nowrap;">{r['label']}</td>
-        <td style="padding: 8px; color: {p_col}; font-weight: bold;">{r['price_ch']:+.2f}%</td>
+        <td style="padding: 8px; color: #aaa; font-size: 0.9em; white-space: nowrap;">{r.label}</td>
+        <td style="padding: 8px; color: {p_col}; font-weight: bold;">{r.price_ch:+.2f}%</td>
         <td style="padding: 8px; color: {cvd_col}; font-family: monospace;">{cvd_fmt}</td>
-        <td style="padding: 8px; color: {w_col}; font-weight: bold;">{r['w_ls']:.2f}</td>
-        <td style="padding: 8px; color: {r_col};">{r['r_ls']:.2f}</td>
+        <td style="padding: 8px; color: {w_col}; font-weight: bold;">{w_txt}</td>
+        <td style="padding: 8px; color: {r_col};">{r_txt}</td>
         <td style="padding: 8px;">
-        <div style="color: {r['col']}; font-weight: bold; font-size: 0.8em;">{r['head']}</div>
-        <div style="color: #666; font-size: 0.7em;">{r['desc']}</div>
+        <div style="color: {col}; font-weight: bold; font-size: 0.8em;">{head}</div>
+        <div style="color: #666; font-size: 0.7em;">{desc}</div>
         </td>
         </tr>
-        """
+        """)
+    html = "".join(parts)
+    elapsed = time.perf_counter() - t0
+    STAGE_SECONDS.observe(elapsed, stage="render_table_rows"); profile_add("render_table_rows", elapsed)
     return html
 
-def generate_html_page(symbol, monthly, weekly, daily, hourly, min15):
+# Page sections in display order: interval -> (title, table header)
+SECTIONS = {
+    "15m": ("⚡ Siste 48 Timer - Kvarter (Sniper)", '<tr><th width="10%">Tid</th><th width="10%">Pris %</th><th width="15%">Spot CVD</th><th width="10%">🐋 Whale L/S</th><th width="10%">🐟 Retail L/S</th><th width="45%">Mode 7 Analyse</th></tr>'),
+    "1h": ("⏱️ Siste 7 Dager - Time (Hourly)", '<tr><th>Tid</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>'),
+    "1d": ("📅 Siste 30 Dager - Dag (Daily)", '<tr><th>Dato</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>'),
+    "1w": ("📆 Siste 24 Uker (Weekly)", '<tr><th>Uke</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>'),
+    "1M": ("🌕 Siste 6 Måneder (Monthly)", '<tr><th>Måned</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>'),
+}
+
+COIN_OPEN = """
+    <div class="coin-container" style="margin-bottom: 60px; background: #111; padding: 20px; border-radius: 8px; border: 1px solid #333;">"""
+
+def render_coin_title(symbol):
     return f"""
-    <div class="coin-container" style="margin-bottom: 60px; background: #111; padding: 20px; border-radius: 8px; border: 1px solid #333;">
     <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom: 20px;">
     <h1 style="margin: 0; font-size: 2em;">{symbol.replace('USDT','')} Analysis</h1>
     <div style="font-size: 0.8em; color: #666;">v8.3 Small-Cap</div>
@@ -478,58 +877,690 @@ def generate_html_page(symbol, monthly, weekly, daily, hourly, min15):
     table  width: 100%; border-collapse: collapse; font-size: 0.9em; margin-bottom: 30px; 
     th  text-align: left; padding: 8px; border-bottom: 2px solid #444; color: #aaa; text-transform: uppercase; font-size: 0.7em; 
     </style>
-    
-    <h3 style="color: #00ccff; border-bottom: 1px solid #00ccff; padding-bottom: 5px;">⚡ Siste 48 Timer - Kvarter (Sniper)</h3>
-    <table><tr><th width="10%">Tid</th><th width="10%">Pris %</th><th width="15%">Spot CVD</th><th width="10%">🐋 Whale L/S</th><th width="10%">🐟 Retail L/S</th><th width="45%">Mode 7 Analyse</th></tr>{render_table_rows(min15)}</table>
-    
-    <h3 style="color: #00ccff; border-bottom: 1px solid #00ccff; padding-bottom: 5px;">⏱️ Siste 7 Dager - Time (Hourly)</h3>
-    <table><tr><th>Tid</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>{render_table_rows(hourly)}</table>
-    
-    <h3 style="color: #00ccff; border-bottom: 1px solid #00ccff; padding-bottom: 5px;">📅 Siste 30 Dager - Dag (Daily)</h3>
-    <table><tr><th>Dato</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>{render_table_rows(daily)}</table>
-    
-    <h3 style="color: #00ccff; border-bottom: 1px solid #00ccff; padding-bottom: 5px;">📆 Siste 24 Uker (Weekly)</h3>
-    <table><tr><th>Uke</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>{render_table_rows(weekly)}</table>
-    
-    <h3 style="color: #00ccff; border-bottom: 1px solid #00ccff; padding-bottom: 5px;">🌕 Siste 6 Måneder (Monthly)</h3>
-    <table><tr><th>Måned</th><th>Pris %</th><th>Spot CVD</th><th>🐋 Whale</th><th>🐟 Retail</th><th>Analyse</th></tr>{render_table_rows(monthly)}</table>
-    </div>
     """
 
+def render_section(interval, rows):
+    title, header = SECTIONS[interval]
+    return f"""
+    <h3 style="color: #00ccff; border-bottom: 1px solid #00ccff; padding-bottom: 5px;">{title}</h3>
+    <table>{header}{render_table_rows(rows)}</table>
+    """
+
+def generate_html_page(symbol, monthly, weekly, daily, hourly, min15):
+    tables = {"15m": min15, "1h": hourly, "1d": daily, "1w": weekly, "1M": monthly}
+    parts = [COIN_OPEN, render_coin_title(symbol)]
+    parts.extend(render_section(interval, tables[interval]) for interval in SECTIONS)
+    parts.append("</div>\n    ")
+    return "".join(parts)
+
 BASE_HTML = """<html><head><title>Mode 7: Whale Watch</title><style>body { font-family: -apple-system, BlinkMacSystemFont, sans-serif; background: #050505; color: #e0e0e0; padding: 20px; max-width: 1200px; margin: 0 auto; }</style></head><body>"""
 
+# --- STREAMING HTML ---
+# Sections are flushed in completion order; CSS flex `order` puts them back in page order
+SECTION_ORDER = {interval: i + 1 for i, interval in enumerate(SECTIONS)}
+STREAM_BLOCK_STYLE = "background: #111; padding: 0 20px; border-left: 1px solid #333; border-right: 1px solid #333;"
+
+async def stream_page(symbols):
+    """
+    Sender sideskallet med en gang, deretter hver mynt/tidsramme-seksjon etter hvert som
+    analysen blir ferdig (asyncio.as_completed).
+    """
+    parts = [BASE_HTML, '<div style="display: flex; flex-direction: column;">']
+    for i, sym in enumerate(symbols):
+        parts.append(f'<div class="coin-container" style="order: {i * 10}; {STREAM_BLOCK_STYLE} padding-top: 20px; border-top: 1px solid #333; border-radius: 8px 8px 0 0;">{render_coin_title(sym)}</div>')
+        parts.append(f'<div style="order: {i * 10 + 9}; {STREAM_BLOCK_STYLE} height: 20px; margin-bottom: 60px; border-bottom: 1px solid #333; border-radius: 0 0 8px 8px;"></div>')
+    yield "".join(parts)
+
+    session = get_session()
+    index = {sym: i for i, sym in enumerate(symbols)}
+    budget = Budget(REQUEST_BUDGET) if REQUEST_BUDGET > 0 else None
+
+    async def job(sym, group):
+        current_budget.set(budget)
+        return sym, await analyze_intervals(session, sym, INTERVAL_GROUPS[group])
+
+    for next_done in asyncio.as_completed([job(sym, group) for sym in symbols for group in INTERVAL_GROUPS]):
+        try:
+            sym, results = await next_done
+        except Exception as e:
+            log.exception("stream section failed", extra={"error": repr(e)})
+            continue
+        yield "".join(
+            f'<div style="order: {index[sym] * 10 + SECTION_ORDER[interval]}; {STREAM_BLOCK_STYLE}">{render_section(interval, rows)}</div>'
+            for interval, rows in results.items()
+        )
+    if budget is not None and budget.late:
+        late = [sym for sym in symbols if budget.late_for(sym)]
+        yield "".join(f'<div style="order: {index[sym] * 10 + 8}; {STREAM_BLOCK_STYLE}">{render_late_note(budget, sym)}</div>' for sym in late)
+        for sym in late: revalidate(sym, list(INTERVAL_LIMITS))
+    yield "</div></body></html>"
+
 @app.get("/", response_class=HTMLResponse)
 async def dashboard():
-    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT"]
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_coin_data(session, sym) for sym in symbols]
-        results = await asyncio.gather(*tasks)
-        html = BASE_HTML + "".join(results) + "</body></html>"
-    return html
+    # Precomputed by the refresh scheduler; streamed live until the first refresh is done
+    cached = cached_page(WATCHLIST)
+    if cached is not None:
+        html, age = cached
+        return HTMLResponse(html, headers={"Age": str(age)})
+    return StreamingResponse(stream_page(WATCHLIST), media_type="text/html")
 
 @app.get("/html/{symbol}", response_class=HTMLResponse)
 async def single_coin(symbol: str):
-    clean = symbol.upper()
-    if "USDT" not in clean: clean += "USDT"
-    async with aiohttp.ClientSession() as session:
-        html = BASE_HTML + await fetch_coin_data(session, clean) + "</body></html>"
-    return html
+    clean = normalize_symbol(symbol)
+    cached = cached_page([clean])
+    if cached is not None:
+        html, age = cached
+        return HTMLResponse(html, headers={"Age": str(age)})
+    return StreamingResponse(stream_page([clean]), media_type="text/html")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return url_cache.stats()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@metrics.collector
+def collect_cache_stats():
+    s = url_cache.stats()
+    for result in ("hits", "misses", "coalesced"): CACHE_REQUESTS.set(s[result], result=result)
+    CACHE_EVICTIONS.set(s["evictions"])
+    CACHE_BYTES.set(s["bytes"])
+
+@app.get("/upstream/stats")
+async def upstream_stats():
+    return {g.name: g.stats() for g in governors.values()}
+
+@app.get("/health")
+async def health():
+    """
+    Overall status plus the sentiment feeds that are not healthy.
+    """
+    now_ms = int(time.time() * 1000)
+    counts = {}; problems = {}
+    for key in feeds.feeds:
+        status = feeds.status(key, INTERVAL_MS[key[1]], now_ms)
+        counts[status] = counts.get(status, 0) + 1
+        if status != OK: problems[":".join(key)] = status
+    degraded = any(status in DEGRADED for status in problems.values())
+    return {"status": "degraded" if degraded else "ok", "feeds": counts, "problems": problems}
+
+@app.get("/health/feeds")
+async def health_feeds(symbol: str = ""):
+    now_ms = int(time.time() * 1000)
+    sym = normalize_symbol(symbol) if symbol else None
+    return {":".join(key): feeds.info(key, INTERVAL_MS[key[1]], now_ms)
+            for key in sorted(feeds.feeds) if sym is None or key[0] == sym}
+
+# Window per timeframe
+INTERVAL_LIMITS = {
+    "1M": 6,     # Monthly (6 mnd)
+    "1w": 24,    # Weekly (24 uker)
+    "1d": 30,    # Daily (30 dager)
+    "1h": 168,   # Hourly (168 timer = 7 dager)
+    "15m": 192,  # 15-Min (192 intervaller = 48 timer)
+}
+# Derived from one daily fetch
+DAILY_DERIVED = ("1M", "1w", "1d")
+# Units of work that are fetched together (one group = one set of upstream calls)
+INTERVAL_GROUPS = {"15m": ("15m",), "1h": ("1h",), "1d": DAILY_DERIVED}
+
+async def analyze_intervals(session, sym, intervals):
+    """
+    Analyserte rader per tidsramme; 1d/1w/1M deler én daglig henting.
+    """
+    tasks = {}
+    if any(i in DAILY_DERIVED for i in intervals):
+        tasks["daily"] = get_daily_derived_analysis(session, sym, INTERVAL_LIMITS["1d"], INTERVAL_LIMITS["1w"], INTERVAL_LIMITS["1M"])
+    for i in intervals:
+        if i not in DAILY_DERIVED: tasks[i] = get_kline_analysis(session, sym, i, INTERVAL_LIMITS[i])
+    results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+    if "daily" in results:
+        results["1M"], results["1w"], results["1d"] = results.pop("daily")
+    return {i: results[i] for i in intervals}
 
 async def fetch_coin_data(session, sym):
-    # 1. Monthly (6 mnd)
-    t_mon = get_kline_analysis(session, sym, "1M", 6)
-    # 2. Weekly (24 uker)
-    t_wek = get_kline_analysis(session, sym, "1w", 24)
-    # 3. Daily (30 dager)
-    t_day = get_kline_analysis(session, sym, "1d", 30)
-    # 4. Hourly (168 timer = 7 dager)
-    t_hor = get_kline_analysis(session, sym, "1h", 168)
-    # 5. 15-Min (192 intervaller = 48 timer)
-    t_min15 = get_kline_analysis(session, sym, "15m", 192)
-    
-    mon, wek, day, hor, min15 = await asyncio.gather(t_mon, t_wek, t_day, t_hor, t_min15)
-    return generate_html_page(sym, mon, wek, day, hor, min15)
+    r = await analyze_intervals(session, sym, INTERVAL_LIMITS)
+    return generate_html_page(sym, r["1M"], r["1w"], r["1d"], r["1h"], r["15m"])
+
+# --- REQUEST DEADLINE BUDGET ---
+# Pages and /api/v1 wait at most this long (seconds) for Binance. Calls still running then are
+# answered from the stored candles/ratios, marked as late, and finished in the background. 0 = off.
+REQUEST_BUDGET = float(os.getenv("CVD_REQUEST_BUDGET", "3"))
+# (symbol, intervals) -> background re-analysis after a request ran out of budget
+revalidating = {}
+
+def revalidate(sym, intervals):
+    """
+    Re-runs the analysis without a budget, so the late upstream responses land in the stores
+    (and the analysis memo) without waiting for the next visitor.
+    """
+    key = (sym, tuple(intervals))
+    if key in revalidating: return
+
+    async def run():
+        current_budget.set(None); current_profile.set(None)
+        try:
+            await analyze_intervals(get_session(), sym, intervals)
+        except Exception as e:
+            log.warning("background refresh failed", extra={"symbol": sym, "error": repr(e)})
+        finally:
+            revalidating.pop(key, None)
+
+    revalidating[key] = asyncio.ensure_future(run())
+
+def render_late_note(budget, sym):
+    feeds = ", ".join(f"{interval} {endpoint}" for interval, endpoint in budget.late_for(sym))
+    return (f'<div style="color: #ffa500; font-size: 0.8em; margin-bottom: 20px;">⏳ Binance svarte ikke innen {budget.seconds:g}s '
+            f'({feeds}). Viser sist lagrede data - oppdateres i bakgrunnen.</div>')
+
+# --- JSON / COLUMNAR API (v1) ---
+API_MAX_BATCH_SYMBOLS = int(os.getenv("CVD_API_MAX_BATCH_SYMBOLS", "20"))
+API_COMPRESS_MIN_BYTES = 1024
+
+def normalize_symbol(symbol):
+    clean = symbol.strip().upper()
+    if "USDT" not in clean: clean += "USDT"
+    return clean
+
+def parse_intervals(intervals):
+    if not intervals: return list(INTERVAL_LIMITS)
+    picked = [i.strip() for i in intervals.split(",") if i.strip()]
+    unknown = [i for i in picked if i not in INTERVAL_LIMITS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown interval(s): {', '.join(unknown)}. Use {', '.join(INTERVAL_LIMITS)}")
+    return list(dict.fromkeys(picked))
+
+def to_columns(rows, with_desc=False):
+    """
+    Kolonnebasert tabell: én liste per felt i stedet for én dict per rad (nyeste først).
+    """
+    texts = [r.text() for r in rows]
+    cols = {
+        "ts": [r.ts for r in rows],
+        "label": [r.label for r in rows],
+        "price_ch": [round(r.price_ch, 4) for r in rows],
+        "cvd": [round(r.cvd, 2) for r in rows],
+        "w_ls": [r.w_ls for r in rows],
+        "r_ls": [r.r_ls for r in rows],
+        "head": [t[0] for t in texts],
+        "col": [t[2] for t in texts],
+        "stale": [list(r.stale) or None for r in rows],
+    }
+    if with_desc: cols["desc"] = [t[1] for t in texts]
+    return cols
+
+def json_response(request, payload):
+    prof = current_profile.get()
+    if prof is not None: payload = {**payload, "profile": prof.summary()}
+    if orjson is not None: body = orjson.dumps(payload)
+    else: body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    headers = {"Vary": "Accept-Encoding"}
+    accept = request.headers.get("accept-encoding", "")
+    if len(body) >= API_COMPRESS_MIN_BYTES:
+        if brotli is not None and "br" in accept:
+            body = brotli.compress(body, quality=4); headers["Content-Encoding"] = "br"
+        elif "gzip" in accept:
+            body = gzip.compress(body, compresslevel=5); headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def budgeted_response(request, payload, budget, intervals):
+    """
+    json_response, plus the late-data marker when the budget ran out: "late" lists the
+    feeds served from stored data (with a `Warning: 110` header) and those symbols are
+    refreshed in the background.
+    """
+    if budget is None or not budget.late: return json_response(request, payload)
+    payload["late"] = [{"symbol": sym, "interval": interval, "endpoint": endpoint} for sym, interval, endpoint in sorted(budget.late)]
+    for sym in sorted({sym for sym, _, _ in budget.late}): revalidate(sym, intervals)
+    response = json_response(request, payload)
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    return response
+
+async def symbol_payload(session, sym, intervals, with_desc):
+    results = await analyze_intervals(session, sym, intervals)
+    return {i: to_columns(rows, with_desc) for i, rows in results.items()}
+
+@app.get("/api/v1/batch")
+async def api_batch(request: Request, symbols: str, intervals: str = "", desc: bool = False):
+    syms = list(dict.fromkeys(normalize_symbol(s) for s in symbols.split(",") if s.strip()))
+    if not syms: raise HTTPException(status_code=400, detail="No symbols given")
+    if len(syms) > API_MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Max {API_MAX_BATCH_SYMBOLS} symbols per batch")
+    picked = parse_intervals(intervals)
+    session = get_session()
+    with budget_scope(REQUEST_BUDGET) as budget:
+        payloads = await asyncio.gather(*[symbol_payload(session, sym, picked, desc) for sym in syms])
+    return budgeted_response(request, {"version": app.version, "intervals": picked, "symbols": dict(zip(syms, payloads))}, budget, picked)
+
+# --- SCREENER (USDT-perp universe) ---
+SCREENER_CONCURRENCY = int(os.getenv("CVD_SCREENER_CONCURRENCY", "16"))
+SCREENER_MAX_CANDLES = 50
+
+async def screener_universe(session):
+    """
+    USDT-margined perpetuals som handles, og som også finnes på spot (CVD kommer fra spot-klines).
+    """
+    info, tickers = await asyncio.gather(
+        fetch_url(session, f"{DOMAIN_FUTURES}/fapi/v1/exchangeInfo"),
+        fetch_url(session, f"{DOMAIN_SPOT}/api/v3/ticker/price"),
+    )
+    if not info: raise HTTPException(status_code=502, detail="Futures exchangeInfo unavailable")
+    spot = {t["symbol"] for t in tickers} if tickers else None
+    return sorted(
+        s["symbol"] for s in info["symbols"]
+        if s.get("contractType") == "PERPETUAL" and s.get("quoteAsset") == "USDT" and s.get("status") == "TRADING"
+        and (spot is None or s["symbol"] in spot)
+    )
+
+def parse_signals(signals):
+    picked = [s.strip().upper() for s in signals.split(",") if s.strip()]
+    unknown = [s for s in picked if s not in Signal.__members__]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown signal(s): {', '.join(unknown)}. Use {', '.join(Signal.__members__)}")
+    return {Signal[s] for s in picked}
+
+# Fallback classes (no rule fired, or both crowds in the 0.8-1.2 band) rank after every real signal
+SCREENER_QUIET = (Signal.NEUTRAL, Signal.LOW_CONVICTION, Signal.BALANCED_SENTIMENT)
+
+def screen_rows(results, signals, min_conditions, with_desc):
+    """
+    Keeps the newest matching row per symbol, ranked by signal class (get_signal priority,
+    quiet classes last), then conditions met, candle age and the size of the move.
+    Entry conditions for all rows are scored in one conditions_met batch.
+    """
+    flat = [(sym, age, row) for sym, rows in results for age, row in enumerate(rows)]
+    if not flat: return []
+    # Rows are already classified; the conditions use the same (neutral-substituted) inputs
+    codes = [row.code for _, _, row in flat]
+    met, total = conditions_met(codes, *zip(*(row.signal_inputs() for _, _, row in flat)))
+    picked = {}
+    for i, (sym, age, row) in enumerate(flat):
+        code = Signal(codes[i])
+        if signals and code not in signals: continue
+        if min_conditions and (total[i] == 0 or met[i] < min_conditions): continue
+        if sym in picked:
+            picked[sym]["matches"] += 1
+            continue
+        head, desc, col = row.text()
+        item = {
+            "symbol": sym, "signal": code.name, "head": head, "col": col,
+            "conditions": f"{met[i]}/{total[i]}" if total[i] else None,
+            "ts": row.ts, "label": row.label, "candles_ago": age,
+            "price_ch": round(row.price_ch, 4), "cvd": round(row.cvd, 2), "w_ls": row.w_ls, "r_ls": row.r_ls,
+            "stale": list(row.stale) or None, "matches": 1, "_sort": (code in SCREENER_QUIET, int(code), -int(met[i]), age, -abs(row.price_ch)),
+        }
+        if with_desc: item["desc"] = desc
+        picked[sym] = item
+    ranked = sorted(picked.values(), key=lambda item: item.pop("_sort"))
+    return ranked
+
+@app.get("/api/v1/screener")
+async def api_screener(request: Request, interval: str = "1h", candles: int = 3, signals: str = "",
+                       min_conditions: int = 0, symbols: str = "", limit: int = 100, desc: bool = False):
+    """
+    Screener: siste `candles` lys for ett intervall over hele USDT-perp-universet (eller `symbols`),
+    e.g. ?signals=PARABOLIC_DUMP&min_conditions=2
+    """
+    if interval not in INTERVAL_MS:
+        raise HTTPException(status_code=400, detail=f"Unknown interval: {interval}. Use {', '.join(INTERVAL_MS)}")
+    if not 1 <= candles <= SCREENER_MAX_CANDLES:
+        raise HTTPException(status_code=400, detail=f"candles must be 1-{SCREENER_MAX_CANDLES}")
+    wanted = parse_signals(signals)
+    session = get_session()
+    t0 = time.perf_counter()
+    if symbols: universe = list(dict.fromkeys(normalize_symbol(s) for s in symbols.split(",") if s.strip()))
+    else: universe = await screener_universe(session)
+    sem = asyncio.Semaphore(SCREENER_CONCURRENCY)
+
+    async def scan(sym):
+        async with sem:
+            try:
+                return sym, await get_kline_analysis(session, sym, interval, candles)
+            except Exception as e:
+                log.warning("screener failed", extra={"symbol": sym, "error": repr(e)})
+                return sym, []
+
+    results = await asyncio.gather(*[scan(sym) for sym in universe])
+    ranked = screen_rows([(sym, rows[:candles]) for sym, rows in results if rows], wanted, min_conditions, desc)
+    return json_response(request, {
+        "version": app.version, "interval": interval, "candles": candles,
+        "universe": len(universe), "scanned": sum(1 for _, rows in results if rows), "matched": len(ranked),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000), "results": ranked[:limit],
+    })
+
+@app.get("/api/v1/{symbol}")
+async def api_symbol(request: Request, symbol: str, intervals: str = "", desc: bool = False):
+    sym = normalize_symbol(symbol)
+    picked = parse_intervals(intervals)
+    with budget_scope(REQUEST_BUDGET) as budget:
+        data = await symbol_payload(get_session(), sym, picked, desc)
+    return budgeted_response(request, {"version": app.version, "symbol": sym, "intervals": data}, budget, picked)
+
+# --- BACKGROUND REFRESH SCHEDULER ---
+# Watchlist for / and the scheduler, e.g. CVD_WATCHLIST="BTC,ETH,SOL,XRP,DOGE,PEPE"
+WATCHLIST = [normalize_symbol(s) for s in os.getenv("CVD_WATCHLIST", "BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT,DOGEUSDT").split(",") if s.strip()]
+SCHEDULER_ENABLED = os.getenv("CVD_SCHEDULER", "1") == "1"
+# Open candles are refreshed at least this often (seconds); closed candles right after their close
+REFRESH_MAX_AGE = float(os.getenv("CVD_REFRESH_MAX_AGE", "60"))
+REFRESH_GROUPS = INTERVAL_GROUPS
+# Shared snapshots older than this are dropped, so followers fall back to streaming if the leader stalls
+SNAPSHOT_TTL = REFRESH_MAX_AGE * 10
+# Pages older than this (failing refreshes) are not served from snapshots; they stream live instead
+SNAPSHOT_MAX_STALE = float(os.getenv("CVD_SNAPSHOT_MAX_STALE", str(REFRESH_MAX_AGE * 5)))
+
+# sym -> {"rows": {interval: rows}, "updated": {interval: epoch s}, "html": fragment}
+snapshots = {}
+
+async def refresh_snapshot(sym, group):
+    rows = await analyze_intervals(get_session(), sym, REFRESH_GROUPS[group])
+    snap = snapshots.setdefault(sym, {"rows": {}, "updated": {}, "html": None})
+    now = time.time()
+    for interval, interval_rows in rows.items():
+        snap["rows"][interval] = interval_rows
+        snap["updated"][interval] = now
+    r = snap["rows"]
+    if all(i in r for i in INTERVAL_LIMITS):
+        snap["html"] = generate_html_page(sym, r["1M"], r["1w"], r["1d"], r["1h"], r["15m"])
+    if shared is not None:
+        packed = {**snap, "rows": {i: [row.pack() for row in rs] for i, rs in snap["rows"].items()}}
+        await shared.set("snapshot:" + sym, packed, SNAPSHOT_TTL)
+
+def cached_page(symbols):
+    """
+    (html, age in seconds) from the precomputed fragments, or None if any symbol is missing
+    or older than SNAPSHOT_MAX_STALE. Age is that of the oldest table on the page.
+    """
+    fragments = []; oldest = None
+    for sym in symbols:
+        snap = snapshots.get(sym)
+        if snap is None or snap["html"] is None: return None
+        fragments.append(snap["html"])
+        updated = min(snap["updated"].values())
+        oldest = updated if oldest is None else min(oldest, updated)
+    age = time.time() - oldest
+    if age > SNAPSHOT_MAX_STALE: return None
+    return BASE_HTML + "".join(fragments) + "</body></html>", int(age)
+
+scheduler = RefreshScheduler(
+    WATCHLIST,
+    {group: (INTERVAL_MS[group], CACHE_TTL[group] + 1) for group in REFRESH_GROUPS},
+    refresh_snapshot,
+    REFRESH_MAX_AGE,
+)
+
+@app.on_event("startup")
+async def start_scheduler():
+    # With a shared cache tier only the leader refreshes (see leader_loop)
+    if SCHEDULER_ENABLED and shared is None: scheduler.start()
+
+async def stop_scheduler():
+    await scheduler.stop()
+
+# Stop refreshing before the shared session is closed
+app.router.on_shutdown.insert(0, stop_scheduler)
+
+@app.get("/scheduler/status")
+async def scheduler_status():
+    return {"enabled": SCHEDULER_ENABLED, "leader": is_leader, "watchlist": WATCHLIST, **scheduler.status()}
+
+# --- LEADER ELECTION (shared cache tier) ---
+cluster_log = logging.getLogger("cvd.cluster")
+leader_task = None
+
+async def sync_snapshots():
+    for sym in WATCHLIST:
+        snap = await shared.get("snapshot:" + sym)
+        if snap is not None:
+            snap["rows"] = {i: [SignalRow.unpack(item) for item in rs] for i, rs in snap["rows"].items()}
+            snapshots[sym] = snap
+            for interval, rows in snap["rows"].items(): emit_transitions(sym, interval, rows[::-1])
+
+async def leader_loop():
+    """
+    Acquires and renews the leader lease. The leader runs the scheduler and publishes snapshots,
+    followers copy them into their local `snapshots` so cached_page stays a dict lookup.
+    If the leader dies its lease expires and the next follower to try takes over.
+    """
+    global is_leader
+    while True:
+        try:
+            leading = await shared.try_lead(LEADER_LEASE)
+            if leading and not is_leader:
+                cluster_log.info("became leader", extra={"pid": os.getpid()})
+                if SCHEDULER_ENABLED: scheduler.start()
+            elif not leading and is_leader:
+                cluster_log.warning("lost the leader lease", extra={"pid": os.getpid()})
+                await scheduler.stop()
+            is_leader = leading
+            if not leading: await sync_snapshots()
+        except Exception as e:
+            cluster_log.warning("shared cache error", extra={"error": repr(e)})
+        await asyncio.sleep(SNAPSHOT_SYNC_INTERVAL)
+
+@app.on_event("startup")
+async def start_leader_election():
+    global leader_task
+    if shared is not None: leader_task = asyncio.ensure_future(leader_loop())
+
+async def stop_leader_election():
+    if leader_task is None: return
+    leader_task.cancel()
+    try:
+        await leader_task
+    except asyncio.CancelledError:
+        pass
+    await scheduler.stop()
+    if is_leader: await shared.resign()
+    await shared.backend.close()
+
+app.router.on_shutdown.insert(0, stop_leader_election)
+
+@app.get("/cluster/status")
+async def cluster_status():
+    if shared is None: return {"workers": WORKERS, "shared_cache": None}
+    return {"workers": WORKERS, "shared_cache": SHARED_CACHE_URL.split("@")[-1], "pid": os.getpid(),
+            "leader": is_leader, "snapshots": sorted(snapshots), **shared.stats()}
+
+# --- LIVE CVD (WEBSOCKET STREAMS) ---
+# CVD_STREAM_MODE: off | kline (@kline_15m, full candle state) | aggTrade (per trade)
+STREAM_MODE = os.getenv("CVD_STREAM_MODE", "off")
+STREAM_INTERVAL = "15m"
+STREAM_WS_BASE = os.getenv("CVD_WS_BASE", WS_BASE)
+# Minimum seconds between pushed rows per symbol (aggTrade can fire hundreds of times per second)
+STREAM_PUSH_INTERVAL = float(os.getenv("CVD_STREAM_PUSH_INTERVAL", "0.5"))
+
+live_candles = LiveCandles(INTERVAL_MS[STREAM_INTERVAL])
+live_hub = Broadcaster()
+live_pushed = {}
+stream_client = None
+
+def latest_ratio(sym, endpoint):
+    s = candle_store.series.get((sym, STREAM_INTERVAL, endpoint))
+    if s is None or not s.points: return None
+    return float(next(reversed(s.points.values()))['longShortRatio'])
+
+def live_row(sym):
+    """
+    Open-candle row from the live stream, in the same shape as analyze_klines rows.
+    Sentiment is the newest stored long/short point (those endpoints have no stream).
+    """
+    c = live_candles.candles[sym]
+    price_ch, cvd = c.price_ch, c.cvd
+    w_ls = latest_ratio(sym, "topLongShortPositionRatio")
+    r_ls = latest_ratio(sym, "globalLongShortAccountRatio")
+    now_ms = int(time.time() * 1000)
+    stale, ignore = feed_flags(tuple((name, feeds.status((sym, STREAM_INTERVAL, endpoint), INTERVAL_MS[STREAM_INTERVAL], now_ms))
+                                     for name, endpoint in (("whale", "topLongShortPositionRatio"), ("retail", "globalLongShortAccountRatio"))))
+    row = SignalRow(c.ts, STREAM_INTERVAL, price_ch, cvd, w_ls, r_ls, stale=stale, ignore=ignore)
+    classify_rows([row])
+    head, desc, col = row.text()
+    return {
+        "symbol": sym, "interval": STREAM_INTERVAL,
+        "ts": c.ts, "label": format_label(c.ts, STREAM_INTERVAL), "price_ch": price_ch, "cvd": cvd,
+        "w_ls": w_ls, "r_ls": r_ls, "head": head, "desc": desc, "col": col, "stale": list(stale) or None,
+    }
+
+async def on_stream_message(data):
+    sym = data.get("s")
+    if STREAM_MODE == "aggTrade" and sym and sym not in live_candles.candles:
+        # Start from the REST state of the open candle instead of from zero
+        s = candle_store.series.get((sym, STREAM_INTERVAL, "klines"))
+        if s is not None and s.points: live_candles.seed(sym, next(reversed(s.points.values())))
+    sym = live_candles.apply(data)
+    if sym is None: return
+    now = time.time()
+    if now - live_pushed.get(sym, 0.0) < STREAM_PUSH_INTERVAL: return
+    live_pushed[sym] = now
+    live_hub.publish(live_row(sym))
+
+@app.on_event("startup")
+async def start_stream():
+    global stream_client
+    if STREAM_MODE in ("kline", "aggTrade"):
+        streams = stream_names(WATCHLIST, STREAM_MODE, STREAM_INTERVAL)
+        stream_client = StreamClient(STREAM_WS_BASE, streams, on_stream_message, get_session())
+        stream_client.start()
+
+async def stop_stream():
+    if stream_client is not None: await stream_client.stop()
+
+app.router.on_shutdown.insert(0, stop_stream)
+
+@app.get("/live")
+async def live_events(request: Request, symbols: str = ""):
+    """
+    Server-Sent Events: one `row` event per live open-candle update.
+    """
+    wanted = {normalize_symbol(s) for s in symbols.split(",") if s.strip()}
+    queue = live_hub.subscribe()
+
+    async def events():
+        try:
+            for sym in list(live_candles.candles):
+                if not wanted or sym in wanted:
+                    yield f"event: row\ndata: {json.dumps(live_row(sym))}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    row = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if not wanted or row["symbol"] in wanted:
+                    yield f"event: row\ndata: {json.dumps(row)}\n\n"
+        finally:
+            live_hub.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/live/status")
+async def live_status():
+    return {
+        "mode": STREAM_MODE,
+        "stream": stream_client.status() if stream_client is not None else None,
+        "symbols": {sym: {"ts": c.ts, "price_ch": c.price_ch, "cvd": c.cvd, "age": round(time.time() - c.updated, 1)}
+                    for sym, c in live_candles.candles.items()},
+        "subscribers": len(live_hub.queues),
+        "dropped": live_hub.dropped,
+    }
+
+# --- SIGNAL CHANGES (SSE + WEBHOOKS) ---
+# Only transitions are pushed: a closed candle whose signal head differs from the previous
+# closed candle of the same symbol/interval, e.g. WHALE ACCUMULATION (EARLY) -> (CONFIRMED).
+# CVD_SIGNAL_WEBHOOKS: space-separated URLs, filters in the (never sent) fragment:
+#   "http://host/hook#symbols=BTC,ETH&signals=WHALE_ACCUMULATION_CONFIRMED&intervals=1h,4h http://other/hook"
+def parse_webhooks(spec):
+    hooks = []
+    for entry in spec.split():
+        parts = urlsplit(entry)
+        q = {k: [s.strip() for s in v[0].split(",") if s.strip()] for k, v in parse_qs(parts.fragment).items()}
+        signals = [s.upper() for s in q.get("signals", [])]
+        bad = [s for s in signals if s not in Signal.__members__] + [i for i in q.get("intervals", []) if i not in INTERVAL_MS]
+        if parts.scheme not in ("http", "https") or bad:
+            raise ValueError(f"CVD_SIGNAL_WEBHOOKS: invalid entry {entry!r}"
+                             + (f" (unknown signal/interval: {', '.join(bad)})" if bad else " (not an http(s) URL)"))
+        flt = EventFilter({normalize_symbol(s) for s in q.get("symbols", [])}, signals, q.get("intervals", []))
+        hooks.append((parts._replace(fragment="").geturl(), flt))
+    return hooks
+
+signal_diff = SignalDiff()
+signal_hub = Broadcaster()
+# With a shared cache tier every worker detects the same transitions; the claim lets one deliver each
+webhooks = WebhookDispatcher(parse_webhooks(os.getenv("CVD_SIGNAL_WEBHOOKS", "")), get_session,
+                             claim=shared.claim if shared is not None else None)
+
+def emit_transitions(symbol, interval, rows):
+    for event in signal_diff.observe(symbol, interval, rows):
+        SIGNAL_CHANGES.inc(interval=interval)
+        signal_hub.publish(event)
+        webhooks.submit(event)
+
+def signal_filter(symbols, signals, intervals):
+    # Any kline interval: the screener analyzes (and so diffs) intervals outside the page set
+    picked = [i.strip() for i in intervals.split(",") if i.strip()]
+    unknown = [i for i in picked if i not in INTERVAL_MS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown interval(s): {', '.join(unknown)}. Use {', '.join(INTERVAL_MS)}")
+    return EventFilter({normalize_symbol(s) for s in symbols.split(",") if s.strip()},
+                       {s.name for s in parse_signals(signals)}, picked)
+
+@app.on_event("startup")
+async def start_webhooks():
+    webhooks.start()
+
+async def stop_webhooks():
+    await webhooks.stop()
+
+app.router.on_shutdown.insert(0, stop_webhooks)
+
+@app.get("/signals/stream")
+async def signal_events(request: Request, symbols: str = "", signals: str = "", intervals: str = ""):
+    """
+    Server-Sent Events: one `transition` event per signal change matching the filters
+    (signals match either side). Reconnects with Last-Event-ID get the missed recent events.
+    """
+    flt = signal_filter(symbols, signals, intervals)
+    last_id = request.headers.get("last-event-id")
+    queue = signal_hub.subscribe()
+
+    async def events():
+        try:
+            if last_id:
+                for event in signal_diff.since(last_id, flt):
+                    yield f"id: {event['id']}\nevent: transition\ndata: {json.dumps(event)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if flt.matches(event):
+                    yield f"id: {event['id']}\nevent: transition\ndata: {json.dumps(event)}\n\n"
+        finally:
+            signal_hub.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/signals/changes")
+async def signal_changes(symbols: str = "", signals: str = "", intervals: str = "", since: str = "", limit: int = 100):
+    """
+    Nyeste overganger (poll-alternativ til /signals/stream), oldest first.
+    """
+    events = signal_diff.since(since, signal_filter(symbols, signals, intervals))
+    return {"changes": events[-max(1, min(limit, 500)):]}
+
+@app.get("/signals/status")
+async def signal_status():
+    return {
+        "tracked": len(signal_diff.state), "changes": signal_diff.events, "recent": len(signal_diff.recent),
+        "subscribers": len(signal_hub.queues), "dropped": signal_hub.dropped, "webhooks": webhooks.stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if WORKERS > 1:
+        # Each worker imports main:app on its own; they meet in the shared cache tier
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,250 @@
+"""
+Målinger og logging: Prometheus-style metrics, per-request profiling and log setup.
+
+Metrics are plain in-process counters/histograms (one event loop, no locks needed),
+rendered in the Prometheus text format by Registry.render(). A request that runs with
+a Profile in `current_profile` also collects every timed stage into that profile.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from urllib.parse import parse_qs
+
+# Seconds; covers sub-millisecond CPU stages up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_str(names, values):
+    if not names: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _fmt(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        # For mirroring totals that are counted elsewhere (e.g. TTLCache.stats())
+        self.values[tuple(labels[n] for n in self.labels)] = value
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, _label_str(self.labels, key), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [count per bucket..., +Inf count, sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labels)
+        v = self.values.get(key)
+        if v is None:
+            v = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        v[bisect_left(self.buckets, value)] += 1
+        v[-2] += value
+        v[-1] += 1
+
+    def samples(self):
+        bounds = [_fmt(b) for b in self.buckets] + ["+Inf"]
+        for key, v in self.values.items():
+            cumulative = 0
+            for bound, n in zip(bounds, v):
+                cumulative += n
+                yield self.name + "_bucket", _label_str(self.labels + ("le",), key + (bound,)), cumulative
+            yield self.name + "_sum", _label_str(self.labels, key), v[-2]
+            yield self.name + "_count", _label_str(self.labels, key), v[-1]
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """
+        Registers fn() to run before every render (copies values kept elsewhere into metrics).
+        """
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        for fn in self.collectors: fn()
+        lines = []
+        for m in self.metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(f"{name}{labels} {_fmt(value)}" for name, labels, value in m.samples())
+        return "\n".join(lines) + "\n"
+
+
+# --- PER-REQUEST PROFILING ---
+current_profile = contextvars.ContextVar("cvd_profile", default=None)
+
+
+class Profile:
+    """
+    Stage -> (seconds, count) for one request. Child tasks share the object through the
+    copied context, so concurrent stages add up to more than the wall time.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        s = self.stages.get(stage)
+        if s is None: self.stages[stage] = [seconds, 1]
+        else: s[0] += seconds; s[1] += 1
+
+    def summary(self):
+        return {
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "stages": {stage: {"ms": round(s[0] * 1000, 3), "count": s[1]} for stage, s in sorted(self.stages.items())},
+        }
+
+    def server_timing(self):
+        parts = [f'{stage.replace(":", "-")};dur={s[0] * 1000:.2f};desc="{s[1]}x"' for stage, s in sorted(self.stages.items())]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def profile_add(stage, seconds):
+    prof = current_profile.get()
+    if prof is not None: prof.add(stage, seconds)
+
+
+def profile_requested(query_string):
+    # Exact match: ?noprofile=1 or ?profile=10 must not turn profiling on
+    return b"profile" in query_string and parse_qs(query_string.decode("latin-1")).get("profile", [""])[-1] == "1"
+
+
+class ProfileMiddleware:
+    """
+    ASGI middleware: requests with profile=1 in the query string run with a Profile and
+    get its stages as a Server-Timing header. Responses that start streaming early only
+    contain the stages finished by then.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope.get("query_string", b"")):
+            return await self.app(scope, receive, send)
+        prof = Profile()
+        token = current_profile.set(prof)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"server-timing", prof.server_timing().encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+
+
+@contextmanager
+def timed(histogram, name, **labels):
+    """
+    Times the block into histogram (with labels) and into the request profile as `name`.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        histogram.observe(dt, **labels)
+        profile_add(name, dt)
+
+
+# --- LOGGING ---
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """
+    `time level logger message key=value ...`; the key/values come from `extra=`.
+    """
+
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in vars(record).items() if k not in _RESERVED)
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name} {record.getMessage()}"
+        return f"{line} {fields}" if fields else line
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        doc = {"time": self.formatTime(record), "level": record.levelname, "logger": record.name, "msg": record.getMessage()}
+        doc.update((k, v) for k, v in vars(record).items() if k not in _RESERVED)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+_listener = None
+
+
+def setup_logging(level="INFO", fmt="text", name="cvd"):
+    """
+    Configures the `name` logger tree. Records go through a queue and are written by a
+    background thread, so logging never blocks the event loop on stdout/stderr.
+    """
+    global _listener
+    logger = logging.getLogger(name)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    if _listener is not None: return logger
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    q = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(q))
+    _listener = logging.handlers.QueueListener(q, handler)
+    _listener.start()
+    return logger
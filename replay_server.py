@@ -0,0 +1,129 @@
+"""
+Lokal stand-in for Binance combined streams: spiller av en innspilt fil over websocket,
+so the live CVD pipeline can be run and tested offline.
+
+    python replay_server.py trades.jsonl [--port 9200] [--speed 10] [--loop]
+    python replay_server.py --generate trades.jsonl --symbols BTCUSDT,ETHUSDT --seconds 900
+
+Point the API at it with CVD_WS_BASE=ws://127.0.0.1:9200. Recordings come from
+`python streams.py --record ...` or from --generate (synthetic random walk).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+DAY_MS = 86_400_000
+
+
+def load_recording(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def shift_times(data, offset):
+    """
+    Moves all event/trade/candle timestamps by offset ms (kept a whole number of days,
+    so candle boundaries stay aligned).
+    """
+    data = dict(data)
+    for key in ("E", "T"):
+        if key in data: data[key] += offset
+    if "k" in data:
+        k = dict(data["k"])
+        k["t"] += offset; k["T"] += offset
+        data["k"] = k
+    return data
+
+
+async def replay(request):
+    messages = request.app["messages"]
+    speed = request.app["speed"]
+    wanted = set(filter(None, request.query.get("streams", "").split("/")))
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+
+    while not ws.closed:
+        offset = 0
+        if request.app["rebase"] and messages:
+            offset = (int(time.time() * 1000) - messages[0]["t"]) // DAY_MS * DAY_MS
+        prev_t = None
+        for msg in messages:
+            if wanted and msg["stream"] not in wanted:
+                continue
+            if prev_t is not None and speed > 0:
+                await asyncio.sleep(max(0.0, (msg["t"] - prev_t) / 1000 / speed))
+            prev_t = msg["t"]
+            if ws.closed:
+                break
+            await ws.send_str(json.dumps({"stream": msg["stream"], "data": shift_times(msg["data"], offset)}))
+        if not request.app["loop"]:
+            break
+    await ws.close()
+    return ws
+
+
+def generate(path, symbols, seconds, trades_per_second, interval_ms=900_000, seed=0):
+    """
+    Synthetic recording: random-walk aggTrade events plus matching kline events
+    (every 10th trade) for each symbol, starting now.
+    """
+    rng = random.Random(seed)
+    start = int(time.time() * 1000)
+    prices = {s: 100.0 * (1 + rng.random()) for s in symbols}
+    candles = {}
+    n = int(seconds * trades_per_second)
+    with open(path, "w") as out:
+        for i in range(n):
+            t = start + int(i * 1000 / trades_per_second)
+            sym = rng.choice(symbols)
+            prices[sym] *= 1 + rng.gauss(0, 0.0008)
+            price = prices[sym]
+            qty = rng.expovariate(1 / 50)
+            maker = rng.random() < 0.5
+            trade = {"e": "aggTrade", "E": t, "s": sym, "a": i, "p": f"{price:.6f}", "q": f"{qty:.4f}",
+                     "f": i, "l": i, "T": t, "m": maker, "M": True}
+            out.write(json.dumps({"t": t, "stream": f"{sym.lower()}@aggTrade", "data": trade}) + "\n")
+
+            ts = t - t % interval_ms
+            c = candles.get(sym)
+            if c is None or c["t"] != ts:
+                c = candles[sym] = {"t": ts, "o": price, "h": price, "l": price, "q": 0.0, "Q": 0.0, "n": 0}
+            c["h"] = max(c["h"], price); c["l"] = min(c["l"], price)
+            c["q"] += price * qty; c["n"] += 1
+            if not maker: c["Q"] += price * qty
+            if c["n"] % 10 == 0:
+                k = {"t": ts, "T": ts + interval_ms - 1, "s": sym, "i": "15m", "o": f"{c['o']:.6f}", "c": f"{price:.6f}",
+                     "h": f"{c['h']:.6f}", "l": f"{c['l']:.6f}", "q": f"{c['q']:.4f}", "Q": f"{c['Q']:.4f}",
+                     "n": c["n"], "x": False}
+                out.write(json.dumps({"t": t, "stream": f"{sym.lower()}@kline_15m", "data": {"e": "kline", "E": t, "s": sym, "k": k}}) + "\n")
+    print(f"Generated {n} trades for {', '.join(symbols)} in {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Binance combined-stream messages over websocket")
+    parser.add_argument("file")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor (0 = as fast as possible)")
+    parser.add_argument("--loop", action="store_true")
+    parser.add_argument("--no-rebase", dest="rebase", action="store_false", help="keep the recorded timestamps")
+    parser.add_argument("--generate", action="store_true", help="write a synthetic recording to FILE and exit")
+    parser.add_argument("--symbols", default="BTCUSDT")
+    parser.add_argument("--seconds", type=float, default=900)
+    parser.add_argument("--rate", type=float, default=20, help="trades per second (--generate)")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.file, args.symbols.split(","), args.seconds, args.rate)
+    else:
+        app = web.Application()
+        app["messages"] = load_recording(args.file)
+        app["speed"] = args.speed
+        app["loop"] = args.loop
+        app["rebase"] = args.rebase
+        app.router.add_get("/stream", replay)
+        print(f"Replaying {len(app['messages'])} messages on ws://127.0.0.1:{args.port}/stream")
+        web.run_app(app, port=args.port, print=None)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger("cvd.scheduler")
+
+
+def next_close(interval_ms, now_ms):
+    """
+    Close time (ms) of the candle open at now_ms; UTC-aligned like Binance candles.
+    """
+    return (now_ms // interval_ms + 1) * interval_ms
+
+
+class RefreshScheduler:
+    """
+    Bakgrunnsoppdatering: kaller refresh(symbol, group) ved candle close for gruppens
+    intervall, og ellers minst hvert max_age sekund så det åpne lyset holdes ferskt.
+
+    groups: name -> (interval_ms, close_delay_s). The delay lets Binance (and our
+    TTL cache) settle after the close before the closed candle is fetched.
+    """
+
+    def __init__(self, symbols, groups, refresh, max_age):
+        self.symbols = list(symbols)
+        self.groups = groups
+        self.refresh = refresh
+        self.max_age = max_age
+        self.due = {(sym, g): 0.0 for sym in self.symbols for g in groups}
+        self.last_run = {}
+        self.last_ok = {}
+        self.failures = {}  # key -> failed refreshes in a row
+        self.running = {}   # key -> in-flight job task
+        self.errors = 0
+        self.wakeup = None
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        jobs = list(self.running.values())
+        for job in jobs: job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        self.running.clear()
+
+    async def run(self):
+        """
+        Each job runs as its own task, so one slow upstream only delays its own key;
+        a key is not started again while its previous job is still in flight.
+        """
+        while True:
+            now = time.time()
+            for key, t in self.due.items():
+                if t <= now and key not in self.running:
+                    self.running[key] = asyncio.ensure_future(self._run_one(key))
+            waiting = [t for key, t in self.due.items() if key not in self.running]
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), max(0.05, min(waiting, default=now + self.max_age) - now))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_one(self, key):
+        sym, group = key
+        try:
+            await self.refresh(sym, group)
+            self.last_ok[key] = time.time()
+            self.failures[key] = 0
+        except Exception as e:
+            self.errors += 1
+            self.failures[key] = self.failures.get(key, 0) + 1
+            log.warning("refresh failed", extra={"symbol": sym, "group": group, "error": repr(e),
+                                                 "failures": self.failures[key]})
+        finally:
+            now = time.time()
+            self.last_run[key] = now
+            self.due[key] = self.next_due(group, now)
+            self.running.pop(key, None)
+            if self.wakeup is not None: self.wakeup.set()
+
+    def next_due(self, group, now):
+        interval_ms, delay = self.groups[group]
+        close = next_close(interval_ms, int(now * 1000)) / 1000 + delay
+        return min(close, now + self.max_age)
+
+    def status(self):
+        now = time.time()
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "errors": self.errors,
+            "jobs": {
+                f"{sym}:{group}": {
+                    "age": round(now - self.last_run[(sym, group)], 1) if (sym, group) in self.last_run else None,
+                    "ok_age": round(now - self.last_ok[(sym, group)], 1) if (sym, group) in self.last_ok else None,
+                    "failures": self.failures.get((sym, group), 0),
+                    "running": (sym, group) in self.running,
+                    "next_in": round(max(0.0, t - now), 1),
+                }
+                for (sym, group), t in self.due.items()
+            },
+        }
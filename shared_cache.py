@@ -0,0 +1,190 @@
+"""
+Delt cache-lag for multi-worker drift (uvicorn --workers N).
+
+Backends:
+    redis://host:6379/0      Redis or any Redis-compatible server (needs the `redis` package)
+    sqlite:///path/cache.db  single-host stand-in (WAL mode), also used for tests
+
+Besides plain get/set with TTL it provides owner-checked leases (add / renew / release),
+which are used both for the leader election and for cross-process single-flight locks.
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value):
+    if orjson is not None: return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(raw):
+    if orjson is not None: return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class SQLiteBackend:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def _run(self, sql, args=()):
+        with self.lock:
+            cur = self.db.execute(sql, args)
+            return cur.fetchone(), cur.rowcount
+
+    async def _call(self, sql, args=()):
+        return await asyncio.to_thread(self._run, sql, args)
+
+    async def get(self, key):
+        row, _ = await self._call("SELECT value FROM kv WHERE key = ? AND expires > ?", (key, time.time()))
+        return row[0] if row else None
+
+    async def set(self, key, value, ttl):
+        if random.random() < 0.01:
+            await self._call("DELETE FROM kv WHERE expires <= ?", (time.time(),))
+        await self._call("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)", (key, value, time.time() + ttl))
+
+    async def add(self, key, value, ttl):
+        now = time.time()
+        _, changed = await self._call(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires WHERE kv.expires <= ?",
+            (key, value, now + ttl, now))
+        return changed == 1
+
+    async def renew(self, key, value, ttl):
+        now = time.time()
+        _, changed = await self._call("UPDATE kv SET expires = ? WHERE key = ? AND value = ? AND expires > ?",
+                                      (now + ttl, key, value, now))
+        return changed == 1
+
+    async def release(self, key, value):
+        await self._call("DELETE FROM kv WHERE key = ? AND value = ?", (key, value))
+
+    async def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class RedisBackend:
+    RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, url):
+        import redis.asyncio
+        self.redis = redis.asyncio.from_url(url)
+
+    async def get(self, key):
+        return await self.redis.get(key)
+
+    async def set(self, key, value, ttl):
+        await self.redis.set(key, value, px=int(ttl * 1000))
+
+    async def add(self, key, value, ttl):
+        return bool(await self.redis.set(key, value, px=int(ttl * 1000), nx=True))
+
+    async def renew(self, key, value, ttl):
+        return bool(await self.redis.eval(self.RENEW, 1, key, value, int(ttl * 1000)))
+
+    async def release(self, key, value):
+        await self.redis.eval(self.RELEASE, 1, key, value)
+
+    async def close(self):
+        await self.redis.close()
+
+
+def open_backend(url):
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisBackend(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+class SharedCache:
+    """
+    JSON values + cross-process single-flight + leader lease on top of a backend.
+    """
+
+    def __init__(self, backend, prefix="cvd:"):
+        self.backend = backend
+        self.prefix = prefix
+        self.worker_id = f"{os.getpid()}-{random.getrandbits(32):08x}".encode()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    async def get(self, key):
+        raw = await self.backend.get(self.prefix + key)
+        return None if raw is None else loads(raw)
+
+    async def set(self, key, value, ttl):
+        await self.backend.set(self.prefix + key, dumps(value), ttl)
+
+    async def get_or_fetch(self, key, fetch, ttl, lock_ttl=30.0, wait=None):
+        """
+        fetch() returns (value, size). Only one process runs fetch() per key at a time;
+        the others poll the shared value until the owner has stored it (or gave up).
+        """
+        raw = await self.backend.get(self.prefix + key)
+        if raw is not None:
+            self.hits += 1
+            return loads(raw), len(raw)
+        lock = self.prefix + "lock:" + key
+        if await self.backend.add(lock, self.worker_id, lock_ttl):
+            self.misses += 1
+            try:
+                value, size = await fetch()
+                if value is not None and ttl > 0:
+                    await self.backend.set(self.prefix + key, dumps(value), ttl)
+                return value, size
+            finally:
+                await self.backend.release(lock, self.worker_id)
+        self.waits += 1
+        deadline = time.monotonic() + (lock_ttl if wait is None else wait)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            raw = await self.backend.get(self.prefix + key)
+            if raw is not None:
+                return loads(raw), len(raw)
+            if await self.backend.add(lock, self.worker_id, lock_ttl):
+                # The owner gave up without a value; take over
+                await self.backend.release(lock, self.worker_id)
+                break
+        return await fetch()
+
+    async def try_lead(self, ttl):
+        """
+        Acquires or renews the leader lease; True while this process is the leader.
+        """
+        key = self.prefix + "leader"
+        if await self.backend.renew(key, self.worker_id, ttl):
+            return True
+        return await self.backend.add(key, self.worker_id, ttl)
+
+    async def resign(self):
+        await self.backend.release(self.prefix + "leader", self.worker_id)
+
+    async def claim(self, key, ttl=3600.0):
+        """
+        True for the first process to claim key within ttl (e.g. one webhook delivery per event).
+        """
+        return await self.backend.add(self.prefix + "claim:" + key, self.worker_id, ttl)
+
+    def stats(self):
+        return {"worker": self.worker_id.decode(), "hits": self.hits, "misses": self.misses, "waits": self.waits}
@@ -0,0 +1,182 @@
+"""
+Inkrementell signal-diff: sender bare overganger i head-klassifiseringen per (symbol, interval).
+
+Every analyzed row list passes through SignalDiff.observe(). It looks only at candles
+that closed since the last call, compares each one's signal head with the previous
+closed candle of the same symbol/interval, and returns one event per change. Events go
+to SSE subscribers (main.py) and to webhooks through WebhookDispatcher.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+import aiohttp
+
+from candles import close_time
+from governor import backoff_delay
+from signal_engine import HEADS, Signal
+
+log = logging.getLogger("cvd.signals")
+
+
+class EventFilter:
+    """
+    Empty sets match everything; signals match either side of a transition.
+    """
+    __slots__ = ("symbols", "signals", "intervals")
+
+    def __init__(self, symbols=(), signals=(), intervals=()):
+        self.symbols = set(symbols)
+        self.signals = set(signals)
+        self.intervals = set(intervals)
+
+    def matches(self, event):
+        return ((not self.symbols or event["symbol"] in self.symbols)
+                and (not self.intervals or event["interval"] in self.intervals)
+                and (not self.signals or event["from"] in self.signals or event["to"] in self.signals))
+
+
+class SignalDiff:
+    """
+    state: (symbol, interval) -> (ts, code) of the newest closed candle seen. The first
+    sighting of a key only sets the baseline, so a restart does not replay old changes.
+    recent: the last `keep` events, for catch-up (Last-Event-ID, /signals/changes).
+    """
+
+    def __init__(self, keep=500):
+        self.state = {}
+        self.recent = deque(maxlen=keep)
+        self.events = 0
+
+    def observe(self, symbol, interval, rows, now_ms=None):
+        """
+        rows: SignalRows oldest first. Candles still open at now_ms are skipped; that is
+        decided from the clock, since rows from stored data may all be closed already.
+        Returns the transition events for candles that closed since the previous call.
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        end = len(rows)
+        while end and close_time(rows[end - 1].ts, interval) > now_ms: end -= 1
+        if not end: return []
+        rows = rows[:end]
+        key = (symbol, interval)
+        newest = rows[-1]
+        prev = self.state.get(key)
+        if prev is None:
+            self.state[key] = (newest.ts, newest.code)
+            return []
+        last_ts, last_code = prev
+        if newest.ts <= last_ts: return []
+        i = len(rows) - 1
+        while i > 0 and rows[i - 1].ts > last_ts: i -= 1
+        events = []
+        for row in rows[i:]:
+            if HEADS[row.code] != HEADS[last_code]:
+                events.append(self._event(symbol, interval, last_code, row))
+            last_code = row.code
+        self.state[key] = (newest.ts, last_code)
+        self.recent.extend(events)
+        self.events += len(events)
+        return events
+
+    def _event(self, symbol, interval, prev_code, row):
+        head, desc, col = row.text()
+        return {
+            "id": f"{symbol}:{interval}:{row.ts}", "symbol": symbol, "interval": interval,
+            "ts": row.ts, "label": row.label,
+            "from": Signal(prev_code).name, "to": row.signal.name, "from_head": HEADS[prev_code],
+            "head": head, "desc": desc, "col": col,
+            "price_ch": round(row.price_ch, 4), "cvd": round(row.cvd, 2), "w_ls": row.w_ls, "r_ls": row.r_ls,
+            "stale": list(row.stale) or None,
+        }
+
+    def since(self, event_id, flt):
+        """
+        Recent events after event_id (all recent ones if it is unknown), filtered.
+        """
+        events = list(self.recent)
+        for i, event in enumerate(events):
+            if event["id"] == event_id:
+                events = events[i + 1:]
+                break
+        return [e for e in events if flt.matches(e)]
+
+
+class WebhookDispatcher:
+    """
+    POSTer hver overgang som JSON til webhookene som matcher (url, EventFilter).
+    Deliveries are queued (bounded, oldest dropped when full) and sent by one worker
+    task with retries and backoff. claim(key) - e.g. SharedCache.claim - lets only one
+    worker process deliver each event when several detect it.
+    """
+
+    def __init__(self, hooks, get_session, claim=None, retries=3, timeout=5.0, maxsize=1000):
+        self.hooks = hooks
+        self.get_session = get_session
+        self.claim = claim
+        self.retries = retries
+        self.timeout = timeout
+        self.queue = deque(maxlen=maxsize)
+        self.wakeup = None
+        self.task = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, event):
+        for url, flt in self.hooks:
+            if not flt.matches(event): continue
+            if len(self.queue) == self.queue.maxlen: self.dropped += 1
+            self.queue.append((url, event))
+        if self.queue and self.wakeup is not None: self.wakeup.set()
+
+    def start(self):
+        if self.hooks and self.task is None:
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            url, event = self.queue.popleft()
+            try:
+                if self.claim is not None and not await self.claim(f"webhook:{url}:{event['id']}"): continue
+                await self._deliver(url, event)
+            except Exception as e:
+                self.failed += 1
+                log.warning("webhook delivery error", extra={"url": url, "event": event["id"], "error": repr(e)})
+
+    async def _deliver(self, url, event):
+        status = None
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.get_session().post(url, json=event, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                    status = response.status
+                    if status < 300:
+                        self.sent += 1
+                        return
+                    # The receiver rejects the event; retrying will not change that
+                    if 400 <= status < 500 and status != 429: break
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                status = repr(e)
+            if attempt < self.retries:
+                await asyncio.sleep(backoff_delay(attempt))
+        self.failed += 1
+        log.warning("webhook delivery failed", extra={"url": url, "event": event["id"], "status": status})
+
+    def stats(self):
+        return {"hooks": [url for url, _ in self.hooks], "queued": len(self.queue), "sent": self.sent,
+                "failed": self.failed, "dropped": self.dropped}
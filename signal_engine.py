@@ -0,0 +1,510 @@
+"""
+Vektorisert signalmotor (v8.3) ved siden av den skalare get_signal i main.py.
+
+classify_batch() evaluates the get_signal priority cascade as boolean masks over
+column arrays and returns one signal code per row. Head/desc/col text is only
+rendered on demand with describe_signal(), for the rows somebody actually looks at.
+SignalRow is the compact analyzed row main.py caches (numbers + code, text on demand).
+
+    python signal_engine.py --check [N]   # equivalence against main.get_signal
+"""
+import sys
+import time
+from enum import IntEnum
+
+import numpy as np
+
+from candles import format_label
+
+
+class Signal(IntEnum):
+    NEUTRAL = 0
+    LOW_CONVICTION = 1
+    BALANCED_SENTIMENT = 2
+    PARABOLIC_RALLY_BACKED = 3
+    PARABOLIC_FAKE_PUMP = 4
+    PARABOLIC_PUMP = 5
+    PARABOLIC_DUMP = 6
+    PARABOLIC_RALLY_DIVERGENCE = 7
+    FAKE_PUMP_FOMO_PEAK = 8
+    RETAIL_FOMO_PEAK = 9
+    RETAIL_FOMO_EXTREME = 10
+    FOMO_STRONG_RALLY = 11
+    FOMO_RALLY = 12
+    FOMO_BREAKDOWN_LATE = 13
+    FOMO_BREAKDOWN = 14
+    FOMO_DECLINE = 15
+    FOMO_CVD_NEGATIVE = 16
+    RETAIL_FOMO = 17
+    WHALE_ACCUMULATION_HIGH = 18
+    WHALE_ACCUMULATION_CONFIRMED = 19
+    WHALE_ACCUMULATION_EARLY = 20
+    WHALE_ACCUMULATION_TOO_EARLY = 21
+    WHALE_DISTRIBUTION = 22
+    WHALE_DISINTEREST = 23
+    RETAIL_CAPITULATION_HIGH = 24
+    RETAIL_CAPITULATION_SPOT = 25
+    RETAIL_CAPITULATION_EARLY = 26
+    RETAIL_NEUTRAL_TO_FEAR = 27
+    RETAIL_NEUTRAL = 28
+    SPOT_DRIVER = 29
+    SPOT_DUMP = 30
+    SPOT_ABSORPTION_STRONG = 31
+    WEAK_RALLY_DIVERGENCE = 32
+    HEALTHY_RALLY = 33
+    WEAK_RALLY = 34
+    SPOT_ABSORPTION = 35
+    AGGRESSIVE_SELLING = 36
+
+
+HEADS = {
+    Signal.NEUTRAL: "⚖️ NØYTRAL",
+    Signal.LOW_CONVICTION: "💤 LOW CONVICTION",
+    Signal.BALANCED_SENTIMENT: "⚖️ BALANSERT SENTIMENT",
+    Signal.PARABOLIC_RALLY_BACKED: "🚀 PARABOLIC RALLY (BACKED)",
+    Signal.PARABOLIC_FAKE_PUMP: "⚠️ PARABOLIC FAKE PUMP",
+    Signal.PARABOLIC_PUMP: "🚀 PARABOLIC PUMP",
+    Signal.PARABOLIC_DUMP: "💥 PARABOLIC DUMP",
+    Signal.PARABOLIC_RALLY_DIVERGENCE: "⚠️ PARABOLIC RALLY (DIVERGENCE)",
+    Signal.FAKE_PUMP_FOMO_PEAK: "🚨 FAKE PUMP + RETAIL FOMO PEAK",
+    Signal.RETAIL_FOMO_PEAK: "🚨 RETAIL FOMO PEAK",
+    Signal.RETAIL_FOMO_EXTREME: "⚠️ RETAIL FOMO EKSTREMT",
+    Signal.FOMO_STRONG_RALLY: "⚠️ RETAIL FOMO I STERK RALLY",
+    Signal.FOMO_RALLY: "⚠️ RETAIL FOMO I RALLY",
+    Signal.FOMO_BREAKDOWN_LATE: "⚠️ RETAIL FOMO I BREAKDOWN (LATE)",
+    Signal.FOMO_BREAKDOWN: "⚠️ RETAIL FOMO I BREAKDOWN",
+    Signal.FOMO_DECLINE: "⚠️ RETAIL FOMO I DECLINE",
+    Signal.FOMO_CVD_NEGATIVE: "⚠️ RETAIL FOMO + CVD NEGATIV",
+    Signal.RETAIL_FOMO: "⚠️ RETAIL FOMO",
+    Signal.WHALE_ACCUMULATION_HIGH: "🐋 WHALE ACCUMULATION (HIGH CONVICTION)",
+    Signal.WHALE_ACCUMULATION_CONFIRMED: "🐋 WHALE ACCUMULATION (CONFIRMED)",
+    Signal.WHALE_ACCUMULATION_EARLY: "🐋 WHALE ACCUMULATION (EARLY)",
+    Signal.WHALE_ACCUMULATION_TOO_EARLY: "🐋 WHALE ACCUMULATION (EARLY)",
+    Signal.WHALE_DISTRIBUTION: "🐋 WHALE DISTRIBUTION",
+    Signal.WHALE_DISINTEREST: "⚠️ WHALE DISINTEREST",
+    Signal.RETAIL_CAPITULATION_HIGH: "✅ RETAIL CAPITULATION (HIGH CONVICTION)",
+    Signal.RETAIL_CAPITULATION_SPOT: "✅ RETAIL CAPITULATION + SPOT SUPPORT",
+    Signal.RETAIL_CAPITULATION_EARLY: "⚠️ RETAIL CAPITULATION (EARLY)",
+    Signal.RETAIL_NEUTRAL_TO_FEAR: "✅ RETAIL NEUTRAL → FEAR",
+    Signal.RETAIL_NEUTRAL: "⚖️ RETAIL NØYTRAL",
+    Signal.SPOT_DRIVER: "✅ SPOT DRIVER",
+    Signal.SPOT_DUMP: "❌ SPOT DUMP",
+    Signal.SPOT_ABSORPTION_STRONG: "🛡️ SPOT ABSORBERING",
+    Signal.WEAK_RALLY_DIVERGENCE: "⚠️ SVAK OPPGANG",
+    Signal.HEALTHY_RALLY: "🚀 SUNN OPPGANG",
+    Signal.WEAK_RALLY: "⚠️ SVAK OPPGANG",
+    Signal.SPOT_ABSORPTION: "🛡️ SPOT ABSORBERING",
+    Signal.AGGRESSIVE_SELLING: "📉 AGGRESSIVT SALG",
+}
+
+
+# --- BATCH CLASSIFIER ---
+def classify_batch(price_ch, cvd, whale_ls, retail_ls):
+    """
+    Returns an int8 array of Signal codes, one per row.
+    Rules are applied in get_signal's priority order; each row keeps the first code it matches.
+    """
+    p = np.asarray(price_ch, dtype=np.float64)
+    c = np.asarray(cvd, dtype=np.float64)
+    w = np.asarray(whale_ls, dtype=np.float64)
+    r = np.asarray(retail_ls, dtype=np.float64)
+
+    codes = np.full(p.shape, Signal.NEUTRAL, dtype=np.int8)
+    open_ = np.ones(p.shape, dtype=bool)
+
+    def assign(mask, code):
+        hit = open_ & mask
+        codes[hit] = code
+        open_[hit] = False
+
+    abs_p = np.abs(p)
+
+    # PRIORITY -1: Low conviction (whales and retail both 0.8-1.2)
+    band = (w >= 0.8) & (w <= 1.2) & (r >= 0.8) & (r <= 1.2)
+    assign(band & (np.abs(c) < 50_000) & (abs_p < 0.5), Signal.LOW_CONVICTION)
+    assign(band & (abs_p < 0.3), Signal.BALANCED_SENTIMENT)
+
+    # PRIORITY 0: Extreme parabolic moves (>20%)
+    para = abs_p > 20
+    assign(para & (p > 0) & (c > 50_000_000), Signal.PARABOLIC_RALLY_BACKED)
+    assign(para & (p > 0) & (c < -20_000_000), Signal.PARABOLIC_FAKE_PUMP)
+    assign(para & (p > 0), Signal.PARABOLIC_PUMP)
+    assign(para, Signal.PARABOLIC_DUMP)
+
+    # PRIORITY 1: Momentum divergence
+    assign((p > 15.0) & (c < -20_000_000) & (r > 2.5), Signal.PARABOLIC_RALLY_DIVERGENCE)
+
+    # PRIORITY 2: Extreme retail FOMO (>3.0)
+    fomo = r > 3.0
+    assign(fomo & (c < -50_000_000), Signal.FAKE_PUMP_FOMO_PEAK)
+    assign(fomo & (c < 0), Signal.RETAIL_FOMO_PEAK)
+    assign(fomo, Signal.RETAIL_FOMO_EXTREME)
+
+    # PRIORITY 3: Retail FOMO (2.0-3.0)
+    fomo_neg = (r > 2.0) & (c < 0)
+    assign(fomo_neg & (p > 10.0), Signal.FOMO_STRONG_RALLY)
+    assign(fomo_neg & (p > 5.0), Signal.FOMO_RALLY)
+    assign(fomo_neg & (p < -10.0) & (r < 2.3), Signal.FOMO_BREAKDOWN_LATE)
+    assign(fomo_neg & (p < -10.0), Signal.FOMO_BREAKDOWN)
+    assign(fomo_neg & (p < -5.0), Signal.FOMO_DECLINE)
+    assign(fomo_neg, Signal.FOMO_CVD_NEGATIVE)
+    assign(r > 2.0, Signal.RETAIL_FOMO)
+
+    # PRIORITY 4: Whale divergence
+    acc = (p < -0.5) & (w > 1.0)
+    cvd_ok = c > 10_000_000
+    retail_ok = r < 1.0
+    assign(acc & (w > 1.2), Signal.WHALE_ACCUMULATION_HIGH)
+    assign(acc & cvd_ok & retail_ok, Signal.WHALE_ACCUMULATION_CONFIRMED)
+    assign(acc & (cvd_ok | retail_ok), Signal.WHALE_ACCUMULATION_EARLY)
+    assign(acc, Signal.WHALE_ACCUMULATION_TOO_EARLY)
+    assign((p > 0.5) & (w < 0.9), Signal.WHALE_DISTRIBUTION)
+    assign((w < 0.9) & (abs_p < 1.0), Signal.WHALE_DISINTEREST)
+
+    # PRIORITY 5: Retail contrarian
+    met = (p < -0.5).astype(np.int8) + (c > 0) + (w > 1.0)
+    assign((r < 0.8) & (met >= 2), Signal.RETAIL_CAPITULATION_HIGH)
+    assign((r < 0.8) & (c > 0), Signal.RETAIL_CAPITULATION_SPOT)
+    assign(r < 0.8, Signal.RETAIL_CAPITULATION_EARLY)
+    assign((r < 1.0) & (met >= 2), Signal.RETAIL_NEUTRAL_TO_FEAR)
+    assign(r < 1.0, Signal.RETAIL_NEUTRAL)
+
+    # PRIORITY 6: Spot CVD confirmation + moderate moves
+    assign((p > 2.0) & (c > 50_000_000), Signal.SPOT_DRIVER)
+    assign((p < -2.0) & (c < -50_000_000), Signal.SPOT_DUMP)
+    assign((p < -1.0) & (c > 10_000_000), Signal.SPOT_ABSORPTION_STRONG)
+    assign((p > 1.0) & (c < -10_000_000), Signal.WEAK_RALLY_DIVERGENCE)
+    assign((p > 0.5) & (c > 0), Signal.HEALTHY_RALLY)
+    assign(p > 0.5, Signal.WEAK_RALLY)
+    assign((p < -0.5) & (c > 0), Signal.SPOT_ABSORPTION)
+    assign(p < -0.5, Signal.AGGRESSIVE_SELLING)
+
+    return codes
+
+
+
+# --- ENTRY CHECKLISTS ---
+WHALE_ACCUMULATION = (Signal.WHALE_ACCUMULATION_HIGH, Signal.WHALE_ACCUMULATION_CONFIRMED,
+                      Signal.WHALE_ACCUMULATION_EARLY, Signal.WHALE_ACCUMULATION_TOO_EARLY)
+RETAIL_CONTRARIAN = (Signal.RETAIL_CAPITULATION_HIGH, Signal.RETAIL_CAPITULATION_SPOT, Signal.RETAIL_CAPITULATION_EARLY,
+                     Signal.RETAIL_NEUTRAL_TO_FEAR, Signal.RETAIL_NEUTRAL)
+
+def conditions_met(codes, price_ch, cvd, whale_ls, retail_ls):
+    """
+    (met, total) int8 arrays for the signals whose text scores entry conditions:
+    PARABOLIC_DUMP x/3, whale accumulation x/2 (CVD, retail), retail contrarian x/3.
+    total is 0 for every other signal.
+    """
+    codes = np.asarray(codes)
+    p = np.asarray(price_ch, dtype=np.float64)
+    c = np.asarray(cvd, dtype=np.float64)
+    w = np.asarray(whale_ls, dtype=np.float64)
+    r = np.asarray(retail_ls, dtype=np.float64)
+    met = np.zeros(codes.shape, dtype=np.int8)
+    total = np.zeros(codes.shape, dtype=np.int8)
+
+    dump = codes == Signal.PARABOLIC_DUMP
+    met[dump] = ((r < 1.0).astype(np.int8) + (c > 0) + (w > 1.0))[dump]
+    total[dump] = 3
+    acc = np.isin(codes, WHALE_ACCUMULATION)
+    met[acc] = ((c > 10_000_000).astype(np.int8) + (r < 1.0))[acc]
+    total[acc] = 2
+    contra = np.isin(codes, RETAIL_CONTRARIAN)
+    met[contra] = ((p < -0.5).astype(np.int8) + (c > 0) + (w > 1.0))[contra]
+    total[contra] = 3
+    return met, total
+
+# --- ON-DEMAND TEXT RENDERING ---
+def describe_signal(code, price_ch, cvd_val, whale_ls, retail_ls):
+    """
+    Renders (head, desc, col) for one classified row - identical to get_signal's output.
+    """
+    code = Signal(code)
+    head = HEADS[code]
+    m = cvd_val / 1_000_000
+
+    if code == Signal.NEUTRAL:
+        return head, "Ingen klare avvik.", "#888"
+    if code == Signal.LOW_CONVICTION:
+        return head, f"Range-bound: Whale {whale_ls:.2f}, Retail {retail_ls:.2f}, CVD ${cvd_val/1_000:+.0f}k. Ingen klare posisjoner - WAIT for setup.", "#666666"
+    if code == Signal.BALANCED_SENTIMENT:
+        return head, f"Nøytral posisjonering (Whale {whale_ls:.2f}, Retail {retail_ls:.2f}). Lav volatilitet, ingen edge.", "#888888"
+    if code == Signal.PARABOLIC_RALLY_BACKED:
+        return head, f"Ekstrem oppgang +{price_ch:.1f}% MED stor Spot CVD ${m:+.1f}M. Legitimt momentum, men vurder profit på ekstreme nivåer.", "#00ff00"
+    if code == Signal.PARABOLIC_FAKE_PUMP:
+        return head, f"Ekstrem oppgang +{price_ch:.1f}% men CVD negativ ${m:.1f}M! Retail L/S {retail_ls:.2f}. Reversal imminent - EXIT!", "#ff6600"
+    if code == Signal.PARABOLIC_PUMP:
+        return head, f"Ekstrem oppgang +{price_ch:.1f}% - Ofte FOMO-topp. Vurder take profit, CVD nøytral ${m:+.1f}M.", "#ff00ff"
+    if code == Signal.PARABOLIC_DUMP:
+        checks = [
+            f"Retail L/S {retail_ls:.2f} < 1.0 ✓" if retail_ls < 1.0 else f"Retail L/S {retail_ls:.2f} (need < 1.0)",
+            f"CVD ${m:+.1f}M ✓" if cvd_val > 0 else f"CVD ${m:.1f}M (need positive)",
+            f"Whales Long {whale_ls:.2f} ✓" if whale_ls > 1.0 else f"Whale L/S {whale_ls:.2f} (need > 1.0)",
+        ]
+        met = (retail_ls < 1.0) + (cvd_val > 0) + (whale_ls > 1.0)
+        desc = f"Ekstrem nedgang {price_ch:.1f}% - Kapitulasjon! Entry conditions: {met}/3 met. " + " | ".join(checks)
+        if met >= 2: return head, desc + " → CONSIDER staged entry.", "#00ff9d"
+        if met == 1: return head, desc + " → WAIT for more confirmation.", "#ffa500"
+        return head, desc + " → TOO EARLY, wait.", "#8B0000"
+    if code == Signal.PARABOLIC_RALLY_DIVERGENCE:
+        return head, f"Pris +{price_ch:.1f}% men CVD ${m:.1f}M negativ + Retail overleveraged ({retail_ls:.2f}). FAKE PUMP reverserer snart - EXIT positions!", "#ff6600"
+    if code == Signal.FAKE_PUMP_FOMO_PEAK:
+        return head, f"Retail ekstremt FOMO (L/S {retail_ls:.2f}), CVD svært negativ ${m:.1f}M. ADVARSEL-TOPP - EXIT all longs!", "#ff0000"
+    if code == Signal.RETAIL_FOMO_PEAK:
+        return head, f"Retail ekstremt overleveraged Long (L/S {retail_ls:.2f}) + CVD negativ ${m:.1f}M. Sannsynlig topp - REDUCE exposure!", "#ff4d4d"
+    if code == Signal.RETAIL_FOMO_EXTREME:
+        return head, f"Retail L/S {retail_ls:.2f} (>3.0 threshold). Crowd overleveraged Long. CVD ${m:+.1f}M støtter nå, men vær varsom.", "#ffa500"
+    if code == Signal.FOMO_STRONG_RALLY:
+        return head, f"Pris +{price_ch:.1f}%, Retail overleveraged ({retail_ls:.2f}), CVD ${m:.1f}M negativ. TOPP nærmer seg - vurder take profit!", "#ff6b6b"
+    if code == Signal.FOMO_RALLY:
+        return head, f"Pris +{price_ch:.1f}%, Retail {retail_ls:.2f}, CVD negativ. Svak oppgang - REDUCE long exposure.", "#ff8888"
+    if code == Signal.FOMO_BREAKDOWN_LATE:
+        return head, f"Pris {price_ch:.1f}%, Retail L/S {retail_ls:.2f} synker (fra >2.5). CVD ${m:.1f}M. Kapitulasjon nærmer seg - WATCH for Retail < 1.0.", "#ff9999"
+    if code == Signal.FOMO_BREAKDOWN:
+        return head, f"Pris {price_ch:.1f}%, Retail {retail_ls:.2f} fortsatt høy, CVD ${m:.1f}M. Kapitulasjon pågår - WAIT, for tidlig!", "#ff4d4d"
+    if code == Signal.FOMO_DECLINE:
+        return head, f"Pris {price_ch:.1f}%, Retail {retail_ls:.2f}, CVD negativ. Nedgang med svak sentiment - WAIT.", "#ff6b6b"
+    if code == Signal.FOMO_CVD_NEGATIVE:
+        return head, f"Retail overleveraged ({retail_ls:.2f}), CVD ${m:.1f}M. Mulig topp forming - REDUCE risk.", "#ff6b6b"
+    if code == Signal.RETAIL_FOMO:
+        return head, f"Retail L/S {retail_ls:.2f} overleveraged. CVD ${m:+.1f}M støtter nå, men crowd positioning ekstrem - vær forsiktig.", "#ffa500"
+
+    if code in (Signal.WHALE_ACCUMULATION_HIGH, Signal.WHALE_ACCUMULATION_CONFIRMED,
+                Signal.WHALE_ACCUMULATION_EARLY, Signal.WHALE_ACCUMULATION_TOO_EARLY):
+        if cvd_val > 10_000_000: cvd_txt = f"CVD ${m:+.1f}M ✓"; col = "#00ff9d"
+        elif cvd_val > 0: cvd_txt = f"CVD ${m:+.1f}M (weak)"; col = "#00ccff"
+        else: cvd_txt = f"CVD ${m:.1f}M (no support)"; col = "#0099ff"
+        if retail_ls < 1.0: retail_txt = f"Retail {retail_ls:.2f} capitulating ✓"
+        elif retail_ls < 1.3: retail_txt = f"Retail {retail_ls:.2f} (neutral)"
+        else: retail_txt = f"Retail {retail_ls:.2f} (still elevated)"
+        confidence = f"{cvd_txt} | {retail_txt}"
+        if code == Signal.WHALE_ACCUMULATION_HIGH:
+            return head, f"Pris {price_ch:.1f}%, Whales STRONGLY Long ({whale_ls:.2f}). {confidence}. STRONG BUY signal!", "#00ff00"
+        if code == Signal.WHALE_ACCUMULATION_CONFIRMED:
+            return head, f"Pris {price_ch:.1f}%, Whales accumulating ({whale_ls:.2f}). {confidence}. CONSIDER entry.", col
+        if code == Signal.WHALE_ACCUMULATION_EARLY:
+            return head, f"Pris {price_ch:.1f}%, Whales L/S {whale_ls:.2f}. {confidence}. WAIT for more confirmation.", "#0099ff"
+        return head, f"Pris {price_ch:.1f}%, Whales L/S {whale_ls:.2f}. {confidence}. TOO EARLY - wait for confirmation.", "#0088cc"
+
+    if code == Signal.WHALE_DISTRIBUTION:
+        desc = f"Pris +{price_ch:.1f}%, men Whales "
+        col = "#ff4d4d"
+        if whale_ls < 0.8:
+            desc += f"STRONGLY shorting ({whale_ls:.2f}). "
+            col = "#ff0000"
+        else:
+            desc += f"shorting ({whale_ls:.2f}). "
+        if cvd_val < -10_000_000:
+            desc += f"CVD ${m:.1f}M confirms. EXIT longs!"
+            col = "#ff0000"
+        elif cvd_val < 0:
+            desc += f"CVD ${m:.1f}M negative. REDUCE exposure."
+        else:
+            desc += f"CVD ${m:+.1f}M mixed signal. REDUCE exposure."
+        if retail_ls > 2.0:
+            desc += f" Retail FOMO ({retail_ls:.2f}) buying top."
+            col = "#ff0000"
+        return head, desc, col
+    if code == Signal.WHALE_DISINTEREST:
+        return head, f"Whales short-biased ({whale_ls:.2f}) men pris flat {price_ch:+.1f}%. Lav conviction - WAIT for clear direction.", "#999999"
+
+    if code in (Signal.RETAIL_CAPITULATION_HIGH, Signal.RETAIL_CAPITULATION_SPOT, Signal.RETAIL_CAPITULATION_EARLY,
+                Signal.RETAIL_NEUTRAL_TO_FEAR, Signal.RETAIL_NEUTRAL):
+        entry_check = " | ".join([
+            "Price declining ✓" if price_ch < -0.5 else f"Price +{price_ch:.1f}% (wait for dip)",
+            f"CVD ${m:+.1f}M ✓" if cvd_val > 0 else f"CVD ${m:.1f}M (wait for positive)",
+            f"Whales Long {whale_ls:.2f} ✓" if whale_ls > 1.0 else f"Whales {whale_ls:.2f} (neutral)",
+        ])
+        if code == Signal.RETAIL_CAPITULATION_HIGH:
+            return head, f"Retail EXTREME panikk (L/S {retail_ls:.2f}). {entry_check}. STRONG BUY zone - staged entry!", "#00ff9d"
+        if code == Signal.RETAIL_CAPITULATION_SPOT:
+            return head, f"Retail extreme panikk ({retail_ls:.2f}), CVD ${m:+.1f}M. {entry_check}. CONSIDER entry.", "#00ccff"
+        if code == Signal.RETAIL_CAPITULATION_EARLY:
+            return head, f"Retail extreme panikk ({retail_ls:.2f}), men CVD ${m:.1f}M negativ. {entry_check}. Wait for CVD confirmation.", "#ffa500"
+        if code == Signal.RETAIL_NEUTRAL_TO_FEAR:
+            return head, f"Retail nøytral til bear ({retail_ls:.2f}). {entry_check}. Early reversal setup - WATCH closely.", "#00cccc"
+        return head, f"Retail balanced ({retail_ls:.2f}). {entry_check}. No clear edge yet.", "#888888"
+
+    if code == Signal.SPOT_DRIVER:
+        return head, f"Oppgang +{price_ch:.1f}% med stor Spot CVD ${m:+.1f}M. Sunn trend - HOLD positions.", "#00ff9d"
+    if code == Signal.SPOT_DUMP:
+        return head, f"Nedgang {price_ch:.1f}% med stor CVD utstrømming ${m:.1f}M. Aggressivt salg - EXIT.", "#ff4d4d"
+    if code == Signal.SPOT_ABSORPTION_STRONG:
+        return head, f"Pris {price_ch:.1f}% ned men CVD ${m:+.1f}M positiv. Reversal-setup - WATCH for bounce.", "#0099ff"
+    if code == Signal.WEAK_RALLY_DIVERGENCE:
+        return head, f"Pris +{price_ch:.1f}% men CVD ${m:.1f}M negativ. Mangler kjøpere - mulig felle, REDUCE longs.", "#ffa500"
+    if code == Signal.HEALTHY_RALLY:
+        return head, f"Pris +{price_ch:.1f}% støttet av CVD ${m:+.1f}M. Retail {retail_ls:.2f}. Trend-following OK.", "#00ff9d"
+    if code == Signal.WEAK_RALLY:
+        return head, f"Pris +{price_ch:.1f}%, men CVD ${m:.1f}M negativ. Retail {retail_ls:.2f}. Svak - vær varsom.", "#ffa500"
+    if code == Signal.SPOT_ABSORPTION:
+        return head, f"Pris {price_ch:.1f}% ned, men CVD ${m:+.1f}M kjøper imot. Mulig bunn.", "#0099ff"
+    return head, f"Pris {price_ch:.1f}% ned støttet av CVD ${m:.1f}M. Retail {retail_ls:.2f}. Continued weakness.", "#ffcccc"
+
+
+# --- COMPACT ANALYZED ROWS ---
+# Ratio used in place of a whale/retail feed that is ignored (frozen/stale/missing data)
+NEUTRAL_LS = 1.0
+
+def ignore_note(ignore):
+    return f" ⚠️ Ignorerer {'/'.join(ignore)} L/S (frosne/manglende data)."
+
+
+class SignalRow:
+    """
+    Én analysert candle: bare tallene og signalkoden.
+    label/head/desc/col are derived when a row is rendered or serialized, so the rows
+    kept in the analysis cache hold no per-row text (heads and colors are shared constants).
+    stale: degraded feeds flagged on the row; ignore: the ones classified as NEUTRAL_LS.
+    w_ls/r_ls are None where there was no sentiment data; those count as NEUTRAL_LS too.
+    """
+    __slots__ = ("ts", "interval", "price_ch", "cvd", "w_ls", "r_ls", "code", "stale", "ignore")
+
+    def __init__(self, ts, interval, price_ch, cvd, w_ls, r_ls, code=Signal.NEUTRAL, stale=(), ignore=()):
+        self.ts = ts
+        self.interval = interval
+        self.price_ch = price_ch
+        self.cvd = cvd
+        self.w_ls = w_ls
+        self.r_ls = r_ls
+        self.code = code
+        self.stale = stale
+        self.ignore = ignore
+
+    def same_inputs(self, price_ch, cvd, w_ls, r_ls, stale):
+        return (self.price_ch == price_ch and self.cvd == cvd and self.w_ls == w_ls
+                and self.r_ls == r_ls and self.stale == stale)
+
+    def signal_inputs(self):
+        """
+        (price_ch, cvd, whale_ls, retail_ls) as classified, with ignored/missing ratios as NEUTRAL_LS.
+        """
+        w = NEUTRAL_LS if self.w_ls is None or "whale" in self.ignore else self.w_ls
+        r = NEUTRAL_LS if self.r_ls is None or "retail" in self.ignore else self.r_ls
+        return self.price_ch, self.cvd, w, r
+
+    @property
+    def signal(self):
+        return Signal(self.code)
+
+    @property
+    def label(self):
+        return format_label(self.ts, self.interval)
+
+    @property
+    def head(self):
+        return HEADS[self.code]
+
+    def text(self):
+        """
+        (head, desc, col) - the same as get_signal(..., ignore) for this row.
+        """
+        head, desc, col = describe_signal(self.code, *self.signal_inputs())
+        if self.ignore: desc += ignore_note(self.ignore)
+        return head, desc, col
+
+    def pack(self):
+        # JSON-friendly form for the shared snapshot cache
+        return [self.ts, self.interval, self.price_ch, self.cvd, self.w_ls, self.r_ls, int(self.code),
+                list(self.stale), list(self.ignore)]
+
+    @classmethod
+    def unpack(cls, item):
+        ts, interval, price_ch, cvd, w_ls, r_ls, code, stale, ignore = item
+        return cls(ts, interval, price_ch, cvd, w_ls, r_ls, code, tuple(stale), tuple(ignore))
+
+
+def classify_rows(rows):
+    """
+    Sets .code on every row with one classify_batch call.
+    """
+    if not rows: return
+    p, c, w, r = zip(*(row.signal_inputs() for row in rows))
+    for row, code in zip(rows, classify_batch(p, c, w, r).tolist()):
+        row.code = code
+
+
+# --- EQUIVALENCE HARNESS ---
+PRICE_EDGES = [0.0, 0.3, 0.5, 1.0, 2.0, 5.0, 10.0, 15.0, 20.0]
+CVD_EDGES = [0.0, 50_000, 10_000_000, 20_000_000, 50_000_000]
+WHALE_EDGES = [0.8, 0.9, 1.0, 1.2]
+RETAIL_EDGES = [0.8, 1.0, 1.2, 1.3, 2.0, 2.3, 2.5, 3.0]
+
+def random_grid(n, seed=0):
+    """
+    Random rows concentrated on and around every threshold in get_signal,
+    mixed with uniformly spread values.
+    """
+    rng = np.random.default_rng(seed)
+
+    def column(edges, spread, signed):
+        pts = np.array(edges, dtype=np.float64)
+        pts = np.concatenate([pts, np.nextafter(pts, np.inf), np.nextafter(pts, -np.inf)])
+        if signed: pts = np.concatenate([pts, -pts])
+        on_edge = rng.choice(pts, n)
+        uniform = rng.uniform(-spread if signed else 0.0, spread, n)
+        return np.where(rng.random(n) < 0.5, on_edge, uniform)
+
+    return (column(PRICE_EDGES, 30.0, True), column(CVD_EDGES, 80_000_000, True),
+            column(WHALE_EDGES, 2.0, False), column(RETAIL_EDGES, 4.0, False))
+
+def check_equivalence(n=100_000, seed=0, show=5):
+    """
+    Runs n random rows through classify_batch + describe_signal and through main.get_signal,
+    then again as SignalRows (classify_rows + text) against get_signal(..., ignore) with
+    random ignored feeds and missing (None) ratios mixed in.
+    Returns the number of rows where (head, desc, col) differ.
+    """
+    from main import get_signal
+
+    p, c, w, r = random_grid(n, seed)
+    codes = classify_batch(p, c, w, r)
+    mismatches = 0
+
+    def compare(row, expected, got, name):
+        nonlocal mismatches
+        if got != expected:
+            mismatches += 1
+            if mismatches <= show:
+                print(f"MISMATCH {row}: code={name}\n  scalar: {expected}\n  batch:  {got}")
+
+    for i in range(n):
+        row = (float(p[i]), float(c[i]), float(w[i]), float(r[i]))
+        compare(row, get_signal(*row), describe_signal(codes[i], *row), Signal(codes[i]).name)
+
+    rng = np.random.default_rng(seed + 1)
+    ignores = [(), (), ("whale",), ("retail",), ("whale", "retail")]
+    rows = []
+    for i in range(n):
+        w_ls = None if rng.random() < 0.1 else float(w[i])
+        r_ls = None if rng.random() < 0.1 else float(r[i])
+        rows.append(SignalRow(0, "1h", float(p[i]), float(c[i]), w_ls, r_ls, ignore=ignores[rng.integers(len(ignores))]))
+    classify_rows(rows)
+    for row in rows:
+        inputs = (row.price_ch, row.cvd, row.w_ls, row.r_ls, row.ignore)
+        compare(inputs, get_signal(*inputs), row.text(), row.signal.name)
+    return mismatches
+
+def benchmark(n=1_000_000, seed=0):
+    from main import get_signal
+
+    p, c, w, r = random_grid(n, seed)
+    t0 = time.perf_counter()
+    classify_batch(p, c, w, r)
+    t_batch = time.perf_counter() - t0
+    sample = min(n, 100_000)
+    rows = list(zip(p[:sample].tolist(), c[:sample].tolist(), w[:sample].tolist(), r[:sample].tolist()))
+    t0 = time.perf_counter()
+    for row in rows: get_signal(*row)
+    t_scalar = (time.perf_counter() - t0) * n / sample
+    print(f"{n} rows: batch {t_batch*1000:.1f} ms, scalar get_signal ~{t_scalar*1000:.0f} ms ({t_scalar/t_batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        benchmark(n)
+    else:
+        bad = check_equivalence(n)
+        print(f"{n} rows checked, {bad} mismatches")
+        sys.exit(1 if bad else 0)
@@ -0,0 +1,222 @@
+"""
+Live ingestion fra Binance combined streams (@kline_<interval> eller @aggTrade).
+
+Keeps the open candle's price_ch and CVD per symbol in memory. CVD uses the same
+definition as the REST path: taker buy quote volume minus the rest of the quote volume.
+
+    python streams.py --record trades.jsonl --symbols BTCUSDT,ETHUSDT --seconds 300
+
+records raw combined-stream messages for replay_server.py.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+import aiohttp
+
+WS_BASE = "wss://stream.binance.com:9443"
+
+log = logging.getLogger("cvd.stream")
+
+
+class OpenCandle:
+    __slots__ = ("ts", "open", "close", "quote_vol", "taker_buy_quote", "updated")
+
+    def __init__(self, ts, open_p, close_p=None, quote_vol=0.0, taker_buy_quote=0.0):
+        self.ts = ts
+        self.open = open_p
+        self.close = open_p if close_p is None else close_p
+        self.quote_vol = quote_vol
+        self.taker_buy_quote = taker_buy_quote
+        self.updated = time.time()
+
+    @property
+    def price_ch(self):
+        return ((self.close - self.open) / self.open) * 100 if self.open else 0.0
+
+    @property
+    def cvd(self):
+        return self.taker_buy_quote - (self.quote_vol - self.taker_buy_quote)
+
+
+class LiveCandles:
+    """
+    Open candle per symbol, updated from kline events (full candle state) or
+    aggTrade events (incremental per trade).
+    """
+
+    def __init__(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.candles = {}
+
+    def seed(self, symbol, kline):
+        """
+        Starts from a REST kline of the open candle, so aggTrade mode does not begin at zero.
+        Trades between the REST snapshot and the first stream message are approximate.
+        """
+        ts = int(kline[0])
+        current = self.candles.get(symbol)
+        if current is None or current.ts < ts:
+            self.candles[symbol] = OpenCandle(ts, float(kline[1]), float(kline[4]), float(kline[7]), float(kline[10]))
+
+    def apply(self, data):
+        """
+        Applies one stream event; returns the symbol it updated, or None.
+        """
+        event = data.get("e")
+        if event == "kline":
+            k = data["k"]
+            symbol = data["s"]
+            current = self.candles.get(symbol)
+            if current is not None and current.ts > k["t"]:
+                return None
+            self.candles[symbol] = OpenCandle(int(k["t"]), float(k["o"]), float(k["c"]), float(k["q"]), float(k["Q"]))
+            return symbol
+        if event == "aggTrade":
+            symbol = data["s"]
+            price = float(data["p"])
+            quote = price * float(data["q"])
+            ts = data["T"] - data["T"] % self.interval_ms
+            current = self.candles.get(symbol)
+            if current is None or current.ts < ts:
+                current = self.candles[symbol] = OpenCandle(ts, price)
+            elif current.ts > ts:
+                return None
+            current.close = price
+            current.quote_vol += quote
+            if not data["m"]:  # buyer is taker
+                current.taker_buy_quote += quote
+            current.updated = time.time()
+            return symbol
+        return None
+
+
+class Broadcaster:
+    """
+    Fan-out til SSE/websocket-klienter. Each subscriber has a bounded queue;
+    a slow subscriber loses its oldest items instead of stalling ingestion.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.queues = set()
+        self.dropped = 0
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.maxsize)
+        self.queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.queues.discard(queue)
+
+    def publish(self, item):
+        for queue in self.queues:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(item)
+
+
+def stream_names(symbols, mode, interval):
+    suffix = "aggTrade" if mode == "aggTrade" else f"kline_{interval}"
+    return [f"{s.lower()}@{suffix}" for s in symbols]
+
+
+class StreamClient:
+    """
+    Holder en combined-stream websocket åpen med reconnect (backoff + jitter)
+    og sender hver melding til on_message(data).
+    """
+
+    def __init__(self, base_url, streams, on_message, session=None):
+        self.url = f"{base_url}/stream?streams={'/'.join(streams)}"
+        self.on_message = on_message
+        self.session = session
+        self.messages = 0
+        self.reconnects = 0
+        self.connected = False
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self):
+        own_session = self.session is None
+        session = self.session or aiohttp.ClientSession()
+        delay = 1.0
+        try:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        self.connected = True
+                        delay = 1.0
+                        async for msg in ws:
+                            if msg.type != aiohttp.WSMsgType.TEXT:
+                                break
+                            self.messages += 1
+                            payload = json.loads(msg.data)
+                            await self.on_message(payload.get("data", payload))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("stream error, reconnecting", extra={"url": self.url, "error": repr(e)})
+                self.connected = False
+                self.reconnects += 1
+                await asyncio.sleep(delay * (0.5 + random.random()))
+                delay = min(delay * 2, 60.0)
+        finally:
+            self.connected = False
+            if own_session:
+                await session.close()
+
+    def status(self):
+        return {"url": self.url, "connected": self.connected, "messages": self.messages, "reconnects": self.reconnects}
+
+
+async def record(path, base_url, symbols, mode, interval, seconds):
+    """
+    Records raw combined-stream messages as JSON lines: {"t": receive ms, "stream": ..., "data": ...}.
+    """
+    url = f"{base_url}/stream?streams={'/'.join(stream_names(symbols, mode, interval))}"
+    deadline = time.time() + seconds
+    count = 0
+    async with aiohttp.ClientSession() as session, session.ws_connect(url) as ws:
+        with open(path, "w") as out:
+            while time.time() < deadline:
+                try:
+                    msg = await asyncio.wait_for(ws.receive(), deadline - time.time())
+                except asyncio.TimeoutError:
+                    break
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                payload = json.loads(msg.data)
+                out.write(json.dumps({"t": int(time.time() * 1000), **payload}) + "\n")
+                count += 1
+    print(f"Recorded {count} messages to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record Binance combined-stream messages for offline replay")
+    parser.add_argument("--record", required=True, metavar="FILE")
+    parser.add_argument("--symbols", default="BTCUSDT")
+    parser.add_argument("--mode", choices=["kline", "aggTrade"], default="aggTrade")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--base", default=WS_BASE)
+    args = parser.parse_args()
+    asyncio.run(record(args.record, args.base, args.symbols.split(","), args.mode, args.interval, args.seconds))
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+from candles import aggregate_klines, bucket_start, daily_lookback
+
+DAY = 86_400_000
+
+
+def ms(*date):
+    return int(datetime(*date, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def daily(first, last):
+    """
+    One candle per day, first..last inclusive: volume 1, quote 10, buy 4 (base) / 6 (quote),
+    open = the day's index, close = index + 1, high/low around them.
+    """
+    out = []
+    for i, ts in enumerate(range(ms(*first), ms(*last) + 1, DAY)):
+        out.append([ts, str(i), str(i + 5), str(i - 5), str(i + 1), "1", ts + DAY - 1, "10", 3, "4", "6", "0"])
+    return out
+
+
+def test_weeks_follow_iso_mondays():
+    # 2023-12-28 is a Thursday, 2024-01-01 and 2024-01-08 are Mondays
+    weeks = aggregate_klines(daily((2023, 12, 28), (2024, 1, 10)), "1w")
+    assert [w[0] for w in weeks] == [ms(2024, 1, 1), ms(2024, 1, 8)]  # leading partial week dropped
+    full, open_ = weeks
+    assert full[1] == 4.0 and full[4] == 11.0  # open of Monday, close of Sunday
+    assert full[2] == 15.0 and full[3] == -1.0
+    assert full[6] == ms(2024, 1, 8) - 1
+    assert (full[5], full[7], full[8], full[9], full[10]) == (7.0, 70.0, 21, 28.0, 42.0)
+    # The open bucket runs to the newest daily candle
+    assert (open_[5], open_[7], open_[10]) == (3.0, 30.0, 18.0)
+    assert open_[6] == ms(2024, 1, 11) - 1
+
+
+def test_calendar_months_of_every_length():
+    months = aggregate_klines(daily((2023, 1, 20), (2023, 5, 10)), "1M")
+    assert [m[0] for m in months] == [ms(2023, 2, 1), ms(2023, 3, 1), ms(2023, 4, 1), ms(2023, 5, 1)]
+    # Feb 28, Mar 31, Apr 30 days, then the open May bucket
+    assert [m[5] for m in months] == [28.0, 31.0, 30.0, 10.0]
+    assert [m[7] for m in months] == [280.0, 310.0, 300.0, 100.0]
+    assert [m[9] for m in months] == [112.0, 124.0, 120.0, 40.0]
+    assert [m[6] for m in months[:3]] == [ms(2023, 3, 1) - 1, ms(2023, 4, 1) - 1, ms(2023, 5, 1) - 1]
+
+
+def test_bucket_start():
+    wed = ms(2024, 1, 3, 15, 30)
+    assert bucket_start(wed, "1w") == ms(2024, 1, 1)
+    assert bucket_start(wed, "1M") == ms(2024, 1, 1)
+    assert bucket_start(ms(2024, 2, 29, 23), "1M") == ms(2024, 2, 1)
+
+
+def test_daily_lookback_covers_the_deeper_of_months_and_weeks():
+    now = datetime(2024, 3, 15, 12, tzinfo=timezone.utc)  # a Friday
+    assert daily_lookback(2, 2, now) == 44    # from 2024-02-01
+    assert daily_lookback(1, 3, now) == 19    # from Monday 2024-02-26
+    # Across the year boundary
+    assert daily_lookback(2, 1, datetime(2024, 1, 10, tzinfo=timezone.utc)) == 41  # from 2023-12-01
+    days = daily_lookback(3, 1, now)
+    assert datetime(2024, 3, 15, tzinfo=timezone.utc) - timedelta(days=days - 1) == datetime(2024, 1, 1, tzinfo=timezone.utc)
@@ -0,0 +1,69 @@
+import asyncio
+
+from cache import TTLCache
+
+
+def fetcher(calls, value="v", size=10, delay=0.0):
+    async def fetch():
+        calls.append(value)
+        if delay: await asyncio.sleep(delay)
+        return value, size
+    return fetch
+
+
+def test_hit_until_the_ttl_expires():
+    cache = TTLCache(1000)
+    calls = []
+
+    async def go():
+        assert await cache.get_or_fetch("k", fetcher(calls), ttl=0.1) == "v"
+        assert await cache.get_or_fetch("k", fetcher(calls), ttl=0.1) == "v"
+        assert cache.peek("k") == "v"
+        await asyncio.sleep(0.15)
+        assert cache.peek("k") is None
+        await cache.get_or_fetch("k", fetcher(calls), ttl=0.1)
+    asyncio.run(go())
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (2, 2, 0)
+    assert stats["entries"] == 1 and stats["bytes"] == 10
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache(1000)
+    calls = []
+
+    async def go():
+        return await asyncio.gather(*[cache.get_or_fetch("k", fetcher(calls, delay=0.05), ttl=10) for _ in range(8)])
+    assert asyncio.run(go()) == ["v"] * 8
+    assert calls == ["v"]
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["inflight"]) == (1, 7, 0)
+    assert stats["hit_ratio"] == round(7 / 8, 4)
+
+
+def test_lru_eviction_stays_within_the_budget():
+    cache = TTLCache(30)
+    calls = []
+
+    async def go():
+        for key in ("a", "b", "c"):
+            await cache.get_or_fetch(key, fetcher(calls, key), ttl=10)
+        assert cache.peek("a") == "a"  # a is now the most recently used
+        await cache.get_or_fetch("d", fetcher(calls, "d"), ttl=10)
+        # Larger than the whole budget: returned but never cached
+        assert await cache.get_or_fetch("huge", fetcher(calls, "huge", size=31), ttl=10) == "huge"
+    asyncio.run(go())
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.bytes == 30 and cache.evictions == 1
+
+
+def test_none_is_not_cached():
+    cache = TTLCache(1000)
+    calls = []
+
+    async def go():
+        for _ in range(2):
+            assert await cache.get_or_fetch("k", fetcher(calls, None), ttl=10) is None
+    asyncio.run(go())
+    assert len(calls) == 2 and cache.stats()["entries"] == 0
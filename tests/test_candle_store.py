@@ -0,0 +1,77 @@
+import candles
+from candles import CandleStore
+
+H = 3_600_000
+KEY = ("BTCUSDT", "1h", "klines")
+
+
+class FakeUpstream:
+    """
+    Hourly klines ([ts]) the way Binance pages them: the newest `limit`, or `limit` from startTime.
+    """
+
+    def __init__(self, monkeypatch, now):
+        self.now = now
+        monkeypatch.setattr(candles.time, "time", lambda: self.now / 1000)
+
+    def fetch(self, limit, start=None):
+        last = self.now - self.now % H
+        if start is None: return [[ts] for ts in range(last - (limit - 1) * H, last + 1, H)]
+        return [[ts] for ts in range(start, min(last, start + (limit - 1) * H) + 1, H)]
+
+    def call(self, store, limit):
+        start = store.start_time(KEY, limit, "1h")
+        return store.merge(KEY, self.fetch(store.window(KEY, limit), start), lambda k: k[0], limit)
+
+
+def contiguous(items):
+    ts = [k[0] for k in items]
+    return all(b - a == H for a, b in zip(ts, ts[1:]))
+
+
+def test_incremental_fetch_only_asks_for_the_tail(monkeypatch):
+    up = FakeUpstream(monkeypatch, 1000 * H)
+    store = CandleStore()
+    assert len(up.call(store, 192)) == 192
+    up.now += 2 * H
+    assert store.start_time(KEY, 192, "1h") == 1000 * H  # the then-open candle
+    rows = up.call(store, 192)
+    assert len(rows) == 192 and contiguous(rows) and rows[-1][0] == 1002 * H
+
+
+def test_shallow_caller_does_not_leave_a_hole(monkeypatch):
+    up = FakeUpstream(monkeypatch, 1000 * H)
+    store = CandleStore()
+    up.call(store, 192)
+    up.now += 10 * H
+    assert len(up.call(store, 3)) == 3
+    up.now += H
+    rows = up.call(store, 192)
+    assert len(rows) == 192 and contiguous(rows) and rows[-1][0] == 1011 * H
+
+
+def test_gap_beyond_depth_refetches_the_full_window(monkeypatch):
+    up = FakeUpstream(monkeypatch, 1000 * H)
+    store = CandleStore()
+    up.call(store, 24)
+    up.now += 100 * H
+    assert store.start_time(KEY, 24, "1h") is None
+    rows = up.call(store, 24)
+    assert len(rows) == 24 and contiguous(rows)
+    assert len(store.series[KEY].points) == 24
+
+
+def test_deeper_window_backfills_in_order(monkeypatch):
+    up = FakeUpstream(monkeypatch, 1000 * H)
+    store = CandleStore()
+    up.call(store, 3)
+    rows = up.call(store, 50)
+    assert len(rows) == 50 and contiguous(rows)
+    assert store.series[KEY].depth == 50
+
+
+def test_open_candle_is_overwritten():
+    store = CandleStore()
+    store.merge(KEY, [[0, "a"], [H, "open"]], lambda k: k[0], 10)
+    rows = store.merge(KEY, [[H, "closed"], [2 * H, "open"]], lambda k: k[0], 10)
+    assert rows == [[0, "a"], [H, "closed"], [2 * H, "open"]]
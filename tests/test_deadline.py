@@ -0,0 +1,52 @@
+import asyncio
+
+from deadline import LatencyWindow, budget_scope, current_budget, hedged
+
+
+def test_budget_scope_sets_and_resets():
+    with budget_scope(0) as none:
+        assert none is None and current_budget.get() is None
+    with budget_scope(5) as budget:
+        assert current_budget.get() is budget and 4 < budget.remaining() <= 5
+        budget.late.add(("BTCUSDT", "1h", "klines"))
+        assert budget.late_for("BTCUSDT") == [("1h", "klines")]
+    assert current_budget.get() is None
+
+
+def test_latency_window_needs_enough_samples():
+    w = LatencyWindow(size=100, min_samples=10)
+    for i in range(9): w.add(i / 100)
+    assert w.quantile(0.95) is None
+    for i in range(9, 100): w.add(i / 100)
+    assert w.quantile(0.95) == 0.95
+
+
+def request_sequence(*delays):
+    calls = iter(delays)
+
+    async def request():
+        delay, value = next(calls)
+        await asyncio.sleep(delay)
+        return value
+    return request
+
+
+def test_fast_primary_is_not_hedged():
+    result = asyncio.run(hedged(request_sequence((0.0, "a")), 0.05, lambda: True))
+    assert result == ("a", None)
+
+
+def test_slow_primary_loses_to_the_hedge():
+    result = asyncio.run(hedged(request_sequence((0.5, "slow"), (0.0, "fast")), 0.05, lambda: True))
+    assert result == ("fast", "hedge")
+
+
+def test_hedge_not_sent_when_not_allowed():
+    result = asyncio.run(hedged(request_sequence((0.1, "slow"), (0.0, "fast")), 0.01, lambda: False))
+    assert result == ("slow", None)
+
+
+def test_failed_hedge_falls_back_to_primary():
+    result = asyncio.run(hedged(request_sequence((0.1, "primary"), (0.0, None)), 0.01, lambda: True,
+                                ok=lambda r: r is not None))
+    assert result == ("primary", "primary")
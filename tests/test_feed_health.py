@@ -0,0 +1,60 @@
+import random
+import statistics
+
+from feed_health import EMPTY, FROZEN, LOW_VARIANCE, OK, STALE, FeedStats, FeedTracker
+
+H = 3_600_000
+KEY = ("BTCUSDT", "1h", "topLongShortPositionRatio")
+
+
+def points(values, start=0):
+    return [{"timestamp": start + i * H, "longShortRatio": v} for i, v in enumerate(values)]
+
+
+def feed(tracker, items):
+    return tracker.update(KEY, items, lambda i: i["timestamp"], lambda i: i["longShortRatio"])
+
+
+def test_welford_matches_the_window_after_removals():
+    rng = random.Random(1)
+    values = [round(rng.uniform(0.5, 3.0), 4) for _ in range(500)]
+    s = FeedStats(48)
+    for i, v in enumerate(values):
+        s.add(i, v)
+        window = values[max(0, i - 47):i + 1]
+        assert s.n == len(window)
+        assert abs(s.mean - statistics.fmean(window)) < 1e-9
+        if len(window) > 1:
+            assert abs(s.std - statistics.stdev(window)) < 1e-7
+        assert s.distinct == len(set(window))
+
+
+def test_only_newer_points_are_added():
+    tracker = FeedTracker()
+    assert feed(tracker, points([1.0, 1.1, 1.2])) == 3
+    assert feed(tracker, points([1.0, 1.1, 1.2])) == 0
+    assert feed(tracker, points([1.2, 1.3], start=2 * H)) == 1
+
+
+def test_statuses():
+    now = 100 * H
+    tracker = FeedTracker(frozen_run=12)
+    feed(tracker, points([1.0 + i % 7 / 10 for i in range(48)], start=now - 47 * H))
+    assert tracker.status(KEY, H, now) == OK
+    assert tracker.status(KEY, H, now + 10 * H) == STALE
+
+    frozen = FeedTracker(frozen_run=12)
+    feed(frozen, points([1.0 + i / 10 for i in range(10)] + [1.2345] * 12, start=now - 21 * H))
+    assert frozen.status(KEY, H, now) == FROZEN
+
+    flat = FeedTracker()
+    feed(flat, points([1.0, 1.0, 1.1, 1.1], start=now - 3 * H))
+    assert flat.status(KEY, H, now) == LOW_VARIANCE
+
+
+def test_feed_without_data_is_reported_as_empty():
+    tracker = FeedTracker()
+    assert feed(tracker, None) == 0
+    assert KEY in tracker.feeds
+    assert tracker.status(KEY, H, 0) == EMPTY
+    assert tracker.info(KEY, H, 0) == {"status": EMPTY, "points": 0}
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from governor import RateGovernor, RequestShed, backoff_delay
+
+
+def empty_governor(limit_1m=600, **kwargs):
+    # 600/min with no headroom: 10 tokens per second
+    g = RateGovernor("test", limit_1m, headroom=1.0, **kwargs)
+    g.tokens = 0.0
+    return g
+
+
+def test_refill_is_linear_and_capped():
+    g = empty_governor()
+    g.stamp -= 1.0
+    g._refill()
+    assert 9.9 < g.tokens < 10.5
+    g.stamp -= 3600
+    g._refill()
+    assert g.tokens == g.capacity
+
+
+def test_concurrent_acquires_are_spread_out():
+    g = empty_governor()
+
+    async def go():
+        t0 = time.monotonic()
+        released = []
+
+        async def one():
+            await g.acquire(1)
+            released.append(time.monotonic() - t0)
+        await asyncio.gather(*[one() for _ in range(5)])
+        return sorted(released)
+
+    released = asyncio.run(go())
+    # weight/rate = 0.1 s apart, not all at once after the first wait
+    assert [round(t, 1) for t in released] == [0.1, 0.2, 0.3, 0.4, 0.5]
+    g._refill()
+    assert g.tokens > -1.0  # no debt left once the last waiter is through
+
+
+def test_shed_when_the_wait_is_too_long_and_reservation_is_returned():
+    g = empty_governor(max_wait=0.5)
+    with pytest.raises(RequestShed):
+        asyncio.run(g.acquire(20))  # 2 s of refill
+    assert g.shed_total == 1
+    assert -0.5 < g.tokens <= 0.5
+
+
+def test_shed_when_the_queue_is_full():
+    g = empty_governor(max_queue=0)
+    with pytest.raises(RequestShed):
+        asyncio.run(g.acquire(1))
+
+
+def test_cancelled_waiter_gives_the_weight_back():
+    g = empty_governor()
+
+    async def go():
+        task = asyncio.ensure_future(g.acquire(5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(go())
+    assert g.tokens > -1.0 and g.queued == 0
+
+
+def test_retry_after_blocks_the_domain():
+    g = RateGovernor("test", 600, headroom=1.0)
+    g.observe(429, {"Retry-After": "0.2"})
+    assert g.throttled_total == 1 and g.tokens <= 0
+
+    async def go():
+        t0 = time.monotonic()
+        await g.acquire(1)
+        return time.monotonic() - t0
+    assert asyncio.run(go()) >= 0.2
+    g.observe(418, {})
+    assert g.banned_total == 1 and g.stats()["blocked_for"] >= 59
+
+
+def test_used_weight_header_clamps_the_bucket():
+    g = RateGovernor("test", 1000, headroom=0.9)
+    g.observe(200, {"X-MBX-USED-WEIGHT-1m": "850"})
+    assert g.used_weight == 850
+    assert g.tokens == pytest.approx(900 - 850, abs=0.1)
+    g.observe(200, {"X-MBX-USED-WEIGHT-1m": "bogus"})
+    assert g.used_weight == 850
+
+
+def test_try_acquire_keeps_the_reserve():
+    g = RateGovernor("test", 100, headroom=1.0)
+    g.tokens = 52
+    assert g.try_acquire(2, reserve=0.5)
+    assert not g.try_acquire(1, reserve=0.5)
+
+
+def test_backoff_delay_is_capped():
+    assert all(0.25 <= backoff_delay(0) <= 0.75 for _ in range(100))
+    assert backoff_delay(20, cap=30.0) <= 45.0
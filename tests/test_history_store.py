@@ -0,0 +1,53 @@
+import math
+
+import numpy as np
+
+from history_store import KLINES, RETAIL, WHALE, HistoryStore, nearest_join
+
+H = 3_600_000
+
+
+def klines(n, start=0):
+    return [[start + i * H, "100", "101", "99", "101", "10", start + (i + 1) * H - 1, "1000000", 1, "0", "600000", "0"]
+            for i in range(n)]
+
+
+def ratios(ts_list, value):
+    return [{"timestamp": ts, "longShortRatio": str(value)} for ts in ts_list]
+
+
+def test_nearest_join_matches_sentiment_series_rules():
+    ref_ts = np.array([0, 10, 20]); ref = np.array([1.0, 2.0, 3.0])
+    assert nearest_join(np.array([5, 6, 100]), ref_ts, ref).tolist() == [1.0, 2.0, 3.0]
+    out = nearest_join(np.array([5, 100]), ref_ts, ref, max_age=50)
+    assert out[0] == 1.0 and math.isnan(out[1])
+    assert np.isnan(nearest_join(np.array([1, 2]), np.array([], dtype=np.int64), np.array([]))).all()
+
+
+def test_append_read_and_compact(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.append_klines("X", "1h", klines(5)) == 5
+    assert store.append_klines("X", "1h", klines(6)) == 1  # only the newer one
+    assert store.append_klines("X", "1h", klines(3), only_newer=False) == 3
+    assert store.compact("X", "1h", KLINES) == (9, 6)
+    data = store.read("X", "1h", KLINES, start=2 * H)
+    assert data["ts"].tolist() == [2 * H, 3 * H, 4 * H, 5 * H]
+
+
+def test_closed_klines_only(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.append_klines("X", "1h", klines(5), closed_before=4 * H) == 4
+
+
+def test_missing_sentiment_is_ignored_not_zero(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append_klines("X", "1h", klines(10))
+    store.append_ratios("X", "1h", WHALE, ratios([8 * H, 9 * H], 1.3))
+    store.append_ratios("X", "1h", RETAIL, ratios([h * H for h in range(10)], 1.1))
+    rows = store.signal_rows("X", "1h", max_age=H)
+    missing = [r for r in rows if r.w_ls is None]
+    assert [r.ts for r in missing] == [h * H for h in range(7)]
+    assert all(r.ignore == ("whale",) for r in missing)
+    assert rows[-1].ignore == () and rows[-1].w_ls == 1.3
+    # Classified with NEUTRAL_LS for the missing feed, not a 0.0 ratio
+    assert all(r.signal_inputs()[2] == 1.0 for r in missing)
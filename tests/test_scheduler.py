@@ -0,0 +1,33 @@
+import asyncio
+from collections import Counter
+
+from scheduler import RefreshScheduler, next_close
+
+
+def test_next_close_is_utc_aligned():
+    assert next_close(3_600_000, 3_600_000) == 7_200_000
+    assert next_close(3_600_000, 3_599_999) == 3_600_000
+
+
+def test_slow_job_does_not_hold_up_the_others():
+    calls = Counter()
+
+    async def refresh(sym, group):
+        calls[sym] += 1
+        if sym == "SLOW": await asyncio.sleep(5)
+        if sym == "BAD": raise RuntimeError("upstream down")
+
+    async def go():
+        scheduler = RefreshScheduler(["SLOW", "FAST", "BAD"], {"1h": (3_600_000, 0)}, refresh, max_age=0.1)
+        scheduler.start()
+        await asyncio.sleep(0.5)
+        status = scheduler.status()
+        await scheduler.stop()
+        return status
+
+    status = asyncio.run(go())
+    assert calls["SLOW"] == 1  # still in flight, never started twice
+    assert calls["FAST"] >= 3 and calls["BAD"] >= 3
+    assert status["jobs"]["SLOW:1h"]["running"]
+    assert status["jobs"]["BAD:1h"]["failures"] == calls["BAD"]
+    assert status["jobs"]["FAST:1h"]["failures"] == 0
@@ -0,0 +1,74 @@
+import main
+from candles import SentimentSeries, format_label
+from signal_engine import Signal, SignalRow
+
+H = 3_600_000
+DUMP = Signal.PARABOLIC_DUMP
+
+
+def row(code, age=0, price_ch=-1.0, cvd=-1e6, w_ls=1.0, r_ls=1.0):
+    return SignalRow((10 - age) * H, "1h", price_ch, cvd, w_ls, r_ls, code=code)
+
+
+def dump(met, age=0):
+    # PARABOLIC_DUMP scores retail < 1.0, CVD > 0 and whales > 1.0
+    inputs = [(-1e6, 0.9, 1.2), (-1e6, 0.9, 0.9), (1e6, 0.9, 0.9), (1e6, 0.9, 1.2)][met]
+    cvd, r_ls, w_ls = inputs
+    return row(DUMP, age, price_ch=-25.0, cvd=cvd, w_ls=w_ls, r_ls=r_ls)
+
+
+def test_real_signals_rank_before_the_quiet_classes():
+    results = [
+        ("NEUT", [row(Signal.NEUTRAL)]),
+        ("LOWC", [row(Signal.LOW_CONVICTION)]),
+        ("SELL", [row(Signal.AGGRESSIVE_SELLING)]),
+        ("DMP1", [dump(1)]),
+        ("DMP3", [dump(3)]),
+    ]
+    ranked = main.screen_rows(results, set(), 0, False)
+    assert [r["symbol"] for r in ranked] == ["DMP3", "DMP1", "SELL", "NEUT", "LOWC"]
+    assert ranked[0]["conditions"] == "3/3" and ranked[2]["conditions"] is None
+    assert all("_sort" not in r and "desc" not in r for r in ranked)
+
+
+def test_signal_and_condition_filters():
+    results = [
+        ("AAA", [dump(3)]),
+        ("BBB", [dump(1)]),
+        ("CCC", [row(Signal.AGGRESSIVE_SELLING)]),
+    ]
+    assert [r["symbol"] for r in main.screen_rows(results, {DUMP}, 0, False)] == ["AAA", "BBB"]
+    assert [r["symbol"] for r in main.screen_rows(results, {DUMP}, 2, False)] == ["AAA"]
+    # Signals without a checklist never pass a min_conditions filter
+    assert main.screen_rows(results, {Signal.AGGRESSIVE_SELLING}, 1, False) == []
+    assert main.screen_rows(results, set(), 0, True)[0]["desc"]
+
+
+def test_newest_match_wins_and_reports_its_age():
+    results = [("AAA", [row(Signal.NEUTRAL, 0), dump(2, 1), dump(3, 2)])]
+    (item,) = main.screen_rows(results, {DUMP}, 0, False)
+    assert item["candles_ago"] == 1 and item["ts"] == 9 * H
+    assert item["conditions"] == "2/3" and item["matches"] == 2
+
+
+def test_every_screener_interval_has_a_label():
+    ts = 1_700_000_000_000
+    assert format_label(ts, "5m") == "14/11 22:13"
+    assert format_label(ts, "4h") == "14/11 22:00"
+    assert all(format_label(ts, interval) != str(ts) for interval in main.INTERVAL_MS)
+
+
+def kline(ts):
+    return [ts, "100", "0", "0", "101", "0", ts + H - 1, "2000000", "0", "0", "1500000"]
+
+
+def test_shallow_windows_do_not_grow_the_memo():
+    sentiment = SentimentSeries([0], [1.0])
+    key = ("MEMOTEST", "1h")
+    main.analyze_klines(*key, [kline(i * H) for i in range(20)], sentiment, sentiment)
+    assert len(main.candle_store.analyzed[key]) == 20
+    for start in range(1, 30):
+        main.analyze_klines(*key, [kline(i * H) for i in range(start + 17, start + 20)], sentiment, sentiment)
+    memo = main.candle_store.analyzed[key]
+    assert len(memo) == 20 and max(memo) == 48 * H
+    main.candle_store.analyzed.pop(key)
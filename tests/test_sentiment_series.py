@@ -0,0 +1,31 @@
+import main
+from candles import SentimentSeries
+
+H = 3_600_000
+
+
+def test_nearest_prefers_the_earlier_point_on_ties():
+    s = SentimentSeries([0, 10, 20], [1.0, 2.0, 3.0])
+    assert s.nearest(5) == 1.0
+    assert s.nearest(6) == 2.0
+    assert s.nearest(100) == 3.0
+    assert s.nearest(100, None, max_age=50) is None
+    assert SentimentSeries().nearest(5, None) is None
+
+
+def test_from_items_sorts_unordered_history():
+    s = SentimentSeries.from_items([{"timestamp": 20, "longShortRatio": "3"}, {"timestamp": 10, "longShortRatio": "2"}])
+    assert (s.ts, s.values) == ([10, 20], [2.0, 3.0])
+
+
+def test_analysis_ignores_ratios_from_another_candle():
+    # Hourly sentiment for the last two candles only; the open candle's point is not published yet
+    whale = SentimentSeries([7 * H, 8 * H], [1.5, 1.6])
+    retail = SentimentSeries([7 * H, 8 * H], [0.7, 0.6])
+    klines = [[i * H, "100", "0", "0", "101", "0", (i + 1) * H - 1, "2000000", "0", "0", "1500000"] for i in range(10)]
+    rows = main.analyze_klines("LOOKUPTEST", "1h", klines, whale, retail)
+    main.candle_store.analyzed.pop(("LOOKUPTEST", "1h"))
+    by_ts = {row.ts: (row.w_ls, row.r_ls) for row in rows}
+    assert by_ts[8 * H] == (1.6, 0.6) and by_ts[9 * H] == (1.6, 0.6)  # one candle old still counts
+    assert by_ts[6 * H] == (1.5, 0.7)
+    assert by_ts[5 * H] == (None, None) and by_ts[0] == (None, None)
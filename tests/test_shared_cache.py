@@ -0,0 +1,62 @@
+import asyncio
+
+from shared_cache import SharedCache, SQLiteBackend
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_leader_lease_is_exclusive_and_renewable(tmp_path):
+    async def go():
+        backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        a, b = SharedCache(backend), SharedCache(backend)
+        assert await a.try_lead(10)
+        assert not await b.try_lead(10)
+        assert await a.try_lead(10)  # renew
+        await a.resign()
+        assert await b.try_lead(10)
+        await backend.close()
+    run(go())
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    async def go():
+        backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        a, b = SharedCache(backend), SharedCache(backend)
+        assert await a.try_lead(0.05)
+        await asyncio.sleep(0.1)
+        assert await b.try_lead(10)
+        assert not await a.try_lead(10)
+        await backend.close()
+    run(go())
+
+
+def test_claim_is_granted_once(tmp_path):
+    async def go():
+        backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        a, b = SharedCache(backend), SharedCache(backend)
+        assert await a.claim("webhook:x:1")
+        assert not await b.claim("webhook:x:1")
+        assert await b.claim("webhook:x:2")
+        await backend.close()
+    run(go())
+
+
+def test_get_or_fetch_runs_one_fetch_across_processes(tmp_path):
+    async def go():
+        backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        workers = [SharedCache(backend) for _ in range(4)]
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"v": 1}, 8
+
+        results = await asyncio.gather(*[w.get_or_fetch("url:x", fetch, 60) for w in workers])
+        assert len(calls) == 1
+        assert all(value == {"v": 1} for value, _ in results)
+        assert await workers[0].get("url:x") == {"v": 1}
+        await backend.close()
+    run(go())
@@ -0,0 +1,67 @@
+from candles import close_time
+from signal_diff import EventFilter, SignalDiff
+from signal_engine import HEADS, Signal, SignalRow
+
+H = 3_600_000
+QUIET = Signal.LOW_CONVICTION
+SELL = Signal.AGGRESSIVE_SELLING
+
+
+def rows(codes):
+    return [SignalRow(i * H, "1h", -1.0, -1e6, 1.0, 1.0, code=code) for i, code in enumerate(codes)]
+
+
+def test_first_sighting_only_sets_the_baseline():
+    diff = SignalDiff()
+    assert diff.observe("X", "1h", rows([QUIET, SELL, QUIET]), now_ms=3 * H) == []
+    assert diff.state[("X", "1h")] == (2 * H, QUIET)
+
+
+def test_emits_each_transition_once():
+    diff = SignalDiff()
+    diff.observe("X", "1h", rows([QUIET, QUIET]), now_ms=2 * H - 1)
+    events = diff.observe("X", "1h", rows([QUIET, QUIET, SELL, SELL]), now_ms=4 * H - 1)
+    assert [(e["ts"], e["from"], e["to"]) for e in events] == [(2 * H, "LOW_CONVICTION", "AGGRESSIVE_SELLING")]
+    assert events[0]["id"] == f"X:1h:{2 * H}" and events[0]["head"] == HEADS[SELL]
+    assert diff.observe("X", "1h", rows([QUIET, QUIET, SELL, SELL]), now_ms=4 * H - 1) == []
+    assert list(diff.recent) == events
+
+
+def test_open_candle_is_decided_from_the_clock():
+    diff = SignalDiff()
+    diff.observe("X", "1h", rows([QUIET, QUIET]), now_ms=2 * H - 1)
+    # The newest row is still open: its change is not reported yet
+    assert diff.observe("X", "1h", rows([QUIET, QUIET, SELL]), now_ms=3 * H - 1) == []
+    # Stored data after the close: every row is closed, the last one included
+    events = diff.observe("X", "1h", rows([QUIET, QUIET, SELL]), now_ms=10 * H)
+    assert [e["ts"] for e in events] == [2 * H]
+
+
+def test_same_head_is_not_a_transition():
+    early, too_early = Signal.WHALE_ACCUMULATION_EARLY, Signal.WHALE_ACCUMULATION_TOO_EARLY
+    assert HEADS[early] == HEADS[too_early]
+    diff = SignalDiff()
+    diff.observe("X", "1h", rows([early, early]), now_ms=2 * H - 1)
+    assert diff.observe("X", "1h", rows([early, early, too_early, QUIET]), now_ms=4 * H - 1) == []
+
+
+def test_filters_and_replay():
+    diff = SignalDiff()
+    for sym in ("AAA", "BBB"):
+        diff.observe(sym, "1h", rows([QUIET, QUIET]), now_ms=2 * H - 1)
+        diff.observe(sym, "1h", rows([QUIET, QUIET, SELL, QUIET]), now_ms=4 * H)
+    everything = EventFilter()
+    assert len(diff.since("", everything)) == 4
+    assert [e["id"] for e in diff.since(f"AAA:1h:{3 * H}", everything)] == [f"BBB:1h:{2 * H}", f"BBB:1h:{3 * H}"]
+    only_b = EventFilter(symbols={"BBB"}, signals={"AGGRESSIVE_SELLING"})
+    # A signal filter matches either side of the transition
+    assert len(diff.since("", only_b)) == 2
+    assert diff.since("", EventFilter(intervals={"15m"})) == []
+
+
+def test_close_time_uses_calendar_months():
+    assert close_time(H, "1h") == 2 * H
+    feb_2024 = 1706745600000  # 2024-02-01
+    assert close_time(feb_2024, "1M") == 1709251200000  # 2024-03-01
+    dec_2024 = 1733011200000
+    assert close_time(dec_2024, "1M") == 1735689600000  # 2025-01-01
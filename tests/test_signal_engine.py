@@ -0,0 +1,7 @@
+from signal_engine import check_equivalence
+
+
+def test_batch_classifier_matches_get_signal():
+    # Fewer rows than `python signal_engine.py`, with ignored feeds and missing ratios mixed in
+    assert check_equivalence(n=5_000, seed=0) == 0
+    assert check_equivalence(n=5_000, seed=7) == 0
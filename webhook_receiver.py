@@ -0,0 +1,54 @@
+"""
+Lokal webhook-mottaker for CVD_SIGNAL_WEBHOOKS: skriver ut hver overgang den får.
+
+    python webhook_receiver.py --port 9300 &
+    CVD_SIGNAL_WEBHOOKS="http://127.0.0.1:9300/hook#signals=WHALE_ACCUMULATION_CONFIRMED" python main.py
+
+--fail-rate answers that share of deliveries with 503 to exercise the sender's retries;
+GET /_received returns what has arrived so far (and how many arrived twice at the same path).
+"""
+import argparse
+import json
+import random
+
+from aiohttp import web
+
+
+def make_app(fail_rate, log_path):
+    received = []
+    seen = set()
+    state = {"duplicates": 0, "rejected": 0}
+
+    async def hook(request):
+        if random.random() < fail_rate:
+            state["rejected"] += 1
+            return web.Response(status=503)
+        event = await request.json()
+        key = (request.path, event["id"])
+        if key in seen: state["duplicates"] += 1
+        seen.add(key)
+        received.append(event)
+        print(f"{event['symbol']:<14}{event['interval']:>4}  {event['label']:<14}{event['from']} -> {event['to']}"
+              + ("  (stale: " + ", ".join(event["stale"]) + ")" if event.get("stale") else ""), flush=True)
+        if log_path:
+            with open(log_path, "a") as f: f.write(json.dumps(event) + "\n")
+        return web.Response(status=204)
+
+    async def stats(request):
+        return web.json_response({"received": len(received), **state, "events": received[-50:]})
+
+    app = web.Application()
+    app.router.add_post("/hook", hook)
+    app.router.add_post("/hook/{name}", hook)
+    app.router.add_get("/_received", stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print signal-change webhooks from the CVD API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of deliveries answered with 503")
+    parser.add_argument("--log", help="append received events to this JSON-lines file")
+    args = parser.parse_args()
+    web.run_app(make_app(args.fail_rate, args.log), host=args.host, port=args.port, print=None)